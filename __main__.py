@@ -0,0 +1,8 @@
+'''
+Entry point of the mini database, run with python and the project directory, e.g. python . from the project root.
+It starts the interactive menu of mini_database.py; scripts of commands run with python batch.py.
+'''
+from mini_database import mini_database
+
+if __name__ == '__main__':
+    mini_database()
@@ -1,18 +1,32 @@
-import matplotlib.pyplot as plt
-import networkx as nx
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import index
 
-def choose_max_degree(df_length: int) -> int:
+from instrument import STATS, timed
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+def choose_max_degree(df_length: int, limit: int = None) -> int:
     '''
     Function choose_max_degree
     This function takes the length of the dataframe and prompts the user to enter the maximum degree of the B tree.
     Let the user choose the maximum degree of the B tree. The minimum degree is half of the maximum degree. The maximum degree must be an even number larger than 3.
     Parameters:
     df_length -- the length of the dataframe
+    limit -- the largest maximum degree allowed, e.g. the largest one whose nodes fit in a disk page. It is also the default when the user enters nothing.
     Returns the minimum degree of the B tree.
     '''
     while True:
         try:
-            max_degree = int(input("Enter the maximum degree of the B tree, please choose an even number larger than 3: "))
+            if limit is None:
+                max_degree = int(input("Enter the maximum degree of the B tree, please choose an even number larger than 3: "))
+            else:
+                max_degree = input(f"Enter the maximum degree of the B tree, please choose an even number between 4 and {limit} (default {limit}, one node per page): ")
+                max_degree = limit if max_degree == "" else int(max_degree)
+                if max_degree > limit:
+                    raise ValueError(f"Degree must not be greater than {limit}")
             if max_degree < 4:
                 raise ValueError("Degree must be greater than 3")
             return int(max_degree / 2) # Convert to minimum degree
@@ -22,43 +36,403 @@ def choose_max_degree(df_length: int) -> int:
         except ValueError as error:
             print("Invalid value:", error)
 
+def sample_children(children, max_children=None):
+    '''
+    Function sample_children
+    This function picks evenly spaced children of a node to draw, always including the first and the last one.
+    Parameters:
+    children -- the children of a node
+    max_children -- the largest number of children to keep, all of them if None
+    Returns a list of children.
+    '''
+    if max_children is None or len(children) <= max_children:
+        return list(children)
+    if max_children == 1:
+        return [children[0]]
+    step = (len(children) - 1) / (max_children - 1)
+    return [children[round(i * step)] for i in range(max_children)]
+
+class FrozenNode:
+    '''
+    Class FrozenNode
+    This class is a copy of a node for drawing: its entries as they were when it was copied and its copied children.
+    '''
+    __slots__ = ('leaf', 'child', 'labels')
+
+    def __init__(self, leaf, labels):
+        self.leaf = leaf
+        self.labels = labels
+        self.child = []
+
+    def entries(self):
+        return self.labels
+
+def freeze_tree(root, max_level=None, max_children=None, get_child=None):
+    '''
+    Function freeze_tree
+    This function copies the drawn part of a tree, so it can be drawn later while the tree keeps changing.
+    Parameters:
+    root -- the root node
+    max_level -- the number of levels to copy, all of them if None
+    max_children -- the largest number of children copied under a node, see sample_children
+    get_child -- a function that returns the node of a child reference, e.g. a page number. Children are nodes if None.
+    Returns the root FrozenNode.
+    '''
+    def copy(node, level):
+        frozen = FrozenNode(node.leaf, node.entries())
+        if not node.leaf and (max_level is None or level < max_level):
+            for child in sample_children(node.child, max_children):
+                frozen.child.append(copy(get_child(child) if get_child else child, level + 1))
+        # a node whose children are not copied is drawn like a leaf
+        frozen.leaf = not frozen.child
+        return frozen
+    return copy(root, 1)
+
+@timed('draw tree')
+def draw_tree(root, max_level=None, max_children=None, path=None):
+    '''
+    Function draw_tree
+    This function draws a tree of nodes that have leaf, child and entries().
+    Parameters:
+    root -- the root node
+    max_level -- the number of levels to draw, all of them if None
+    max_children -- the largest number of children drawn under a node, see sample_children
+    path -- an image file to save the drawing to. If None, the drawing is shown in a window.
+    '''
+    # the drawing libraries take most of a second to import, so they are only loaded when a tree is drawn
+    try:
+        import networkx as nx
+        if path is None:
+            import matplotlib.pyplot as plt
+        else:
+            # a figure made without pyplot is never shown and can be drawn from a background thread
+            from matplotlib.figure import Figure
+    except ImportError as error:
+        raise ImportError("Drawing the tree needs matplotlib and networkx, install them with "
+                          f"pip install matplotlib networkx ({error})") from error
+
+    def add_edges(graph, node, pos, x=0, y=0, level=1, width=1.0):
+        if node is not None:
+            pos[node] = (x, y)
+            if not node.leaf and (max_level is None or level < max_level):
+                children = sample_children(node.child, max_children)
+                dx = width / len(children)  # Width divided by the number of children
+                next_x = x - width / 2 + dx / 2  # Centering children under the parent node
+                for child in children:
+                    graph.add_edge(node, child)
+                    add_edges(graph, child, pos, x=next_x, y=y-2, level=level+1, width=dx)  # Pass the new width to the next level
+                    next_x += dx
+
+    graph = nx.DiGraph()
+    pos = {}
+    add_edges(graph, root, pos)
+
+    if path is None:
+        fig, ax = plt.subplots(figsize=(12, 8))
+    else:
+        fig = Figure(figsize=(12, 8))
+        ax = fig.subplots()
+    nx.draw(graph, pos, ax=ax, with_labels=False, node_size=3, arrowsize=20)
+
+    # Draw node labels with each key on a new line
+    for node, (x, y) in pos.items():
+        label = '\n'.join(str(key) for key in node.entries())
+        ax.text(x, y, label, fontsize=12, ha='center', va='center',
+                bbox=dict(facecolor='lightblue', edgecolor='black', boxstyle='round,pad=0.2'))  # Changed facecolor to 'lightgray'
+
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
+
+def node_size(node):
+    '''
+    Function node_size
+    This function estimates the bytes used by an in-memory node: the node object, its key, row and child containers,
+    and the key objects themselves when they are not stored unboxed in an array.
+    Parameters:
+    node -- the node
+    Returns the number of bytes.
+    '''
+    size = sys.getsizeof(node) + sys.getsizeof(node.keys) + sys.getsizeof(node.rows) + sys.getsizeof(node.child)
+    if not isinstance(node.keys, array):
+        size += sum(sys.getsizeof(key) for key in node.keys)
+    return size
+
+def tree_stats(root, t, get_child=None, leaf_keys=False, node_bytes=node_size):
+    '''
+    Function tree_stats
+    This function measures the shape of a tree in one pass over its nodes, without comparing any key.
+    Parameters:
+    root -- the root node
+    t -- the minimum degree of the tree
+    get_child -- a function that returns the node of a child reference, e.g. a page number. Children are nodes if None.
+    leaf_keys -- True if only the keys of the leaves are indexed keys, as in a B+ tree
+    node_bytes -- a function that returns the bytes used by a node
+    Returns a dict with the height, the number of nodes and keys, the nodes per level, the average fill of the nodes
+    (keys / (2t - 1)), a histogram of the fill in ten buckets of 10%, the bytes used and the average number of nodes
+    visited to find a key.
+    '''
+    max_keys = 2 * t - 1
+    histogram = [0] * 10
+    nodes_per_level = []
+    keys = stored = path = size = 0
+    level = [root]
+    while level:
+        nodes_per_level.append(len(level))
+        below = []
+        for node in level:
+            n = len(node.keys)
+            stored += n
+            histogram[min(9, n * 10 // max_keys)] += 1
+            size += node_bytes(node)
+            if node.leaf or not leaf_keys:
+                keys += n
+                path += n * len(nodes_per_level)
+            if not node.leaf:
+                below.extend(node.child if get_child is None else map(get_child, node.child))
+        level = below
+    nodes = sum(nodes_per_level)
+    return {
+        'height': len(nodes_per_level),
+        'nodes': nodes,
+        'keys': keys,
+        'nodes_per_level': nodes_per_level,
+        'fill': stored / (nodes * max_keys),
+        'fill_histogram': histogram,
+        'bytes': size,
+        'average_path': path / keys if keys else 0.0,
+    }
+
+def check_tree(root, t, get_child=None, b_plus=False):
+    '''
+    Function check_tree
+    This function checks the invariants of a tree in one pass over its nodes: the keys of every node are in
+    increasing order and between the separators of the parent, every node but the root has t - 1 to 2t - 1 keys,
+    an internal node has one more child than keys, and all the leaves are at the same depth.
+    Parameters:
+    root -- the root node
+    t -- the minimum degree of the tree
+    get_child -- a function that returns the node of a child reference, e.g. a page number. Children are nodes if None.
+    b_plus -- True for a B+ tree, where a key equal to a separator is in the child on the right of it
+    Returns a list of the problems found, empty if the tree is valid.
+    '''
+    problems = []
+    leaf_depths = set()
+    # each entry is a node, its depth, its path from the root and the bounds of its keys, None if unbounded
+    stack = [(root, 1, 'root', None, None)]
+    while stack:
+        node, depth, where, lo, hi = stack.pop()
+        keys = list(node.keys)
+        n = len(keys)
+        if n > 2 * t - 1:
+            problems.append(f"{where}: {n} keys, more than {2 * t - 1}")
+        if depth > 1 and n < t - 1:
+            problems.append(f"{where}: {n} keys, fewer than {t - 1}")
+        if (node.leaf or not b_plus) and len(node.rows) != n:
+            problems.append(f"{where}: {n} keys but {len(node.rows)} row numbers")
+        try:
+            if any(a >= b for a, b in zip(keys, keys[1:])):
+                problems.append(f"{where}: keys not in increasing order")
+            if n and lo is not None and (keys[0] < lo if b_plus else keys[0] <= lo):
+                problems.append(f"{where}: key {keys[0]!r} is not after the separator {lo!r}")
+            if n and hi is not None and keys[-1] >= hi:
+                problems.append(f"{where}: key {keys[-1]!r} is not before the separator {hi!r}")
+        except TypeError as error:
+            problems.append(f"{where}: keys that do not compare, {error}")
+        if node.leaf:
+            leaf_depths.add(depth)
+            continue
+        if len(node.child) != n + 1:
+            problems.append(f"{where}: {n} keys but {len(node.child)} children")
+            continue
+        if depth == 1 and n == 0:
+            problems.append(f"{where}: an internal root without keys")
+        bounds = [lo] + keys + [hi]
+        for i, child in enumerate(node.child):
+            child = child if get_child is None else get_child(child)
+            stack.append((child, depth + 1, f"{where}/{i}", bounds[i], bounds[i + 1]))
+    if len(leaf_depths) > 1:
+        problems.append(f"leaves at different depths: {sorted(leaf_depths)}")
+    return problems
+
+def choose_tree_type():
+    '''
+    Function choose_tree_type
+    This function prompts the user to choose between a B tree and a B+ tree for the index.
+    Returns the class of the chosen tree.
+    '''
+    while True:
+        try:
+            tree_type = int(input("Enter 1 to index the data with a B tree, 2 to index it with a B+ tree: "))
+            if tree_type not in [1, 2]:
+                raise ValueError("Invalid choice")
+            return BTree if tree_type == 1 else BPlusTree
+        except ValueError as error:
+            print("Invalid value:", error)
+
+def key_typecode(k):
+    '''
+    Function key_typecode
+    This function picks the array typecode used to store keys like k.
+    Parameters:
+    k -- a key
+    Returns 'q' for integer keys that fit in 64 bits, which are stored unboxed, otherwise None for a plain list.
+    '''
+    try:
+        k = index(k)
+    except TypeError:
+        return None
+    return 'q' if INT64_MIN <= k <= INT64_MAX else None
+
+
+def keys_typecode(keys):
+    '''
+    Function keys_typecode
+    This function picks the array typecode used to store all of a list of keys, see key_typecode.
+    Parameters:
+    keys -- a list of keys
+    Returns 'q' if every key is an integer that fits in 64 bits, otherwise None for plain lists.
+    '''
+    if not keys:
+        return None
+    try:
+        # the conversion checks every key in C
+        array('q', keys)
+        return 'q'
+    except (TypeError, OverflowError):
+        return None
+
 # B tree node class
 # Even max degree only
 class BTreeNode:
     '''
     Class BTreeNode
     This class represents a node in the B tree.
+    The keys and their row numbers are kept in two parallel arrays instead of a list of (key, row_number) tuples.
     '''
-    def __init__(self, leaf=False):
+    __slots__ = ('leaf', 'keys', 'rows', 'child', 'version')
+
+    def __init__(self, leaf=False, typecode=None):
         self.leaf = leaf
-        self.keys = []  # This will store tuples
+        self.keys = array(typecode) if typecode else []  # integer keys are stored unboxed
+        self.rows = array('q')  # row numbers, rows[i] belongs to keys[i]
         self.child = []
+        self.version = 0  # the version of the tree the node was created in, see BTree.snapshot
+
+    def entries(self):
+        '''
+        Function entries
+        This function returns the keys of the node as (key, row_number) tuples, for display.
+        '''
+        return list(zip(self.keys, self.rows))
 
 class BTree:
     '''
     class Btree
-    This class represents a B tree. It has the following attributes: root and minimum degree. The class has the following methods:
+    This class represents a B tree. It has the following attributes: root, minimum degree and the typecode of the key storage. The class has the following methods:
     - insertion: insert a key into the B tree
     - insert_none_full: insert a key into a non-full node
     - split_child: split a child node
+    - from_sorted: build a B tree bottom-up from sorted keys
+    - bulk_load: sort keys and rebuild the B tree bottom-up
     - search_key: search for a key in the B tree
+    - delete: delete a key in one pass from the root down, borrowing from a sibling before merging
+    - delete_many: delete a sorted batch of keys, nearby keys share a descent
+    - get: look up the row number of a key
+    - search_many: look up the row numbers of many keys at once
+    - range: iterate over the keys between two bounds in order
+    - items: iterate over all keys in order
     - print_tree: print the B tree
     - visualize: visualize the B tree
+    - stats: measure the height, the fill of the nodes and the bytes used
+    - check: check the invariants of the B tree
+    - check_key: check that a key can be stored before it is inserted
+    - snapshot: a read-only view of the B tree as it is now, kept consistent by copy-on-write
     '''
+    # the writes copy the nodes a snapshot shares, see snapshot
+    copy_on_write = True
+
     def __init__(self, t):
-        self.root = BTreeNode(True)  # Initially, root should be a leaf
+        self.typecode = None  # array typecode of the keys, chosen from the first key, None once a key does not fit
+        self.version = 0  # incremented by every snapshot
+        self.readers = set()  # ids of the open snapshots
+        self.root = self._new_node(True)  # Initially, root should be a leaf
         self.t = t  # Minimum degree
 
+    def check_key(self, k):
+        '''
+        Function check_key
+        This function checks that a key can be stored in the B tree, before it is inserted. Any key that compares
+        with the other keys fits in memory, see DiskBTree.check_key for the limits of an index file.
+        Parameters:
+        k -- the key
+        Raises TypeError if the key does not compare with the keys of the B tree, e.g. a str key in a tree of ints.
+        '''
+        # the keys are all of one comparable kind, so comparing with one of them is enough; the slice is taken at
+        # once, so a writer that empties the root meanwhile is harmless
+        for key in self.root.keys[:1]:
+            try:
+                k < key
+            except TypeError:
+                raise TypeError(f"Key {k!r} does not compare with the keys of the index, like {key!r}") from None
+
+    def _widen_keys(self):
+        '''
+        Function _widen_keys
+        This function moves the keys of every node from 64-bit integer arrays to lists, when a key that is not an
+        integer or does not fit in 64 bits is inserted. The nodes keep the same keys, so open snapshots are not affected.
+        '''
+        self.typecode = None
+        stack = [self.root]
+        while stack:
+            x = stack.pop()
+            x.keys = list(x.keys)
+            stack.extend(x.child)
+
+    def _new_node(self, leaf):
+        node = BTreeNode(leaf, self.typecode)
+        node.version = self.version
+        return node
+
+    def _trace(self, op, k):
+        '''
+        Function _trace
+        This function counts an operation and the nodes on the path to its key, when the instrumentation is on.
+        The path is walked once more instead of adding a probe to every step of the operation.
+        Parameters:
+        op -- the counter of the operation, e.g. "gets"
+        k -- the key
+        '''
+        STATS.count(op)
+        x = self.root
+        while True:
+            STATS.visit(x)
+            i = bisect_left(x.keys, k)
+            if x.leaf or (i < len(x.keys) and k == x.keys[i]):
+                return
+            x = x.child[i]
+
     def insertion(self, k):
         '''
         Function insertion
         This function inserts a key into the B tree.
         Parameters:
-        k -- the key to be inserted
+        k -- the (key, row_number) tuple to be inserted
         '''
+        if STATS.on:
+            self._trace('inserts', k[0])
         root = self.root
+        if root.leaf and not root.keys:  # The key storage of an empty tree follows the type of its first key
+            self.typecode = key_typecode(k[0])
+            root = self.root = self._new_node(True)
+        else:
+            if self.typecode and not key_typecode(k[0]):
+                self._widen_keys()
+            if self.readers:
+                root = self._own_root()
         if len(root.keys) == (2 * self.t) - 1:  # If root is full, split it
-            temp = BTreeNode(False)
+            temp = self._new_node(False)
             temp.child.insert(0, self.root)
             self.split_child(temp, 0)
             self.root = temp  # Update root
@@ -72,26 +446,26 @@ class BTree:
         This function inserts a key into a non-full node.
         Parameters:
         x -- the node to insert the key
-        k -- the key to be inserted
+        k -- the (key, row_number) tuple to be inserted
         '''
-        i = 0  # Start from the beginning of the keys list
+        key, row_number = k
+        # Binary search for the first key that is not smaller than k
+        i = bisect_left(x.keys, key)
 
         if x.leaf:
-            # Find the position to insert the new key
-            while i < len(x.keys) and k > x.keys[i]:
-                i += 1
-            x.keys.insert(i, k)  # Insert the key at the found position
+            # Insert the key and its row number at the found position
+            x.keys.insert(i, key)
+            x.rows.insert(i, row_number)
         else:
-            # Find the child which is going to have the new key
-            while i < len(x.keys) and k > x.keys[i]:
-                i += 1
-
+            # a child shared with a snapshot is copied before it is changed
+            if self.readers:
+                self._own_child(x, i)
             # Split the child if it is full
             if len(x.child[i].keys) == (2 * self.t) - 1:
                 self.split_child(x, i)
                 # After splitting, the middle key of x.child[i] moves up and is now at x.keys[i]
                 # We need to decide whether to insert k to the left or right of this middle key
-                if k > x.keys[i]:
+                if key > x.keys[i]:
                     i += 1
 
             # Recursively insert the key in the child node
@@ -105,24 +479,112 @@ class BTree:
         x -- the parent node
         i -- the index of the child to split
         '''
+        if STATS.on:
+            STATS.count('splits')
         t = self.t
         left_child = x.child[i]
-        right_child = BTreeNode(left_child.leaf)
+        right_child = self._new_node(left_child.leaf)
         
         x.child.insert(i + 1, right_child)
         x.keys.insert(i, left_child.keys[t - 1])
+        x.rows.insert(i, left_child.rows[t - 1])
 
         right_child.keys = left_child.keys[t: (2 * t) - 1]
-        left_child.keys = left_child.keys[:t - 1]
+        right_child.rows = left_child.rows[t: (2 * t) - 1]
+        del left_child.keys[t - 1:]
+        del left_child.rows[t - 1:]
 
         if not left_child.leaf:
             right_child.child = left_child.child[t:]
-            left_child.child = left_child.child[:t]
-    
+            del left_child.child[t:]
+
+    @classmethod
+    @timed('build tree')
+    def from_sorted(cls, keys, t, fill_factor=1.0):
+        '''
+        Function from_sorted
+        This function builds a B tree bottom-up from keys that are already sorted.
+        Leaves are packed first, then every internal level is built from the separator keys of the level below.
+        Parameters:
+        keys -- a sorted list of (key, row_number) tuples
+        t -- the minimum degree of the B tree
+        fill_factor -- the fraction of the maximum node size to fill, between 0 and 1
+        Returns the new BTree object.
+        '''
+        if not 0 < fill_factor <= 1:
+            raise ValueError("Fill factor must be between 0 and 1")
+        tree = cls(t)
+        # number of keys per node, never fewer than the minimum of t - 1
+        capacity = max(t - 1, min(2 * t - 1, int((2 * t - 1) * fill_factor)))
+
+        level_keys = [key for key, _ in keys]
+        tree.typecode = keys_typecode(level_keys)
+        level_rows = [row_number for _, row_number in keys]
+        nodes = None  # the nodes of the level below, None while building the leaves
+        while True:
+            parents = []
+            separator_keys = []
+            separator_rows = []
+            child_start = 0
+            for start, end in tree._pack(len(level_keys), capacity):
+                node = tree._new_node(nodes is None)
+                node.keys.extend(level_keys[start:end])
+                node.rows.extend(level_rows[start:end])
+                if nodes is not None:
+                    node.child = nodes[child_start:child_start + end - start + 1]
+                    child_start += end - start + 1
+                # the key right after a group separates it from the next group
+                if end < len(level_keys):
+                    separator_keys.append(level_keys[end])
+                    separator_rows.append(level_rows[end])
+                parents.append(node)
+            nodes = parents
+            # every separator sits between two nodes of the level below, so keep packing until one node is left
+            if len(nodes) == 1:
+                break
+            level_keys = separator_keys
+            level_rows = separator_rows
+        tree.root = nodes[0]
+        return tree
+
+    def bulk_load(self, keys, fill_factor=1.0):
+        '''
+        Function bulk_load
+        This function sorts the keys once and replaces the content of the B tree with a bottom-up build.
+        Parameters:
+        keys -- an iterable of (key, row_number) tuples
+        fill_factor -- the fraction of the maximum node size to fill, between 0 and 1
+        '''
+        tree = self.from_sorted(sorted(keys), self.t, fill_factor)
+        self.typecode = tree.typecode
+        self.root = tree.root
+
+    def _pack(self, n, capacity):
+        '''
+        Function _pack
+        This function splits n sorted keys into groups of at most capacity keys, with one separator key between two groups.
+        The keys are spread evenly so that each group holds at least t - 1 keys.
+        Parameters:
+        n -- the number of keys
+        capacity -- the maximum number of keys per group
+        Returns the list of (start, end) index ranges of the groups. The separator after a group is the key at index end.
+        '''
+        # m groups use m - 1 separators, so m groups hold n - m + 1 keys
+        m = -(-(n + 1) // (capacity + 1))
+        m = max(1, min(m, (n + 1) // self.t))
+        size, extra = divmod(n - m + 1, m)
+        spans = []
+        start = 0
+        for g in range(m):
+            end = start + size + (1 if g < extra else 0)
+            spans.append((start, end))
+            start = end + 1
+        return spans
+
     def searching(self, k, x=None):
         '''
         Function search_key
-        This function searches for a key in the B tree.
+        This function searches for a key in the B tree with a single loop from the node down to a leaf.
         Parameters:
         k -- the key to search
         x -- the node to start the search from
@@ -130,103 +592,274 @@ class BTree:
         '''
         if x is None:
             x = self.root  # Start from the root if no node is provided
-        i = 0
-        # Navigate through the keys of the node to find the possible location of the key
-        # Make sure k[0] is compared with x.keys[i][0] since both are tuples
-        while i < len(x.keys) and k > x.keys[i][0]:
-            i += 1
-        # Check if the key is found in the current node
-        if i < len(x.keys) and k == x.keys[i][0]:
-            return (x, i)
-        elif x.leaf:  # If reached a leaf node, the key is not present
-            return None
-        else:  # Otherwise, move to the appropriate child node
-            return self.searching(k, x.child[i])
+            if STATS.on:
+                self._trace('gets', k)
+        while True:
+            # Binary search to find the possible location of the key
+            i = bisect_left(x.keys, k)
+            # Check if the key is found in the current node
+            if i < len(x.keys) and k == x.keys[i]:
+                return (x, i)
+            if x.leaf:  # If reached a leaf node, the key is not present
+                return None
+            x = x.child[i]  # Otherwise, move to the appropriate child node
 
-    def delete(self, k, x=None):
+    def get(self, k, default=None):
         '''
-        Function delete
-        This function deletes a key from the B tree.
+        Function get
+        This function looks up the row number of a key without building a (node, index) result.
         Parameters:
-        k -- the key to delete
-        x -- the node to start the deletion from     
+        k -- the key to search
+        default -- the value to return if the key is not in the B tree
+        Returns the row number of the key if found, otherwise default.
         '''
+        if STATS.on:
+            self._trace('gets', k)
+        x = self.root
+        while True:
+            keys = x.keys
+            i = bisect_left(keys, k)
+            if i < len(keys) and k == keys[i]:
+                return x.rows[i]
+            if x.leaf:
+                return default
+            x = x.child[i]
 
-        if not x:
-            x = self.root
-        t = self.t
-        # Find the index of the key or the child which should have the key
-        result = self.searching(k, x) 
-        if result:
-            x, i = result
-        else:
-            print(f"Key {k} not found in the B-tree")
-            return
+    def __contains__(self, k):
+        return self.get(k) is not None
 
-        if x.leaf:
-            # If the key is in a leaf node and matches, remove it directly
-            x.keys.pop(i)
-            return
-        # Key is not in leaf, handle internal node case
-        if len(x.child[i].keys) >= t:
-            
-            x.keys[i] = self.delete_predecessor(x.child[i])
-        elif len(x.child[i + 1].keys) >= t:
-            x.keys[i] = self.delete_successor(x.child[i + 1])
-        else:
-            self.merge_nodes(x, i)
-            
-            # After merging, the key count decreases, continue deletion on the merged node
-            if i < len(x.child):
-                self.delete(k, x.child[i])
+    def search_many(self, keys):
+        '''
+        Function search_many
+        This function looks up many keys with one shared traversal of the B tree.
+        The probe keys are sorted, so every node on the way down is visited once for all the probes that pass through it.
+        Parameters:
+        keys -- an iterable of keys, a NumPy array or a pandas Series
+        Returns a list of row numbers in the order of the keys, with None for keys that are not found.
+        '''
+        # NumPy arrays and pandas Series convert to plain Python values in one call
+        keys = keys.tolist() if hasattr(keys, 'tolist') else list(keys)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        probes = [keys[j] for j in order]
+        results = [None] * len(keys)
 
+        # each entry is a node and the range of sorted probes that belong to its subtree
+        stack = [(self.root, 0, len(probes))]
+        while stack:
+            x, p, end = stack.pop()
+            node_keys = x.keys
+            i = 0
+            while p < end:
+                k = probes[p]
+                # probes are sorted, so the position in the node never moves left
+                i = bisect_left(node_keys, k, i)
+                if i < len(node_keys) and k == node_keys[i]:
+                    results[order[p]] = x.rows[i]
+                    p += 1
+                elif x.leaf:
+                    p += 1
+                else:
+                    # every following probe smaller than node_keys[i] goes down to the same child
+                    child_end = bisect_left(probes, node_keys[i], p, end) if i < len(node_keys) else end
+                    stack.append((x.child[i], p, child_end))
+                    p = child_end
+        return results
 
-    def delete_predecessor(self, x):
+    def range(self, lo=None, hi=None, inclusive="left"):
         '''
-        Function delete_predecessor
-        This function follows the left subtree until the rightmost key
-            is found (predecessor), and removes the predecessor
-            ensuring the node meets the B-tree properties.
+        Function range
+        This function lazily yields the (key, row_number) tuples with a key between lo and hi in key order.
+        The tree is walked with an explicit stack, so no list of keys is built. The tree must not change while iterating.
         Parameters:
-        x -- the node to start from
+        lo -- the lower bound of the keys, None for no lower bound
+        hi -- the upper bound of the keys, None for no upper bound
+        inclusive -- which bounds are included: "both", "neither", "left" or "right", as in pandas Series.between
         '''
-        if x.leaf:
-            return x.keys.pop()
+        if inclusive not in ("both", "neither", "left", "right"):
+            raise ValueError("inclusive must be 'both', 'neither', 'left' or 'right'")
+        lo_search = bisect_left if inclusive in ("both", "left") else bisect_right
+        hi_closed = inclusive in ("both", "right")
+        hi_search = bisect_right if hi_closed else bisect_left
 
-    # Recursive case: Ensure the last child has enough keys, rebalance if necessary
-        if len(x.child[-1].keys) < self.t:
-            self.rebalance_before_delete(x, len(x.child) - 1)
+        # each entry is a node and the index of the next key to yield from it
+        stack = []
+        x = self.root
+        while True:
+            i = 0 if lo is None else lo_search(x.keys, lo)
+            stack.append((x, i))
+            if x.leaf:
+                break
+            x = x.child[i]
 
-        # Recur on the last child
-        return self.delete_predecessor(x.child[-1])
+        while stack:
+            x, i = stack.pop()
+            keys = x.keys
+            if x.leaf:
+                end = len(keys) if hi is None else hi_search(keys, hi, i)
+                rows = x.rows
+                for j in range(i, end):
+                    yield keys[j], rows[j]
+                if end < len(keys):
+                    return
+            elif i < len(keys):
+                if hi is not None and (keys[i] > hi or (keys[i] == hi and not hi_closed)):
+                    return
+                yield keys[i], x.rows[i]
+                stack.append((x, i + 1))
+                # continue with the leftmost path of the next child
+                x = x.child[i + 1]
+                while True:
+                    stack.append((x, 0))
+                    if x.leaf:
+                        break
+                    x = x.child[0]
 
-    def delete_successor(self, x):
-        """
-        Follows the right subtree until the leftmost key is found (successor),
-        and removes the successor, ensuring the node meets the B-tree properties.
-        """
-        # Traverse until a leaf is found
-        if x.leaf:
-            return x.keys.pop(0)
-    # Recursive case: Ensure the first child has enough keys, rebalance if necessary
-        if len(x.child[0].keys) < self.t:
-            self.rebalance_before_delete(x, 0)
+    def items(self):
+        '''
+        Function items
+        This function lazily yields all (key, row_number) tuples of the B tree in key order.
+        '''
+        return self.range()
+
+    def delete(self, k):
+        '''
+        Function delete
+        This function deletes a key from the B tree in a single pass from the root down to a leaf.
+        Before going down into a child with only t - 1 keys, the child borrows a key from a sibling or is merged with it,
+        so the key can always be removed where it is found.
+        Parameters:
+        k -- the key to delete
+        Returns True if the key was deleted, False if it is not in the B tree.
+        '''
+        leaf, k, _ = self._delete_descent(k)
+        i = bisect_left(leaf.keys, k)
+        if i < len(leaf.keys) and k == leaf.keys[i]:
+            leaf.keys.pop(i)
+            leaf.rows.pop(i)
+            return True
+        return False
+
+    def delete_many(self, keys):
+        '''
+        Function delete_many
+        This function deletes a batch of keys. The keys are sorted, and the keys that fall in the leaf reached by the
+        previous descent are removed from it directly, as long as the leaf keeps t - 1 keys, so a run of nearby keys
+        shares one descent.
+        Parameters:
+        keys -- the keys to delete
+        Returns the number of keys deleted, the keys that are not found are skipped.
+        '''
+        keys = sorted(keys)
+        deleted = 0
+        j = 0
+        while j < len(keys):
+            leaf, k, hi = self._delete_descent(keys[j])
+            j += 1
+            while True:
+                i = bisect_left(leaf.keys, k)
+                if i < len(leaf.keys) and k == leaf.keys[i]:
+                    leaf.keys.pop(i)
+                    leaf.rows.pop(i)
+                    deleted += 1
+                if j == len(keys) or (hi is not None and keys[j] >= hi):
+                    break
+                if leaf is not self.root and len(leaf.keys) < self.t:
+                    break
+                k = keys[j]
+                j += 1
+        return deleted
 
-        # Recur on the first child
-        return self.delete_successor(x.child[0])
+    def _delete_descent(self, k):
+        '''
+        Function _delete_descent
+        This function goes down from the root to the leaf a key is deleted from, making sure every node it enters
+        has at least t keys. A key found in an internal node is replaced by its predecessor or its successor, which
+        is then the key to delete from the leaf, or is pulled down into the merge of its two children.
+        Parameters:
+        k -- the key to delete
+        Returns the leaf, the key to remove from it, and the upper bound of the keys the leaf holds (None if there is none).
+        '''
+        if STATS.on:
+            self._trace('deletes', k)
+        t = self.t
+        x = self._own_root() if self.readers else self.root
+        hi = None
+        replaced = False
+        while not x.leaf:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and k == x.keys[i]:
+                left, right = x.child[i], x.child[i + 1]
+                if len(left.keys) >= t:
+                    leaf = left
+                    while not leaf.leaf:
+                        leaf = leaf.child[-1]
+                    x.keys[i], x.rows[i] = leaf.keys[-1], leaf.rows[-1]
+                    k, c, replaced = leaf.keys[-1], i, True
+                elif len(right.keys) >= t:
+                    leaf = right
+                    while not leaf.leaf:
+                        leaf = leaf.child[0]
+                    x.keys[i], x.rows[i] = leaf.keys[0], leaf.rows[0]
+                    k, c, replaced = leaf.keys[0], i + 1, True
+                else:
+                    # both children are minimal: k goes down into their merge
+                    self.merge_nodes(x, i)
+                    c = i
+            else:
+                if len(x.child[i].keys) < t:
+                    i = self.fill_child(x, i)
+                c = i
+            # the key is removed below the child, so a child shared with a snapshot is copied first
+            child = self._own_child(x, c) if self.readers else x.child[c]
+            if i < len(x.keys):
+                hi = x.keys[i]
+            # shrink the tree when a merge took the last key of the root
+            if x is self.root and not x.keys:
+                self.root = child
+            x = child
+        # after a replacement no other key of a batch can be in the leaf
+        return x, k, k if replaced else hi
 
-    def rebalance_before_delete(self, x, idx):
+    def fill_child(self, x, i):
         '''
-        Function rebalance_before_delete
-        This function rebalances the node before deletion.
+        Function fill_child
+        This function makes sure the child x.child[i] has at least t keys, first by borrowing a key from the left
+        or right sibling through the parent, otherwise by merging it with a sibling.
         Parameters:
         x -- the parent node
-        idx -- the index of the child node to rebalance
+        i -- the index of the child with t - 1 keys
+        Returns the index of the child that now covers the range of x.child[i].
         '''
-        if idx > 0:
-            self.merge_nodes(x, idx - 1)
-        else:
-            self.merge_nodes(x, idx)
+        if STATS.on:
+            STATS.count('fills')
+        child = x.child[i]
+        if i > 0 and len(x.child[i - 1].keys) >= self.t:
+            if self.readers:
+                child, left = self._own_child(x, i), self._own_child(x, i - 1)
+            else:
+                left = x.child[i - 1]
+            child.keys.insert(0, x.keys[i - 1])
+            child.rows.insert(0, x.rows[i - 1])
+            x.keys[i - 1], x.rows[i - 1] = left.keys.pop(), left.rows.pop()
+            if not child.leaf:
+                child.child.insert(0, left.child.pop())
+            return i
+        if i < len(x.child) - 1 and len(x.child[i + 1].keys) >= self.t:
+            if self.readers:
+                child, right = self._own_child(x, i), self._own_child(x, i + 1)
+            else:
+                right = x.child[i + 1]
+            child.keys.append(x.keys[i])
+            child.rows.append(x.rows[i])
+            x.keys[i], x.rows[i] = right.keys.pop(0), right.rows.pop(0)
+            if not child.leaf:
+                child.child.append(right.child.pop(0))
+            return i
+        if i < len(x.child) - 1:
+            self.merge_nodes(x, i)
+            return i
+        self.merge_nodes(x, i - 1)
+        return i - 1
 
     def merge_nodes(self, x, idx):
         '''
@@ -236,16 +869,21 @@ class BTree:
         x -- the parent node
         idx -- the index of the child node to merge
         '''
-        left_child = x.child[idx]
+        if STATS.on:
+            STATS.count('merges')
+        # the right child is only read, it leaves the tree
+        left_child = self._own_child(x, idx) if self.readers else x.child[idx]
         right_child = x.child[idx + 1]
         left_child.keys.append(x.keys.pop(idx))
+        left_child.rows.append(x.rows.pop(idx))
         left_child.keys.extend(right_child.keys)
+        left_child.rows.extend(right_child.rows)
         if not left_child.leaf:
             left_child.child.extend(right_child.child)
         x.child.pop(idx + 1)
     
     # Print the tree
-    def print_tree(self, x, l=0, prefix=""):
+    def print_tree(self, x, l=0, prefix="", max_level=None):
         '''
         Function print_tree
         This function prints the B tree.
@@ -253,6 +891,7 @@ class BTree:
         x -- the node to start printing from
         l -- the level of the node
         prefix -- the prefix to print before the node
+        max_level -- the number of levels to print, all of them if None
         '''
         if l == 0:
             print("Root:", end=" ")
@@ -261,55 +900,569 @@ class BTree:
 
         # Print the current node's keys
         print("[", end="")
-        for i, key in enumerate(x.keys):
+        entries = x.entries()
+        for i, key in enumerate(entries):
             print(key, end="")
-            if i < len(x.keys) - 1:
+            if i < len(entries) - 1:
                 print(", ", end="")
         print("]")
 
         # Recursively print child nodes with an updated prefix
-        if not x.leaf:
+        if not x.leaf and (max_level is None or l + 1 < max_level):
             for i, child in enumerate(x.child):
                 child_prefix = prefix + " " * (12 + l * 4)  # Adjust spacing based on level
-                self.print_tree(child, l + 1, child_prefix)
+                self.print_tree(child, l + 1, child_prefix, max_level)
 
-    def visualize(self):
+    def visualize(self, max_level=None, max_children=None, path=None):
         '''
         Function visualize
         This function visualizes the B tree.
+        Parameters:
+        max_level -- the number of levels to draw, all of them if None
+        max_children -- the largest number of children drawn under a node, all of them if None
+        path -- an image file to save the drawing to instead of showing it
         '''
-        def add_edges(graph, node, pos, x=0, y=0, level=1, width=1.0):
-            if node is not None:
-                pos[node] = (x, y)
-                if not node.leaf:
-                    dx = width / len(node.child)  # Width divided by the number of children
-                    next_x = x - width / 2 + dx / 2  # Centering children under the parent node
-                    for child in node.child:
-                        graph.add_edge(node, child)
-                        add_edges(graph, child, pos, x=next_x, y=y-2, level=level+1, width=dx)  # Pass the new width to the next level
-                        next_x += dx
-
-        graph = nx.DiGraph()
-        pos = {}
-        add_edges(graph, self.root, pos)
+        draw_tree(self.root, max_level, max_children, path)
 
-        fig, ax = plt.subplots(figsize=(12, 8))
-        nx.draw(graph, pos, ax=ax, with_labels=False, node_size=3, arrowsize=20)
+    def freeze(self, max_level=None, max_children=None):
+        '''
+        Function freeze
+        This function copies the part of the B tree that visualize would draw, see freeze_tree.
+        '''
+        return freeze_tree(self.root, max_level, max_children)
 
-        # Draw node labels with each key on a new line
-        for node, (x, y) in pos.items():
-            label = '\n'.join(str(key) for key in node.keys)
-            ax.text(x, y, label, fontsize=12, ha='center', va='center',
-                    bbox=dict(facecolor='lightblue', edgecolor='black', boxstyle='round,pad=0.2'))  # Changed facecolor to 'lightgray'
+    def stats(self):
+        '''
+        Function stats
+        This function measures the shape of the B tree in one pass over its nodes, see tree_stats.
+        '''
+        return tree_stats(self.root, self.t)
 
-        plt.show()
+    def check(self):
+        '''
+        Function check
+        This function checks the key order, the number of keys of every node and the depth of the leaves, see check_tree.
+        Returns a list of the problems found, empty if the B tree is valid.
+        '''
+        return check_tree(self.root, self.t)
+
+    def snapshot(self):
+        '''
+        Function snapshot
+        This function returns a read-only view of the B tree as it is now, in constant time.
+        The view shares every node with the tree. While a view is open, an insert or a delete copies each shared node
+        on its path before changing it and links the copy into the copied parent (path copying), so the view never
+        sees a change. Nodes that only an old view still holds are freed with the view.
+        Returns the TreeSnapshot object, close it, or use it in a with statement, when it is no longer read.
+        Raises TypeError for a tree whose copy_on_write is False, e.g. a BPlusTree or a ConcurrentBTree.
+        '''
+        if not self.copy_on_write:
+            raise TypeError(f"{type(self).__name__} changes its nodes in place and cannot take snapshots, "
+                            f"use a BTree, whose copy_on_write is True, to read it while it changes")
+        # every node created so far is now shared with the view
+        self.version += 1
+        return TreeSnapshot(self)
+
+    def _own_root(self):
+        '''
+        Function _own_root
+        This function copies the root if it is shared with a snapshot.
+        Returns the root, which can be changed in place.
+        '''
+        root = self.root
+        if root.version < self.version:
+            root = self.root = self._copy_node(root)
+        return root
+
+    def _own_child(self, x, i):
+        '''
+        Function _own_child
+        This function copies the child x.child[i] if it is shared with a snapshot. x must already be owned.
+        Returns the child, which can be changed in place.
+        '''
+        child = x.child[i]
+        if child.version < self.version:
+            child = x.child[i] = self._copy_node(child)
+        return child
+
+    def _copy_node(self, x):
+        if STATS.on:
+            STATS.count('node_copies')
+        node = self._new_node(x.leaf)
+        node.keys = x.keys[:]
+        node.rows = x.rows[:]
+        node.child = x.child[:]
+        return node
+
+
+class TreeSnapshot:
+    '''
+    Class TreeSnapshot
+    This class is a read-only view of a B tree, returned by BTree.snapshot. It has the read methods of BTree:
+    get, searching, search_many, range, items, print_tree, visualize, freeze, stats and check.
+    - close: stop the copy-on-write for this view, also done when the view is garbage collected
+    '''
+    def __init__(self, tree):
+        self.tree = tree
+        self.root = tree.root
+        self.t = tree.t
+        self.typecode = tree.typecode
+        self.closed = False
+        tree.readers.add(id(self))
+
+    get = BTree.get
+    searching = BTree.searching
+    __contains__ = BTree.__contains__
+    search_many = BTree.search_many
+    range = BTree.range
+    items = BTree.items
+    print_tree = BTree.print_tree
+    visualize = BTree.visualize
+    freeze = BTree.freeze
+    stats = BTree.stats
+    check = BTree.check
+    _trace = BTree._trace
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.tree.readers.discard(id(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __del__(self):
+        self.close()
+
+
+class BPlusTreeNode(BTreeNode):
+    '''
+    Class BPlusTreeNode
+    This class represents a node in the B+ tree.
+    Internal nodes store separator keys only, leaves store keys with their row numbers and are linked to their siblings.
+    '''
+    __slots__ = ('next', 'prev')
+
+    def __init__(self, leaf=False, typecode=None):
+        super().__init__(leaf, typecode)
+        self.next = None  # right sibling leaf
+        self.prev = None  # left sibling leaf
+
+    def entries(self):
+        '''
+        Function entries
+        This function returns the (key, row_number) tuples of a leaf or the separator keys of an internal node, for display.
+        '''
+        return super().entries() if self.leaf else list(self.keys)
+
+class BPlusTree(BTree):
+    '''
+    class BPlusTree
+    This class represents a B+ tree with the same interface as BTree. Only the leaves hold row numbers,
+    the internal nodes hold separator keys: child i holds the keys k with keys[i - 1] <= k < keys[i].
+    The leaves form a doubly linked list, so ordered scans never go back up through the internal nodes.
+    '''
+    # a copied leaf would need copies of its neighbours in the list, and of theirs, so there are no snapshots
+    copy_on_write = False
+
+    def _new_node(self, leaf):
+        return BPlusTreeNode(leaf, self.typecode)
+
+    def _trace(self, op, k):
+        '''
+        Function _trace
+        This function counts an operation and the nodes on the path from the root to the leaf of its key,
+        when the instrumentation is on.
+        Parameters:
+        op -- the counter of the operation, e.g. "gets"
+        k -- the key
+        '''
+        STATS.count(op)
+        x = self.root
+        STATS.visit(x)
+        while not x.leaf:
+            x = x.child[bisect_right(x.keys, k)]
+            STATS.visit(x)
+
+    def insertion(self, k):
+        '''
+        Function insertion
+        This function inserts a key into the B+ tree.
+        Parameters:
+        k -- the (key, row_number) tuple to be inserted
+        '''
+        if STATS.on:
+            self._trace('inserts', k[0])
+        root = self.root
+        if root.leaf and not root.keys:  # The key storage of an empty tree follows the type of its first key
+            self.typecode = key_typecode(k[0])
+            root = self.root = self._new_node(True)
+        elif self.typecode and not key_typecode(k[0]):
+            self._widen_keys()
+        if len(root.keys) == (2 * self.t) - 1:  # If root is full, split it
+            temp = self._new_node(False)
+            temp.child.insert(0, root)
+            self.split_child(temp, 0)
+            self.root = temp
+        self.insert_none_full(self.root, k)
+
+    def insert_none_full(self, x, k):
+        '''
+        Function insert_none_full
+        This function inserts a key into a non-full node.
+        Parameters:
+        x -- the node to insert the key
+        k -- the (key, row_number) tuple to be inserted
+        '''
+        key, row_number = k
+        if x.leaf:
+            i = bisect_left(x.keys, key)
+            x.keys.insert(i, key)
+            x.rows.insert(i, row_number)
+            return
+        i = bisect_right(x.keys, key)
+        # Split the child if it is full, the new separator decides which half gets the key
+        if len(x.child[i].keys) == (2 * self.t) - 1:
+            self.split_child(x, i)
+            if key >= x.keys[i]:
+                i += 1
+        self.insert_none_full(x.child[i], k)
+
+    def split_child(self, x, i):
+        '''
+        Function split_child
+        This function splits a full child node. A leaf copies its first right key up as the separator,
+        an internal node moves its middle key up.
+        Parameters:
+        x -- the parent node
+        i -- the index of the child to split
+        '''
+        if STATS.on:
+            STATS.count('splits')
+        t = self.t
+        left_child = x.child[i]
+        right_child = self._new_node(left_child.leaf)
+        if left_child.leaf:
+            right_child.keys = left_child.keys[t:]
+            right_child.rows = left_child.rows[t:]
+            del left_child.keys[t:]
+            del left_child.rows[t:]
+            separator = right_child.keys[0]
+            # link the new leaf between left_child and its old right sibling
+            right_child.next = left_child.next
+            if right_child.next is not None:
+                right_child.next.prev = right_child
+            right_child.prev = left_child
+            left_child.next = right_child
+        else:
+            separator = left_child.keys[t - 1]
+            right_child.keys = left_child.keys[t:]
+            del left_child.keys[t - 1:]
+            right_child.child = left_child.child[t:]
+            del left_child.child[t:]
+        x.keys.insert(i, separator)
+        x.child.insert(i + 1, right_child)
+
+    @classmethod
+    @timed('build tree')
+    def from_sorted(cls, keys, t, fill_factor=1.0):
+        '''
+        Function from_sorted
+        This function builds a B+ tree bottom-up from keys that are already sorted.
+        Parameters:
+        keys -- a sorted list of (key, row_number) tuples
+        t -- the minimum degree of the B+ tree
+        fill_factor -- the fraction of the maximum node size to fill, between 0 and 1
+        Returns the new BPlusTree object.
+        '''
+        if not 0 < fill_factor <= 1:
+            raise ValueError("Fill factor must be between 0 and 1")
+        tree = cls(t)
+        tree.typecode = keys_typecode([key for key, _ in keys])
+        capacity = max(t - 1, min(2 * t - 1, int((2 * t - 1) * fill_factor)))
+
+        # leaves keep every key, so n keys are spread over m leaves of at least t - 1 keys
+        n = len(keys)
+        m = max(1, min(-(-n // capacity), n // (t - 1)))
+        size, extra = divmod(n, m)
+        nodes = []
+        start = 0
+        for g in range(m):
+            end = start + size + (1 if g < extra else 0)
+            leaf = tree._new_node(True)
+            leaf.keys.extend(key for key, _ in keys[start:end])
+            leaf.rows.extend(row_number for _, row_number in keys[start:end])
+            if nodes:
+                leaf.prev = nodes[-1]
+                nodes[-1].next = leaf
+            nodes.append(leaf)
+            start = end
+        separators = [leaf.keys[0] for leaf in nodes[1:]]
+
+        # the internal levels are packed like the ones of a B tree
+        while len(nodes) > 1:
+            parents = []
+            parent_separators = []
+            child_start = 0
+            for start, end in tree._pack(len(separators), capacity):
+                parent = tree._new_node(False)
+                parent.keys.extend(separators[start:end])
+                parent.child = nodes[child_start:child_start + end - start + 1]
+                child_start += end - start + 1
+                if end < len(separators):
+                    parent_separators.append(separators[end])
+                parents.append(parent)
+            nodes = parents
+            separators = parent_separators
+        tree.root = nodes[0]
+        return tree
+
+    def find_leaf(self, k, x=None):
+        '''
+        Function find_leaf
+        This function finds the leaf that holds the range of a key.
+        Parameters:
+        k -- the key to search
+        x -- the node to start the search from
+        Returns the leaf node.
+        '''
+        if x is None:
+            x = self.root
+        while not x.leaf:
+            x = x.child[bisect_right(x.keys, k)]
+        return x
+
+    def searching(self, k, x=None):
+        '''
+        Function searching
+        This function searches for a key in the B+ tree.
+        Parameters:
+        k -- the key to search
+        x -- the node to start the search from
+        Returns the leaf and index of the key if found, otherwise None.
+        '''
+        if x is None and STATS.on:
+            self._trace('gets', k)
+        x = self.find_leaf(k, x)
+        i = bisect_left(x.keys, k)
+        if i < len(x.keys) and k == x.keys[i]:
+            return (x, i)
+        return None
+
+    def get(self, k, default=None):
+        '''
+        Function get
+        This function looks up the row number of a key.
+        Parameters:
+        k -- the key to search
+        default -- the value to return if the key is not in the B+ tree
+        Returns the row number of the key if found, otherwise default.
+        '''
+        if STATS.on:
+            self._trace('gets', k)
+        x = self.root
+        while not x.leaf:
+            x = x.child[bisect_right(x.keys, k)]
+        keys = x.keys
+        i = bisect_left(keys, k)
+        if i < len(keys) and k == keys[i]:
+            return x.rows[i]
+        return default
+
+    def search_many(self, keys):
+        '''
+        Function search_many
+        This function looks up many keys with one shared traversal of the B+ tree.
+        Parameters:
+        keys -- an iterable of keys, a NumPy array or a pandas Series
+        Returns a list of row numbers in the order of the keys, with None for keys that are not found.
+        '''
+        keys = keys.tolist() if hasattr(keys, 'tolist') else list(keys)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        probes = [keys[j] for j in order]
+        results = [None] * len(keys)
+
+        stack = [(self.root, 0, len(probes))]
+        while stack:
+            x, p, end = stack.pop()
+            node_keys = x.keys
+            i = 0
+            if x.leaf:
+                for p in range(p, end):
+                    i = bisect_left(node_keys, probes[p], i)
+                    if i < len(node_keys) and probes[p] == node_keys[i]:
+                        results[order[p]] = x.rows[i]
+                continue
+            while p < end:
+                i = bisect_right(node_keys, probes[p], i)
+                # every following probe smaller than the next separator goes down to the same child
+                child_end = bisect_left(probes, node_keys[i], p, end) if i < len(node_keys) else end
+                stack.append((x.child[i], p, child_end))
+                p = child_end
+        return results
+
+    def range(self, lo=None, hi=None, inclusive="left"):
+        '''
+        Function range
+        This function lazily yields the (key, row_number) tuples with a key between lo and hi in key order.
+        It descends once to the leaf of lo and then follows the leaf links. The tree must not change while iterating.
+        Parameters:
+        lo -- the lower bound of the keys, None for no lower bound
+        hi -- the upper bound of the keys, None for no upper bound
+        inclusive -- which bounds are included: "both", "neither", "left" or "right", as in pandas Series.between
+        '''
+        if inclusive not in ("both", "neither", "left", "right"):
+            raise ValueError("inclusive must be 'both', 'neither', 'left' or 'right'")
+        lo_search = bisect_left if inclusive in ("both", "left") else bisect_right
+        hi_search = bisect_right if inclusive in ("both", "right") else bisect_left
+
+        if lo is None:
+            x = self.root
+            while not x.leaf:
+                x = x.child[0]
+            i = 0
+        else:
+            x = self.find_leaf(lo)
+            i = lo_search(x.keys, lo)
+        while x is not None:
+            keys = x.keys
+            rows = x.rows
+            end = len(keys) if hi is None else hi_search(keys, hi, i)
+            for j in range(i, end):
+                yield keys[j], rows[j]
+            if end < len(keys):
+                return
+            x = x.next
+            i = 0
+
+    def stats(self):
+        '''
+        Function stats
+        This function measures the shape of the B+ tree, see tree_stats. Only the keys of the leaves are counted.
+        '''
+        return tree_stats(self.root, self.t, leaf_keys=True)
+
+    def check(self):
+        '''
+        Function check
+        This function checks the invariants of the B+ tree, see check_tree, and that the linked list of the leaves
+        visits the leaves in order.
+        Returns a list of the problems found, empty if the B+ tree is valid.
+        '''
+        problems = check_tree(self.root, self.t, b_plus=True)
+        leaves = []
+        level = [self.root]
+        while level:
+            leaves = level
+            level = [child for node in level if not node.leaf for child in node.child]
+        for i, leaf in enumerate(leaves):
+            prev = leaves[i - 1] if i > 0 else None
+            next_leaf = leaves[i + 1] if i + 1 < len(leaves) else None
+            if leaf.prev is not prev or leaf.next is not next_leaf:
+                problems.append(f"leaf {i}: not linked to its neighbours")
+        return problems
+
+    def _delete_descent(self, k):
+        '''
+        Function _delete_descent
+        This function goes down from the root to the leaf that holds a key. Before going down, a child with only
+        t - 1 keys borrows a key from a sibling or is merged with it, so the key can be removed from the leaf.
+        Parameters:
+        k -- the key to delete
+        Returns the leaf, the key, and the upper bound of the keys the leaf holds (None if there is none).
+        '''
+        if STATS.on:
+            self._trace('deletes', k)
+        x = self.root
+        hi = None
+        while not x.leaf:
+            i = bisect_right(x.keys, k)
+            if len(x.child[i].keys) < self.t:
+                i = self.fill_child(x, i)
+                # shrink the tree when the root lost its last separator
+                if x is self.root and not x.keys:
+                    self.root = x.child[0]
+            if i < len(x.keys):
+                hi = x.keys[i]
+            x = x.child[i]
+        return x, k, hi
+
+    def fill_child(self, x, i):
+        '''
+        Function fill_child
+        This function makes sure the child x.child[i] has at least t keys, first by borrowing from the left
+        or right sibling, otherwise by merging it with a sibling.
+        Parameters:
+        x -- the parent node
+        i -- the index of the child with t - 1 keys
+        Returns the index of the child that now covers the range of x.child[i].
+        '''
+        if STATS.on:
+            STATS.count('fills')
+        child = x.child[i]
+        if i > 0 and len(x.child[i - 1].keys) >= self.t:
+            left = x.child[i - 1]
+            if child.leaf:
+                child.keys.insert(0, left.keys.pop())
+                child.rows.insert(0, left.rows.pop())
+                x.keys[i - 1] = child.keys[0]
+            else:
+                child.keys.insert(0, x.keys[i - 1])
+                x.keys[i - 1] = left.keys.pop()
+                child.child.insert(0, left.child.pop())
+            return i
+        if i < len(x.child) - 1 and len(x.child[i + 1].keys) >= self.t:
+            right = x.child[i + 1]
+            if child.leaf:
+                child.keys.append(right.keys.pop(0))
+                child.rows.append(right.rows.pop(0))
+                x.keys[i] = right.keys[0]
+            else:
+                child.keys.append(x.keys[i])
+                x.keys[i] = right.keys.pop(0)
+                child.child.append(right.child.pop(0))
+            return i
+        if i < len(x.child) - 1:
+            self.merge_nodes(x, i)
+            return i
+        self.merge_nodes(x, i - 1)
+        return i - 1
+
+    def merge_nodes(self, x, idx):
+        '''
+        Function merge_nodes
+        This function merges the child x.child[idx + 1] into x.child[idx]. Leaves drop the separator,
+        internal nodes pull it down between the two key lists.
+        Parameters:
+        x -- the parent node
+        idx -- the index of the left child to merge
+        '''
+        if STATS.on:
+            STATS.count('merges')
+        left_child = x.child[idx]
+        right_child = x.child.pop(idx + 1)
+        separator = x.keys.pop(idx)
+        if left_child.leaf:
+            left_child.keys.extend(right_child.keys)
+            left_child.rows.extend(right_child.rows)
+            left_child.next = right_child.next
+            if left_child.next is not None:
+                left_child.next.prev = left_child
+        else:
+            left_child.keys.append(separator)
+            left_child.keys.extend(right_child.keys)
+            left_child.child.extend(right_child.child)
 
 
 def main():
     B = BTree(3)
     
     for i in range(80):
-        B.insertion((i, "o"))
+        B.insertion((i, i))
     print("construction done")
     B.print_tree(B.root)
     # for i in range(10):
@@ -322,15 +1475,15 @@ def main():
     B.print_tree(B.root)
     
     # for i in range(61, 200):
-    #     B.insertion((i, "o"))
-    # B.insertion((1, "o"))
-    # B.insertion((20, "o"))
-    # B.insertion((21, "o"))
+    #     B.insertion((i, i))
+    # B.insertion((1, 1))
+    # B.insertion((20, 20))
+    # B.insertion((21, 21))
     
     # print("deletion done")
     # B.print_tree(B.root)
     # for i in range(25):        
-    #     B.insertion((i, "o"))
+    #     B.insertion((i, i))
     # B.print_tree(B.root)
        
         
@@ -341,7 +1494,7 @@ def main():
     # result = B.searching(search_value)
     # if result is not None:
     #     node, index = result
-    #     print(f"Key {search_value} found in node with keys: {node.keys[index]} at index {index}")
+    #     print(f"Key {search_value} found in node with row number: {node.rows[index]} at index {index}")
     # else:
     #     print(f"Key {search_value} not found in the B-tree.")
 
@@ -350,7 +1503,7 @@ def main():
     #     B.delete(i)
     #     B.print_tree(B.root)
     # for i in range(100):
-    #     B.insertion((i, "o"))
+    #     B.insertion((i, i))
     #     print(f"Inserting {i}")
     #     B.print_tree(B.root)
 
@@ -0,0 +1,256 @@
+'''
+Batch mode of the mini database.
+
+Runs a script of commands without any prompt, one JSON object per line, read from a file or from stdin:
+{"op": "insert", "key": 101, "values": {"student_name": "Ann", "grade": 90}}
+{"op": "search", "key": 101}
+{"op": "search", "key": [2024, "Ann"]}                      (a composite key, --key year,name)
+{"op": "search_many", "keys": [1, 2, 101]}
+{"op": "range", "lo": 10, "hi": 20}
+{"op": "delete", "key": 101}
+{"op": "delete_many", "keys": [1, 2, 101]}
+{"op": "create_index", "column": "grade"}
+{"op": "query", "where": "grade >= 90 and grade_letter = A"}
+{"op": "drop_index", "name": "grade"}
+{"op": "stats"}                                             (the shape of the B tree and the problems found)
+The result of every command is written to stdout as a JSON line, in batches, and the latency percentiles of
+each operation are reported on stderr at the end.
+Usage: python batch.py (--key KEY[,KEY] (--data FILE | --columns A,B,C) | --snapshot FILE) [--encode-keys]
+                       [--chunk-size N] [--degree 64] [--tree btree|bplus] [--workers N] [--log DIRECTORY]
+                       [--group-commit N] [--group-commit-delay SECONDS] [--save-snapshot FILE] [--instrument FILE]
+                       [--profile FILE] [script]
+'''
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from b_tree_v0 import BTree, BPlusTree
+from engine import MiniDatabase
+from instrument import STATS
+from query import describe_plan, parse_where
+from read_data import CHUNK_SIZE, read_chunks, check_index, add_row_number, print_progress
+from render import Renderer, RENDER_MODES
+from row_store import RowStore
+
+# number of result lines written to the output at once
+OUTPUT_BATCH = 1000
+PERCENTILES = (50, 90, 99)
+
+
+def _to_json(value):
+    # NumPy scalars have item(), pandas missing values and anything else are written as text
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def run_command(db, command):
+    '''
+    Function run_command
+    This function runs one command on the database.
+    Parameters:
+    db -- the MiniDatabase object
+    command -- a dict with the "op" of the command and its arguments
+    Returns a dict with the result of the command.
+    '''
+    op = command.get('op')
+    if op == 'insert':
+        return {'row_number': db.insert(command['key'], command.get('values', {}))}
+    if op == 'search':
+        row = db.search(command['key'])
+        return {'found': row is not None, 'row': row}
+    if op == 'search_many':
+        rows, missing = db.search_many(command['keys'])
+        return {'rows': rows.to_dict('records'), 'missing': missing}
+    if op == 'range':
+        rows = db.range(command.get('lo'), command.get('hi'), command.get('inclusive', 'both'))
+        return {'rows': rows.to_dict('records')}
+    if op == 'delete':
+        row_number = db.delete(command['key'])
+        return {'found': row_number is not None, 'row_number': row_number}
+    if op == 'delete_many':
+        row_numbers, missing = db.delete_many(command['keys'])
+        return {'row_numbers': row_numbers, 'missing': missing}
+    if op == 'create_index':
+        index = db.create_index(command['column'], command.get('name'))
+        return {'rows': len(index)}
+    if op == 'drop_index':
+        db.drop_index(command['name'])
+        return {}
+    if op == 'query':
+        # the conditions are text, or a list of [column, operator, value]
+        where = command['where']
+        predicates = parse_where(where) if isinstance(where, str) else [tuple(predicate) for predicate in where]
+        rows, plan = db.query(predicates)
+        return {'plan': describe_plan(plan), 'rows': rows.to_dict('records')}
+    if op == 'stats':
+        if db.btree is None:
+            return {'stats': None, 'problems': []}
+        return {'stats': db.btree.stats(), 'problems': db.btree.check()}
+    raise ValueError(f"Unknown operation {op!r}")
+
+
+def run_commands(db, lines, out=None, output_batch=OUTPUT_BATCH):
+    '''
+    Function run_commands
+    This function runs a stream of JSON command lines back to back.
+    Parameters:
+    db -- the MiniDatabase object
+    lines -- an iterable of JSON lines, e.g. an open file
+    out -- a text file for the results, they are not written if None
+    output_batch -- the number of result lines written at once
+    Returns a dict of operation name to the list of latencies in seconds. Failed commands are counted under "error".
+    '''
+    latencies = {}
+    pending = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        start = time.perf_counter()
+        try:
+            command = json.loads(line)
+            # only the operation itself is timed
+            start = time.perf_counter()
+            result = run_command(db, command)
+            op = command['op']
+        except (KeyError, ValueError, TypeError) as error:
+            result = {'error': f"{type(error).__name__}: {error}"}
+            op = 'error'
+        latencies.setdefault(op, []).append(time.perf_counter() - start)
+        if out is not None:
+            result['line'] = number
+            pending.append(json.dumps(result, default=_to_json))
+            if len(pending) >= output_batch:
+                out.write('\n'.join(pending) + '\n')
+                pending.clear()
+    if out is not None and pending:
+        out.write('\n'.join(pending) + '\n')
+    return latencies
+
+
+def latency_report(latencies):
+    '''
+    Function latency_report
+    This function summarizes the latencies of each operation.
+    Parameters:
+    latencies -- the dict returned by run_commands
+    Returns a dict of operation name to its count, mean, percentiles and maximum in microseconds.
+    '''
+    report = {}
+    for op, values in latencies.items():
+        values = np.array(values) * 1e6
+        report[op] = {'count': len(values), 'mean_us': float(values.mean())}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            report[op][f'p{p}_us'] = float(value)
+        report[op]['max_us'] = float(values.max())
+    return report
+
+
+def open_database(args):
+    '''
+    Function open_database
+    This function creates the database of the command line arguments, or recovers it from the log directory.
+    Parameters:
+    args -- the parsed arguments
+    Returns the MiniDatabase object.
+    '''
+    renderer = Renderer(args.render)
+    if args.log:
+        db = MiniDatabase.recover(args.log, renderer, args.group_commit, args.group_commit_delay)
+        if db is not None:
+            return db
+    tree_type = BPlusTree if args.tree == 'bplus' else BTree
+    t = args.degree // 2
+    # several key columns separated by comma make a composite key
+    key = tuple(args.key.split(',')) if args.key and ',' in args.key else args.key
+    if args.snapshot:
+        # the snapshot has its own key, tree type and degree
+        db = MiniDatabase.load_snapshot(args.snapshot, renderer)
+    elif args.data:
+        # the file is indexed a chunk at a time while it is read, with the progress on stderr
+        progress = None if args.quiet else lambda rows, seconds: print_progress(rows, seconds, sys.stderr)
+        # with several workers the whole table is read first and its keys are sorted in parallel
+        db = MiniDatabase.from_chunks(read_chunks(args.data, args.chunk_size), key, t if args.workers == 1 else None,
+                                      tree_type, renderer, progress, args.encode_keys)
+        if args.workers != 1:
+            db.build_index(t, args.workers)
+    else:
+        data = pd.DataFrame(columns=args.columns.split(','))
+        check_index(data, key)
+        db = MiniDatabase(RowStore.from_frame(add_row_number(data)), None, key, tree_type, renderer,
+                          args.encode_keys)
+        db.create_tree(t)
+    if args.log:
+        db.open_log(args.log, args.group_commit, args.group_commit_delay)
+    return db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script of JSON commands on the mini database.")
+    parser.add_argument('script', nargs='?', help="the JSON lines script, stdin if not given")
+    parser.add_argument('--key', help="the indexed column, or columns separated by comma for a composite key, "
+                                      "required with --data and --columns")
+    parser.add_argument('--encode-keys', action='store_true', help="store the keys as order-preserving bytes")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', help="an excel, csv or parquet file to load")
+    source.add_argument('--columns', help="the comma separated columns of a new empty table")
+    source.add_argument('--snapshot', help="a snapshot file written by --save-snapshot")
+    parser.add_argument('--degree', type=int, default=64, help="the maximum degree of the B tree (default 64)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows read at a time from --data")
+    parser.add_argument('--tree', choices=['btree', 'bplus'], default='btree')
+    parser.add_argument('--workers', type=int, default=1, help="processes that sort the keys of --data to build "
+                                                               "the index, for a key of one integer column (default 1)")
+    parser.add_argument('--log', help="a directory for the write-ahead log, recovered if it has a checkpoint")
+    parser.add_argument('--group-commit', type=int, default=1,
+                        help="log records per fsync (default 1). Above 1 the log is faster, but a crash loses the "
+                             "records of the batch not written yet")
+    parser.add_argument('--group-commit-delay', type=float,
+                        help="write a batch of the log at most this many seconds after its first record")
+    parser.add_argument('--render', choices=RENDER_MODES, default='off')
+    parser.add_argument('--save-snapshot', help="write the table and the index to a snapshot file at the end")
+    parser.add_argument('--quiet', action='store_true', help="do not write the results")
+    parser.add_argument('--instrument', help="count node visits, splits and merges and time the phases of the run, "
+                                             "written to this JSON file at the end")
+    parser.add_argument('--profile', help="write a cProfile capture of the commands to this pstats file")
+    args = parser.parse_args(argv)
+    if args.degree < 4:
+        parser.error("the degree must be at least 4")
+    if args.key is None and not args.snapshot:
+        parser.error("--key is required with --data and --columns")
+
+    if args.instrument:
+        STATS.enable()
+    db = open_database(args)
+    script = open(args.script) if args.script else sys.stdin
+    start = time.perf_counter()
+    try:
+        if args.profile:
+            STATS.start_profile(args.profile)
+        latencies = run_commands(db, script, None if args.quiet else sys.stdout)
+    finally:
+        if STATS.profiler is not None:
+            STATS.stop_profile()
+        if script is not sys.stdin:
+            script.close()
+        if args.save_snapshot:
+            db.save_snapshot(args.save_snapshot)
+        db.close()
+    elapsed = time.perf_counter() - start
+    if args.instrument:
+        STATS.add_time('commands', elapsed)
+        STATS.dump(args.instrument)
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} commands in {elapsed:.3f} s, {total / elapsed if elapsed else 0:,.0f} ops/s", file=sys.stderr)
+    print(f"{'op':>12} {'count':>8} {'mean us':>10} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'max us':>10}",
+          file=sys.stderr)
+    for op, stats in latency_report(latencies).items():
+        print(f"{op:>12} {stats['count']:>8} {stats['mean_us']:>10.1f} {stats['p50_us']:>10.1f} "
+              f"{stats['p90_us']:>10.1f} {stats['p99_us']:>10.1f} {stats['max_us']:>10.1f}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
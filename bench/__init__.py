@@ -0,0 +1,6 @@
+'''
+Benchmarks for the mini database.
+Run a benchmark from the project root, e.g. python -m bench.bulk_load
+bench.generate writes synthetic student tables of any size, and bench.suite runs the main B tree workloads across
+degrees and table sizes and compares them with a saved baseline.
+'''
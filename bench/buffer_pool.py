@@ -0,0 +1,61 @@
+'''
+Benchmark: buffer pool size and eviction policy for the page-file B tree
+
+Looks up keys in a page-file index where most lookups fall in a few hot ID ranges of a much larger table,
+and prints the hit rate and lookup throughput for several pool sizes with LRU and CLOCK eviction.
+A pool of one page decodes nearly every page on every lookup, like an index without a pool.
+Usage: python -m bench.buffer_pool [rows]
+'''
+import os
+import random
+import sys
+import tempfile
+import time
+
+from b_tree_v0 import BTree
+from disk_btree import DiskBTree
+
+
+def hot_range_workload(n, lookups, hot_ranges=3, hot_width=2000, hot_share=0.95):
+    '''
+    Function hot_range_workload
+    This function draws lookup keys: hot_share of them in a few narrow ranges, the rest anywhere in the table.
+    Returns the list of keys.
+    '''
+    starts = [random.randrange(n - hot_width) for _ in range(hot_ranges)]
+    keys = []
+    for _ in range(lookups):
+        if random.random() < hot_share:
+            keys.append(random.choice(starts) + random.randrange(hot_width))
+        else:
+            keys.append(random.randrange(n))
+    return keys
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    path = os.path.join(tempfile.gettempdir(), 'bench_buffer_pool.idx')
+    btree = BTree(16)
+    btree.bulk_load(zip(range(n), range(n)))
+    DiskBTree.from_btree(path, btree).close()
+    del btree
+
+    random.seed(8)
+    probes = hot_range_workload(n, 100000)
+    print(f"rows: {n}, lookups: {len(probes)}")
+    print(f"{'policy':>7} {'pages':>6} {'hit rate':>9} {'evictions':>10} {'lookups/s':>11}")
+    for policy in ("lru", "clock"):
+        for capacity in (1, 16, 128, 1024, 8192):
+            tree = DiskBTree.open(path, capacity=capacity, policy=policy)
+            start = time.perf_counter()
+            for k in probes:
+                tree.get(k)
+            elapsed = time.perf_counter() - start
+            stats = tree.pool.stats()
+            tree.close()
+            print(f"{policy:>7} {capacity:>6} {stats['hit_rate']:>9.1%} {stats['evictions']:>10} {len(probes) / elapsed:>11,.0f}")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
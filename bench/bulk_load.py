@@ -0,0 +1,50 @@
+'''
+Benchmark: bulk_load versus repeated insertion
+
+Builds the same B tree from shuffled (key, row_number) tuples, once by calling BTree.insertion for every row
+and once through BTree.bulk_load, and prints the build time of both.
+Usage: python -m bench.bulk_load [rows ...]
+'''
+import random
+import sys
+import time
+
+from b_tree_v0 import BTree
+
+
+def time_build(build, keys, t):
+    '''
+    Function time_build
+    This function times one build of a B tree.
+    Parameters:
+    build -- a function taking the BTree and the keys
+    keys -- the list of (key, row_number) tuples
+    t -- the minimum degree of the B tree
+    Returns the elapsed time in seconds.
+    '''
+    btree = BTree(t)
+    start = time.perf_counter()
+    build(btree, keys)
+    return time.perf_counter() - start
+
+
+def insert_all(btree, keys):
+    for key in keys:
+        btree.insertion(key)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10 ** 5, 10 ** 6]
+    t = 3
+    random.seed(8)
+    print(f"{'rows':>10} {'insertion (s)':>14} {'bulk_load (s)':>14} {'speedup':>8}")
+    for n in sizes:
+        keys = list(zip(range(n), range(n)))
+        random.shuffle(keys)
+        insert_time = time_build(insert_all, keys, t)
+        bulk_time = time_build(BTree.bulk_load, keys, t)
+        print(f"{n:>10} {insert_time:>14.3f} {bulk_time:>14.3f} {insert_time / bulk_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
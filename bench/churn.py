@@ -0,0 +1,132 @@
+'''
+Benchmark: shape of a B tree under insert and delete churn
+
+Loads n random keys, then runs rounds that delete a random tenth of the keys and insert as many new ones.
+After each round it reports the height, the number of nodes, the average node fill (keys / (2t - 1)) and the
+share of non-root nodes below t - 1 keys, for the single-pass delete that borrows from a sibling and for the
+previous delete, which searched twice and always merged. The last line times one batch delete with delete_many
+against the same keys deleted one at a time.
+Usage: python -m bench.churn [rows] [rounds]
+'''
+import random
+import sys
+import time
+
+from b_tree_v0 import BTree
+
+DEGREE = 16
+
+
+class PreviousDeleteBTree(BTree):
+    '''
+    Class PreviousDeleteBTree
+    This class is a B tree with the previous delete, kept here only as the baseline of the benchmark.
+    '''
+    def delete(self, k, x=None):
+        if not x:
+            x = self.root
+        t = self.t
+        result = self.searching(k, x)
+        if not result:
+            return
+        x, i = result
+        if x.leaf:
+            x.keys.pop(i)
+            x.rows.pop(i)
+            return
+        if len(x.child[i].keys) >= t:
+            x.keys[i], x.rows[i] = self.delete_predecessor(x.child[i])
+        elif len(x.child[i + 1].keys) >= t:
+            x.keys[i], x.rows[i] = self.delete_successor(x.child[i + 1])
+        else:
+            self.merge_nodes(x, i)
+            if i < len(x.child):
+                self.delete(k, x.child[i])
+
+    def delete_predecessor(self, x):
+        if x.leaf:
+            return x.keys.pop(), x.rows.pop()
+        if len(x.child[-1].keys) < self.t:
+            self.rebalance_before_delete(x, len(x.child) - 1)
+        return self.delete_predecessor(x.child[-1])
+
+    def delete_successor(self, x):
+        if x.leaf:
+            return x.keys.pop(0), x.rows.pop(0)
+        if len(x.child[0].keys) < self.t:
+            self.rebalance_before_delete(x, 0)
+        return self.delete_successor(x.child[0])
+
+    def rebalance_before_delete(self, x, idx):
+        self.merge_nodes(x, idx - 1 if idx > 0 else idx)
+
+
+def shape(btree):
+    '''
+    Function shape
+    This function walks the tree and measures its shape.
+    Parameters:
+    btree -- the BTree object
+    Returns the height, the number of nodes, the average fill and the share of under-full nodes.
+    '''
+    t = btree.t
+    nodes = underfull = keys = 0
+    height = 0
+    level = [btree.root]
+    while level:
+        height += 1
+        nodes += len(level)
+        keys += sum(len(x.keys) for x in level)
+        underfull += sum(1 for x in level if x is not btree.root and len(x.keys) < t - 1)
+        level = [child for x in level for child in x.child]
+    return height, nodes, keys / (nodes * (2 * t - 1)), underfull / nodes
+
+
+def churn(tree_type, n, rounds, seed):
+    rng = random.Random(seed)
+    btree = tree_type(DEGREE // 2)
+    live = rng.sample(range(10 * n), n)
+    for key in live:
+        btree.insertion((key, key))
+    next_key = 10 * n
+    report = [shape(btree) + (0.0,)]
+    for _ in range(rounds):
+        rng.shuffle(live)
+        victims, live = live[:n // 10], live[n // 10:]
+        start = time.perf_counter()
+        for key in victims:
+            btree.delete(key)
+        delete_time = (time.perf_counter() - start) / len(victims)
+        for key in range(next_key, next_key + len(victims)):
+            btree.insertion((key, key))
+            live.append(key)
+        next_key += len(victims)
+        report.append(shape(btree) + (delete_time,))
+    return report
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"rows: {n}, rounds: {rounds}, each deletes and inserts {n // 10} keys, max degree {DEGREE}")
+    print(f"{'':>5} {'delete':>11} {'height':>7} {'nodes':>7} {'fill':>6} {'underfull':>10} {'delete us':>10}")
+    for name, tree_type in (("single pass", BTree), ("previous", PreviousDeleteBTree)):
+        for step, (height, nodes, fill, underfull, delete_time) in enumerate(churn(tree_type, n, rounds, 18)):
+            print(f"{step:>5} {name:>11} {height:>7} {nodes:>7} {fill:>6.1%} {underfull:>10.1%} {delete_time * 1e6:>10.2f}")
+
+    keys = [(key, key) for key in range(n)]
+    victims = random.Random(18).sample(range(n), n // 2)
+    btree = BTree.from_sorted(keys, DEGREE // 2)
+    start = time.perf_counter()
+    for key in victims:
+        btree.delete(key)
+    one_time = time.perf_counter() - start
+    btree = BTree.from_sorted(keys, DEGREE // 2)
+    start = time.perf_counter()
+    btree.delete_many(victims)
+    many_time = time.perf_counter() - start
+    print(f"deleting {len(victims)} keys: one at a time {one_time:.2f} s, delete_many {many_time:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+'''
+Benchmark: lookup throughput of threads sharing one B tree under a 95/5 read/write mix
+
+Each thread runs for a fixed time. 95% of its operations look up a random key, 5% insert a new key or delete one
+it inserted before. The ConcurrentBTree, with per-node latches and latch crabbing, is compared with a BTree
+behind one lock. On a CPython with the GIL the threads take turns running Python code, so the numbers show the
+cost of the latches and how well writers and readers interleave rather than a parallel speedup;
+on a free-threaded build the readers also run in parallel.
+Usage: python -m bench.concurrency [rows] [seconds] [max threads]
+'''
+import random
+import sys
+import threading
+import time
+
+from b_tree_v0 import BTree
+from concurrent_btree import ConcurrentBTree
+
+DEGREE = 64
+WRITE_SHARE = 0.05
+
+
+class LockedBTree:
+    '''
+    Class LockedBTree
+    This class puts one lock around a BTree, the baseline of the benchmark.
+    '''
+    def __init__(self, btree):
+        self.btree = btree
+        self.lock = threading.Lock()
+
+    def get(self, k):
+        with self.lock:
+            return self.btree.get(k)
+
+    def insertion(self, k):
+        with self.lock:
+            self.btree.insertion(k)
+
+    def delete(self, k):
+        with self.lock:
+            self.btree.delete(k)
+
+
+def worker(tree, n, seed, stop, counts):
+    rng = random.Random(seed)
+    reads = writes = 0
+    mine = []
+    next_key = n + seed  # keys above n, every thread uses its own residue class
+    while not stop.is_set():
+        if rng.random() >= WRITE_SHARE:
+            tree.get(rng.randrange(n))
+            reads += 1
+        else:
+            if mine and rng.random() < 0.5:
+                tree.delete(mine.pop(rng.randrange(len(mine))))
+            else:
+                tree.insertion((next_key, next_key))
+                mine.append(next_key)
+                next_key += 64
+            writes += 1
+    counts.append((reads, writes))
+
+
+def run(tree, n, threads, seconds):
+    stop = threading.Event()
+    counts = []
+    workers = [threading.Thread(target=worker, args=(tree, n, seed, stop, counts)) for seed in range(threads)]
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(reads for reads, _ in counts) / seconds, sum(writes for _, writes in counts) / seconds
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    max_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    keys = [(key, key) for key in range(n)]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"rows: {n}, {seconds} s per run, {1 - WRITE_SHARE:.0%} lookups, max degree {DEGREE}, GIL {'on' if gil else 'off'}")
+    print(f"{'threads':>7} {'tree':>18} {'reads/s':>10} {'writes/s':>10}")
+    threads = 1
+    while threads <= max_threads:
+        for name, tree in (("latch crabbing", ConcurrentBTree.from_sorted(keys, DEGREE // 2)),
+                           ("one lock", LockedBTree(BTree.from_sorted(keys, DEGREE // 2)))):
+            reads, writes = run(tree, n, threads, seconds)
+            print(f"{threads:>7} {name:>18} {reads:>10,.0f} {writes:>10,.0f}")
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+Benchmark: cost of copy-on-write snapshots of a B tree
+
+Times BTree.snapshot against a full copy of the tree, then inserts w random keys in three ways: with no snapshot
+open, with one snapshot open during all the writes (a node is copied only the first time a write changes it),
+and with a new snapshot before every write (every write copies its whole path). For each it reports the insert
+time, the nodes copied and the memory allocated per write, measured with tracemalloc.
+Usage: python -m bench.cow_snapshot [rows] [writes]
+'''
+import random
+import sys
+import time
+import tracemalloc
+
+from b_tree_v0 import BTree
+from instrument import STATS
+
+DEGREE = 64
+
+
+def full_copy(btree):
+    '''
+    Function full_copy
+    This function copies every node of a B tree, the cost a snapshot without copy-on-write would have.
+    Parameters:
+    btree -- the BTree object
+    Returns the root of the copy.
+    '''
+    def copy(x):
+        node = btree._copy_node(x)
+        node.child = [copy(child) for child in x.child]
+        return node
+    return copy(btree.root)
+
+
+def writes(btree, keys, mode):
+    '''
+    Function writes
+    This function inserts keys with the snapshots of a mode open.
+    Parameters:
+    btree -- the BTree object
+    keys -- the keys to insert
+    mode -- "none", "one" or "every"
+    Returns the snapshots taken, so they stay open until the caller drops them.
+    '''
+    views = [btree.snapshot()] if mode == "one" else []
+    for key in keys:
+        if mode == "every":
+            views.append(btree.snapshot())
+        btree.insertion((key, key))
+    return views
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    w = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 4
+    rng = random.Random(23)
+    base = sorted(rng.sample(range(0, 4 * n, 2), n))
+    # odd keys are new, so every write is an insert
+    new_keys = [2 * rng.randrange(2 * n) + 1 for _ in range(w)]
+    btree = BTree.from_sorted([(key, key) for key in base], DEGREE // 2)
+    stats = btree.stats()
+    print(f"rows: {n}, max degree {DEGREE}, height {stats['height']}, {stats['nodes']} nodes, "
+          f"{stats['bytes'] / stats['nodes']:.0f} bytes per node")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        btree.snapshot().close()
+    snapshot_time = (time.perf_counter() - start) / 1000
+    start = time.perf_counter()
+    full_copy(btree)
+    copy_time = time.perf_counter() - start
+    print(f"snapshot: {snapshot_time * 1e6:.2f} us, full copy: {copy_time * 1e3:.1f} ms")
+
+    print(f"{'snapshots':>10} {'insert us':>10} {'copies/write':>13} {'bytes/write':>12}")
+    for mode in ("none", "one", "every"):
+        btree = BTree.from_sorted([(key, key) for key in base], DEGREE // 2)
+        start = time.perf_counter()
+        views = writes(btree, new_keys, mode)
+        insert_time = (time.perf_counter() - start) / w
+        del views
+
+        btree = BTree.from_sorted([(key, key) for key in base], DEGREE // 2)
+        STATS.reset()
+        STATS.enable()
+        tracemalloc.start()
+        views = writes(btree, new_keys, mode)
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        STATS.disable()
+        copies = STATS.counters['node_copies']
+        del views
+        print(f"{mode:>10} {insert_time * 1e6:>10.2f} {copies / w:>13.2f} {allocated / w:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
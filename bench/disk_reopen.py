@@ -0,0 +1,55 @@
+'''
+Benchmark: rebuilding the index versus reopening it from a page file
+
+Times a bulk load of n integer keys, writing the tree to a page file, reopening the file,
+and the first lookups after reopening, which only read the pages on their search paths.
+Usage: python -m bench.disk_reopen [rows] [index file]
+'''
+import os
+import random
+import sys
+import tempfile
+import time
+
+from b_tree_v0 import BTree
+from disk_btree import DiskBTree, PAGE_SIZE, max_degree_for_page
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), 'bench_disk_reopen.idx')
+    t = max_degree_for_page(PAGE_SIZE, 8) // 2
+    keys = list(zip(range(n), range(n)))
+
+    start = time.perf_counter()
+    btree = BTree(t)
+    btree.bulk_load(keys)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DiskBTree.from_btree(path, btree).close()
+    write = time.perf_counter() - start
+    del btree, keys
+
+    start = time.perf_counter()
+    disk_tree = DiskBTree.open(path)
+    reopen = time.perf_counter() - start
+
+    random.seed(8)
+    probes = [random.randrange(n) for _ in range(1000)]
+    start = time.perf_counter()
+    for k in probes:
+        disk_tree.get(k)
+    lookups = time.perf_counter() - start
+    disk_tree.close()
+
+    print(f"rows: {n}, minimum degree: {t}, page size: {PAGE_SIZE}, file size: {os.path.getsize(path):,} bytes")
+    print(f"bulk load in memory: {build:10.3f} s")
+    print(f"write page file:     {write:10.3f} s")
+    print(f"reopen page file:    {reopen * 1000:10.3f} ms")
+    print(f"1000 cold lookups:   {lookups * 1000:10.3f} ms")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+'''
+Synthetic student data for the benchmarks.
+
+Generates tables like data/data_with_grade.xlsx (student_ID, student_name, grade, grade_letter) of any size with NumPy,
+one array operation per column, so millions of rows take seconds. The student_ID keys follow a distribution:
+- sequential: 1, 2, 3 ... in order, like an auto-increment column
+- random: distinct integers spread over ten times the number of rows, in random order
+- zipf: distinct integers whose gaps follow a Zipf law, so most keys sit in dense runs separated by a few wide
+  jumps, in random order
+- string: the random keys as fixed-width text, e.g. S000123456
+Usage: python -m bench.generate rows file.(csv|parquet|xlsx) [sequential|random|zipf|string] [seed]
+'''
+import sys
+
+import numpy as np
+import pandas as pd
+
+KEY_DISTRIBUTIONS = ("sequential", "random", "zipf", "string")
+ZIPF_EXPONENT = 1.5
+# the widest gap of the zipf keys, the Zipf law has no mean below an exponent of 2
+ZIPF_MAX_GAP = 10 ** 6
+
+FIRST_NAMES = ("Ann", "Ben", "Chen", "Dana", "Eli", "Fatima", "Grace", "Hiro", "Ines", "Jun", "Kai", "Lena",
+               "Marco", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tara", "Uma", "Victor", "Wei", "Yara", "Zoe")
+LAST_NAMES = ("Abe", "Brown", "Costa", "Diaz", "Evans", "Fischer", "Garcia", "He", "Ivanov", "Jones", "Kim", "Li",
+              "Martin", "Nguyen", "Okafor", "Patel", "Rossi", "Smith", "Tanaka", "Wang")
+NAMES = np.array([f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES], dtype=object)
+# upper grade of each letter, as in data/data_generation.py for the A grades
+GRADE_LIMITS = np.array([59, 69, 79, 89, 93, 96, 100])
+GRADE_LETTERS = np.array(["F", "D", "C", "B", "A-", "A", "A+"], dtype=object)
+
+
+def text_keys(numbers, width=9, prefix="S"):
+    '''
+    Function text_keys
+    This function formats non-negative integers as fixed-width text keys, digit columns at a time.
+    Parameters:
+    numbers -- a NumPy array of integers below 10 ** width
+    width -- the number of digits
+    prefix -- one ASCII character put before the digits
+    Returns an object array of str.
+    '''
+    chars = np.empty((len(numbers), width + 1), dtype=np.uint8)
+    chars[:, 0] = ord(prefix)
+    chars[:, 1:] = numbers[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64) % 10 + ord("0")
+    return chars.view(f"S{width + 1}").ravel().astype(f"U{width + 1}").astype(object)
+
+
+def make_keys(n, distribution="random", seed=0):
+    '''
+    Function make_keys
+    This function generates n distinct keys.
+    Parameters:
+    n -- the number of keys
+    distribution -- one of KEY_DISTRIBUTIONS
+    seed -- the seed of the random generator
+    Returns a NumPy array of int64 keys, or an object array of str for string keys.
+    '''
+    if distribution not in KEY_DISTRIBUTIONS:
+        raise ValueError(f"Key distribution must be one of {KEY_DISTRIBUTIONS}")
+    rng = np.random.default_rng(seed)
+    if distribution == "sequential":
+        return np.arange(1, n + 1, dtype=np.int64)
+    if distribution == "zipf":
+        gaps = np.minimum(rng.zipf(ZIPF_EXPONENT, n), ZIPF_MAX_GAP)
+        return rng.permutation(np.cumsum(gaps, dtype=np.int64))
+    # a random choice without repeats, of ten times as many values as keys
+    keys = rng.choice(10 * n, n, replace=False).astype(np.int64)
+    return text_keys(keys, max(9, len(str(10 * n)))) if distribution == "string" else keys
+
+
+def make_students(n, distribution="random", seed=0):
+    '''
+    Function make_students
+    This function generates a table of students.
+    Parameters:
+    n -- the number of rows
+    distribution -- the distribution of the student_ID keys, one of KEY_DISTRIBUTIONS
+    seed -- the seed of the random generator
+    Returns a dataframe with the columns student_ID, student_name, grade and grade_letter.
+    '''
+    rng = np.random.default_rng(seed + 1)
+    # grades cluster around 85, like a class where most students pass
+    grade = np.clip(np.rint(rng.normal(85, 8, n)), 0, 100).astype(np.int64)
+    return pd.DataFrame({
+        'student_ID': make_keys(n, distribution, seed),
+        'student_name': NAMES[rng.integers(len(NAMES), size=n)],
+        'grade': grade,
+        'grade_letter': GRADE_LETTERS[np.searchsorted(GRADE_LIMITS, grade)],
+    })
+
+
+def write_table(data, path):
+    '''
+    Function write_table
+    This function writes a dataframe to a csv, parquet or excel file, chosen by the extension of the path.
+    Parameters:
+    data -- the dataframe
+    path -- the file
+    '''
+    if path.endswith(".parquet"):
+        data.to_parquet(path, index=False)
+    elif path.endswith((".xlsx", ".xls")):
+        data.to_excel(path, index=False)
+    else:
+        data.to_csv(path, index=False)
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    n = int(sys.argv[1])
+    distribution = sys.argv[3] if len(sys.argv) > 3 else "random"
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    write_table(make_students(n, distribution, seed), sys.argv[2])
+    print(f"Wrote {n} rows with {distribution} keys to {sys.argv[2]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+Benchmark: loading a whole file and then indexing it, versus streaming it in chunks
+
+Writes a csv file of n rows, then loads it in a fresh process each way and reports the time, rows per second
+and the peak resident memory of the process:
+- whole: read_csv, convert_dtypes on the full frame, bulk load the index
+- stream: read_chunks, each chunk is checked, added to the row store and indexed before the next one is read
+Usage: python -m bench.ingest [rows] [chunk size]
+'''
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import MiniDatabase
+from read_data import CHUNK_SIZE, add_row_number, read_chunks
+
+DEGREE = 32
+
+
+def load(mode, path, chunk_size):
+    start = time.perf_counter()
+    if mode == 'whole':
+        data = add_row_number(pd.read_csv(path).convert_dtypes())
+        db = MiniDatabase.from_frame(data, 'key', DEGREE)
+    else:
+        db = MiniDatabase.from_chunks(read_chunks(path, chunk_size), 'key', DEGREE)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{db.data.shape[0]} {elapsed} {peak}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        load(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_SIZE
+    path = os.path.join(tempfile.gettempdir(), 'bench_ingest.csv')
+    rng = np.random.default_rng(14)
+    pd.DataFrame({
+        'key': rng.permutation(n),
+        'name': [f'name{i}' for i in range(n)],
+        'grade': rng.integers(0, 100, n),
+        'score': rng.random(n),
+    }).to_csv(path, index=False)
+
+    print(f"rows: {n}, chunk size: {chunk_size}, file size: {os.path.getsize(path) / 1e6:.1f} MB")
+    print(f"{'mode':>8} {'seconds':>9} {'rows/s':>12} {'peak RSS MB':>12}")
+    for mode in ('whole', 'stream'):
+        output = subprocess.run([sys.executable, '-m', 'bench.ingest', '--child', mode, path, str(chunk_size)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        rows, elapsed, peak = int(output[0]), float(output[1]), float(output[2])
+        print(f"{mode:>8} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {peak:>12.0f}")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''
+Benchmark: B tree keys stored as typed values, as tuples of values and as order-preserving bytes
+
+For each kind of key, encodes the keys of n rows, bulk loads a B tree, then times point lookups and inserts.
+Tuples of a composite key are compared element by element in Python; their bytes encoding is compared with one memcmp.
+Usage: python -m bench.key_encoding [rows] [probes]
+'''
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from b_tree_v0 import BTree
+from keys import KeyCodec
+
+DEGREE = 32
+
+
+def run(frame, codec, probes, inserts):
+    start = time.perf_counter()
+    keys = codec.frame_keys(frame)
+    encode_time = time.perf_counter() - start
+    btree = BTree(DEGREE // 2)
+    btree.bulk_load(list(zip(keys, range(len(keys)))))
+
+    lookups = [keys[i] for i in probes]
+    start = time.perf_counter()
+    for key in lookups:
+        btree.get(key)
+    get_time = time.perf_counter() - start
+
+    new_keys = codec.frame_keys(inserts)
+    start = time.perf_counter()
+    for row, key in enumerate(new_keys, len(keys)):
+        btree.insertion((key, row))
+    insert_time = time.perf_counter() - start
+    return encode_time, get_time / len(lookups), insert_time / len(new_keys)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    probes = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+    rng = np.random.default_rng(17)
+
+    def table(first, size):
+        return pd.DataFrame({
+            'id': np.arange(first, first + size),
+            'name': [f'student{i:08d}' for i in range(first, first + size)],
+            'year': 2000 + np.arange(first, first + size) % 30,
+        })
+    frame = table(0, n)
+    inserts = table(n, probes).sample(frac=1, random_state=17)
+    positions = rng.integers(0, n, probes)
+
+    print(f"rows: {n}, lookups and inserts: {probes}")
+    print(f"{'key':>22} {'encode s':>9} {'get us':>8} {'insert us':>10}")
+    for name, key, encoded in (("int", 'id', False), ("text", 'name', False), ("text, bytes", 'name', True),
+                               ("(year, name)", ('year', 'name'), False),
+                               ("(year, name), bytes", ('year', 'name'), True)):
+        encode_time, get_time, insert_time = run(frame, KeyCodec(key, encoded), positions, inserts)
+        print(f"{name:>22} {encode_time:>9.2f} {get_time * 1e6:>8.2f} {insert_time * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Benchmark: memory per indexed row
+
+Measures with tracemalloc the bytes per indexed row of a B tree over integer student_ID keys,
+for the compact node layout (parallel arrays of keys and row numbers in __slots__ nodes)
+and for the previous layout (a list of (key, row_number) tuples in every node object with a __dict__).
+Usage: python -m bench.node_memory [rows]
+'''
+import sys
+import tracemalloc
+
+from b_tree_v0 import BTree
+
+
+class TupleNode:
+    '''
+    Class TupleNode
+    This class is the previous node layout, kept here only as the baseline of the benchmark.
+    '''
+    def __init__(self, leaf=False):
+        self.leaf = leaf
+        self.keys = []
+        self.child = []
+
+
+def to_tuple_nodes(x):
+    '''
+    Function to_tuple_nodes
+    This function copies a subtree into the previous node layout, keeping the same shape.
+    Parameters:
+    x -- the root of the subtree
+    Returns the copied node.
+    '''
+    node = TupleNode(x.leaf)
+    node.keys = [(int(key), int(row_number)) for key, row_number in zip(x.keys, x.rows)]
+    node.child = [to_tuple_nodes(child) for child in x.child]
+    return node
+
+
+def measure(build):
+    '''
+    Function measure
+    This function measures the memory kept alive by the object that build returns.
+    Returns the object and its size in bytes.
+    '''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    t = 16
+    # student IDs larger than the small int cache, so every key is a real object in the tuple layout
+    keys = [(1000000 + i, i) for i in range(n)]
+    btree, compact_bytes = measure(lambda: BTree.from_sorted(keys, t))
+    del keys
+    _, tuple_bytes = measure(lambda: to_tuple_nodes(btree.root))
+    print(f"rows: {n}, minimum degree: {t}")
+    print(f"{'layout':>22} {'bytes':>14} {'bytes per row':>14}")
+    print(f"{'tuples in dict nodes':>22} {tuple_bytes:>14,} {tuple_bytes / n:>14.1f}")
+    print(f"{'arrays in slot nodes':>22} {compact_bytes:>14,} {compact_bytes / n:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+'''
+Benchmark: linear scan versus binary search inside one B tree node
+
+For every minimum degree t, a full node of 2t - 1 keys is probed with random keys,
+once with the old linear while loop and once with bisect.
+Usage: python -m bench.node_search
+'''
+import random
+import timeit
+from array import array
+from bisect import bisect_left
+
+
+def linear_position(keys, k):
+    i = 0
+    while i < len(keys) and k > keys[i]:
+        i += 1
+    return i
+
+
+def bisect_position(keys, k):
+    return bisect_left(keys, k)
+
+
+def main():
+    random.seed(8)
+    print(f"{'t':>5} {'keys':>6} {'linear (ns)':>12} {'bisect (ns)':>12} {'speedup':>8}")
+    t = 2
+    while t <= 512:
+        keys = array('q', range(2 * t - 1))
+        probes = [random.randrange(2 * t - 1) for _ in range(1000)]
+        number = max(1, 20000 // t)
+        linear = min(timeit.repeat(lambda: [linear_position(keys, k) for k in probes], number=number, repeat=3))
+        binary = min(timeit.repeat(lambda: [bisect_position(keys, k) for k in probes], number=number, repeat=3))
+        per_probe = 1e9 / (number * len(probes))
+        print(f"{t:>5} {len(keys):>6} {linear * per_probe:>12.1f} {binary * per_probe:>12.1f} {linear / binary:>7.1f}x")
+        t *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Benchmark: parallel index build with 1 to N processes
+
+Builds the index of n shuffled integer keys with bulk_load, sorting Python tuples in one process, and with
+parallel_build.build_index for 1, 2, 4 ... processes, split into the sort of the keys and the build of the nodes.
+Every tree is checked to be identical to the one of bulk_load. The speedup is over bulk_load and over 1 process;
+the sort only scales with the number of CPUs, which is printed first.
+Usage: python -m bench.parallel_build [rows] [max processes] [tree btree|bplus]
+'''
+import os
+import sys
+import time
+
+import numpy as np
+
+import parallel_build
+from b_tree_v0 import BTree, BPlusTree
+
+DEGREE = 64
+
+
+def same_tree(a, b):
+    '''
+    Function same_tree
+    This function compares two trees level by level.
+    Parameters:
+    a -- the first tree
+    b -- the second tree
+    Returns True if every node has the same keys, row numbers and number of children.
+    '''
+    level_a, level_b = [a.root], [b.root]
+    while level_a or level_b:
+        if len(level_a) != len(level_b):
+            return False
+        for x, y in zip(level_a, level_b):
+            if x.keys != y.keys or x.rows != y.rows or len(x.child) != len(y.child):
+                return False
+        level_a = [child for x in level_a for child in x.child]
+        level_b = [child for y in level_b for child in y.child]
+    return True
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4 * 10 ** 6
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count() or 1)
+    tree_type = BPlusTree if len(sys.argv) > 3 and sys.argv[3] == 'bplus' else BTree
+    rng = np.random.default_rng(22)
+    keys = rng.permutation(10 * n)[:n].astype(np.int64)
+    rows = np.arange(n, dtype=np.int64)
+    print(f"rows: {n}, {tree_type.__name__}, max degree {DEGREE}, CPUs: {os.cpu_count()}")
+
+    start = time.perf_counter()
+    serial = tree_type(DEGREE // 2)
+    serial.bulk_load(list(zip(keys.tolist(), rows.tolist())))
+    serial_time = time.perf_counter() - start
+    print(f"{'processes':>9} {'sort (s)':>9} {'nodes (s)':>10} {'total (s)':>10} {'vs bulk_load':>13} "
+          f"{'vs 1':>6} {'identical':>10}")
+    print(f"{'bulk_load':>9} {'':>9} {'':>10} {serial_time:>10.2f} {1:>12.1f}x {'':>6} {'':>10}")
+    one_time = None
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        sorted_keys, sorted_rows = parallel_build.parallel_sort(keys, rows, workers)
+        sort_time = time.perf_counter() - start
+        tree = parallel_build.build_from_arrays(tree_type, sorted_keys, sorted_rows, DEGREE // 2)
+        total = time.perf_counter() - start
+        one_time = one_time or total
+        print(f"{workers:>9} {sort_time:>9.2f} {total - sort_time:>10.2f} {total:>10.2f} "
+              f"{serial_time / total:>12.1f}x {one_time / total:>5.2f}x {str(same_tree(tree, serial)):>10}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''
+Benchmark: cost of rendering the tree on the insert path
+
+Inserts n keys one by one and renders the tree after every insert, the way the menu used to, then with
+the background renderer that only takes a snapshot of the tree per insert, and with rendering off.
+The drawings are saved to an image file instead of being shown.
+Usage: python -m bench.render [inserts]
+'''
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+from b_tree_v0 import BTree
+from render import Renderer
+
+
+def run(n, renderer, path=None):
+    btree = BTree(8)
+    start = time.perf_counter()
+    for i in range(n):
+        btree.insertion((i, i))
+        if path is not None:
+            renderer.render(btree, path)
+        else:
+            renderer.changed(btree)
+    elapsed = time.perf_counter() - start
+    renderer.close()
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    path = os.path.join(tempfile.gettempdir(), 'bench_render.png')
+    devnull = open(os.devnull, 'w')
+
+    print(f"inserts: {n}")
+    print(f"{'mode':>22} {'us/insert':>12} {'drawings':>9} {'dropped':>8}")
+    for name, mode, sync_path in (("print + draw (before)", "request", path), ("background", "background", None),
+                                  ("off", "off", None)):
+        renderer = Renderer(mode, path=path)
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            elapsed = run(n, renderer, sync_path)
+        finally:
+            sys.stdout = stdout
+        print(f"{name:>22} {elapsed / n * 1e6:>12.1f} {renderer.rendered:>9} {renderer.dropped:>8}")
+    devnull.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
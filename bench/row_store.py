@@ -0,0 +1,70 @@
+'''
+Benchmark: inserting and deleting rows one at a time, pd.concat versus the row store
+
+The old insert_driver appended every row with pd.concat and delete_driver filtered the frame with a mask,
+so both copied the whole table. The row store writes one slot per column and deletes with a tombstone.
+Usage: python -m bench.row_store [largest table size]
+'''
+import sys
+import time
+
+import pandas as pd
+
+from row_store import RowStore
+
+
+def concat_inserts(n):
+    data = pd.DataFrame({'key': pd.Series(dtype='int64'), 'name': pd.Series(dtype=object),
+                         'row_number': pd.Series(dtype='int64')})
+    for i in range(n):
+        data = pd.concat([data, pd.DataFrame([{'key': i, 'name': f'name{i}', 'row_number': i}])], ignore_index=True)
+    return data
+
+
+def mask_deletes(data, row_numbers):
+    for row_number in row_numbers:
+        data = data[data['row_number'] != row_number]
+    return data
+
+
+def store_inserts(n):
+    store = RowStore(['key', 'name', 'row_number'])
+    for i in range(n):
+        store.append({'key': i, 'name': f'name{i}', 'row_number': i})
+    return store
+
+
+def store_deletes(store, row_numbers):
+    for row_number in row_numbers:
+        store.delete(row_number)
+    return store
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    sizes = [largest // 8, largest // 4, largest // 2, largest]
+    print(f"{'rows':>8} {'concat insert us/row':>21} {'store insert us/row':>20} "
+          f"{'mask delete us/row':>19} {'store delete us/row':>20}")
+    for n in sizes:
+        deleted = list(range(0, n, 2))
+        start = time.perf_counter()
+        data = concat_inserts(n)
+        concat_insert = time.perf_counter() - start
+        start = time.perf_counter()
+        mask_deletes(data, deleted)
+        mask_delete = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = store_inserts(n)
+        store_insert = time.perf_counter() - start
+        start = time.perf_counter()
+        store_deletes(store, deleted)
+        store_delete = time.perf_counter() - start
+        assert store.to_frame()['row_number'].tolist() == list(range(1, n, 2))
+
+        print(f"{n:>8} {concat_insert / n * 1e6:>21.1f} {store_insert / n * 1e6:>20.1f} "
+              f"{mask_delete / len(deleted) * 1e6:>19.1f} {store_delete / len(deleted) * 1e6:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
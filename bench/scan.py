@@ -0,0 +1,39 @@
+'''
+Benchmark: ordered scan throughput of BTree versus BPlusTree
+
+Both trees are bulk loaded with the same keys, then timed on a full scan through items()
+and on many short range scans.
+Usage: python -m bench.scan [rows]
+'''
+import random
+import sys
+import time
+
+from b_tree_v0 import BTree, BPlusTree
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    t = 16
+    keys = list(zip(range(n), range(n)))
+    random.seed(8)
+    starts = [random.randrange(n) for _ in range(10000)]
+    print(f"{'tree':>10} {'full scan (rows/s)':>20} {'range of 100 (scans/s)':>24}")
+    for tree_type in (BTree, BPlusTree):
+        btree = tree_type.from_sorted(keys, t)
+
+        start = time.perf_counter()
+        for _ in btree.items():
+            pass
+        full_scan = n / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for lo in starts:
+            for _ in btree.range(lo, lo + 100):
+                pass
+        range_scan = len(starts) / (time.perf_counter() - start)
+        print(f"{tree_type.__name__:>10} {full_scan:>20,.0f} {range_scan:>24,.0f}")
+
+
+if __name__ == '__main__':
+    main()
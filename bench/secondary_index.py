@@ -0,0 +1,61 @@
+'''
+Benchmark: queries on a column that is not unique, with a secondary index and without one
+
+Builds a table of n rows with a grade column of 100 distinct values and a zip column of 10,000, then answers
+equality and range queries on them by filtering the DataFrame of the table, the way they were answered before,
+and with db.query through an index on each column. With many matching rows, building the result dominates both.
+Usage: python -m bench.secondary_index [rows] [queries]
+'''
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import MiniDatabase
+from query import describe_plan
+from read_data import add_row_number
+
+DEGREE = 32
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = np.random.default_rng(16)
+    data = add_row_number(pd.DataFrame({
+        'key': rng.permutation(n),
+        'grade': rng.integers(0, 100, n),
+        'zip': rng.integers(0, 10000, n),
+        'score': rng.random(n),
+    }))
+    db = MiniDatabase.from_frame(data, 'key', DEGREE)
+    start = time.perf_counter()
+    db.create_index('grade')
+    db.create_index('zip')
+    print(f"rows: {n}, two indexes built in {time.perf_counter() - start:.2f} s")
+
+    cases = []
+    for column in ('grade', 'zip'):
+        cases += [
+            (f"{column} = v", lambda frame, v, c=column: frame[frame[c] == v], lambda v, c=column: [(c, '=', v)]),
+            (f"v <= {column} < v + 3", lambda frame, v, c=column: frame[(frame[c] >= v) & (frame[c] < v + 3)],
+             lambda v, c=column: [(c, '>=', v), (c, '<', v + 3)]),
+        ]
+    print(f"{'query':>20} {'rows':>8} {'scan ms':>9} {'index ms':>9} {'speedup':>8}  plan")
+    for name, scan, predicates in cases:
+        values = rng.integers(0, 100, queries).tolist()
+        frame = db.data.to_frame()
+        start = time.perf_counter()
+        found = sum(len(scan(frame, v)) for v in values)
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        results = [db.query(predicates(v)) for v in values]
+        index_time = time.perf_counter() - start
+        assert sum(len(rows) for rows, _ in results) == found
+        print(f"{name:>20} {found // queries:>8} {scan_time / queries * 1e3:>9.2f} {index_time / queries * 1e3:>9.2f} "
+              f"{scan_time / index_time:>7.1f}x  {describe_plan(results[0][1])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Benchmark: cold start from a source file versus from a binary snapshot
+
+For each number of rows, writes the table as an excel file, a csv file and a snapshot, then opens it in a fresh
+process each way until the first search answers:
+- excel: read_chunks on the xlsx file and from_chunks, the path of the interactive menu
+- csv: the same on the csv file
+- snapshot: load_snapshot, the columns are mapped from the file and the tree is rebuilt node by node
+An xlsx sheet holds at most 1,048,576 rows, so larger tables are only compared with the csv path.
+Usage: python -m bench.snapshot [rows ...]
+'''
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import MiniDatabase
+from read_data import add_row_number, read_chunks
+
+DEGREE = 32
+EXCEL_MAX_ROWS = 1048575
+
+
+def load(mode, path):
+    start = time.perf_counter()
+    if mode == 'snapshot':
+        db = MiniDatabase.load_snapshot(path)
+    else:
+        db = MiniDatabase.from_chunks(read_chunks(path), 'key', DEGREE)
+    db.search(0)
+    print(f"{db.data.shape[0]} {time.perf_counter() - start}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        load(sys.argv[2], sys.argv[3])
+        return
+    sizes = [int(float(arg)) for arg in sys.argv[1:]] or [10 ** 5, 10 ** 6]
+    directory = tempfile.gettempdir()
+
+    print(f"{'rows':>10} {'mode':>9} {'seconds':>9} {'file MB':>9} {'speedup':>8}")
+    for n in sizes:
+        rng = np.random.default_rng(15)
+        data = pd.DataFrame({
+            'key': rng.permutation(n),
+            'name': [f'name{i}' for i in range(n)],
+            'grade': rng.integers(0, 100, n),
+            'score': rng.random(n),
+        })
+        paths = {'csv': os.path.join(directory, 'bench_snapshot.csv'),
+                 'snapshot': os.path.join(directory, 'bench_snapshot.snap')}
+        if n <= EXCEL_MAX_ROWS:
+            paths['excel'] = os.path.join(directory, 'bench_snapshot.xlsx')
+            data.to_excel(paths['excel'], index=False)
+        data.to_csv(paths['csv'], index=False)
+        MiniDatabase.from_frame(add_row_number(data), 'key', DEGREE).save_snapshot(paths['snapshot'])
+
+        times = {}
+        for mode in ('excel', 'csv', 'snapshot'):
+            if mode not in paths:
+                continue
+            output = subprocess.run([sys.executable, '-m', 'bench.snapshot', '--child', mode, paths[mode]],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            assert int(output[0]) == n
+            times[mode] = float(output[1])
+        slowest = times.get('excel', times['csv'])
+        for mode, elapsed in times.items():
+            size = os.path.getsize(paths[mode]) / 1e6
+            print(f"{n:>10} {mode:>9} {elapsed:>9.2f} {size:>9.1f} {slowest / elapsed:>7.1f}x")
+        for path in paths.values():
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
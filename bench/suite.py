@@ -0,0 +1,202 @@
+'''
+Benchmark suite: the workloads of the B tree across degrees and table sizes, with a regression check
+
+For every table size and maximum degree, generates the keys with bench.generate and runs:
+- build: bulk_load of the (key, row_number) pairs in random order
+- lookup: get of random keys of the table
+- zipf_lookup: get of skewed keys of the table, the rank of a key in key order follows a Zipf law, so a few small keys
+  take most of the lookups, like the hot rows of a real table
+- range: scans of RANGE_LENGTH keys from a random key
+- insert: insertion of new keys
+- delete: delete of random keys of the table
+Each workload is run on a fresh tree as many times as --repeat asks, with the garbage collector off, and the
+fastest run is kept, reported in microseconds per operation. The results are written to a JSON file with the machine they were measured on; with
+--baseline the run is compared workload by workload with a saved result file, and a workload slower by more than
+--threshold is a regression, which makes the exit status 1.
+Usage: python -m bench.suite [--sizes 10000,100000] [--degrees 4,16,64] [--keys random] [--operations N]
+                             [--repeat 3] [--seed 0] [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+'''
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from b_tree_v0 import BTree
+from bench.generate import KEY_DISTRIBUTIONS, make_keys
+
+WORKLOADS = ("build", "lookup", "zipf_lookup", "range", "insert", "delete")
+RANGE_LENGTH = 100
+# scans are longer than the other operations, so fewer of them are run
+RANGE_SHARE = 10
+# exponent of the Zipf law of the skewed lookups, above 1 as numpy requires
+LOOKUP_ZIPF_EXPONENT = 1.2
+
+
+def prepare(size, distribution, operations, seed):
+    '''
+    Function prepare
+    This function generates the keys of a table and of its operations, the same for every degree.
+    Parameters:
+    size -- the number of rows of the table
+    distribution -- the distribution of the keys, one of KEY_DISTRIBUTIONS
+    operations -- the number of lookups, inserts and deletes
+    seed -- the seed of the random generators
+    Returns a dict of the pairs of the table, and the keys of every workload as lists.
+    '''
+    rng = np.random.default_rng(seed)
+    # the keys after the table are the new keys of the inserts
+    keys = make_keys(size + operations, distribution, seed)
+    table, new = keys[:size], keys[size:]
+    ordered = np.sort(table)
+    starts = rng.integers(size, size=operations // RANGE_SHARE)
+    # rank 1 is the smallest key, the ranks past the table wrap around
+    ranks = (rng.zipf(LOOKUP_ZIPF_EXPONENT, operations) - 1) % size
+    return {
+        'pairs': list(zip(table.tolist(), range(size))),
+        'lookup': table[rng.integers(size, size=operations)].tolist(),
+        'zipf_lookup': ordered[ranks].tolist(),
+        'range': list(zip(ordered[starts].tolist(), ordered[np.minimum(starts + RANGE_LENGTH, size - 1)].tolist())),
+        'insert': new.tolist(),
+        'delete': table[rng.choice(size, min(size, operations), replace=False)].tolist(),
+    }
+
+
+def run_workload(workload, data, t):
+    '''
+    Function run_workload
+    This function builds a tree and times one workload on it.
+    Parameters:
+    workload -- one of WORKLOADS
+    data -- the dict returned by prepare
+    t -- the minimum degree of the tree
+    Returns the number of operations and the seconds they took.
+    '''
+    btree = BTree(t)
+    if workload != "build":
+        btree.bulk_load(data['pairs'])
+    keys = data[workload] if workload != "build" else data['pairs']
+    # like timeit, the cyclic garbage collector does not run during the timing
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        if workload == "build":
+            btree.bulk_load(keys)
+        elif workload in ("lookup", "zipf_lookup"):
+            get = btree.get
+            for key in keys:
+                get(key)
+        elif workload == "range":
+            for lo, hi in keys:
+                for _ in btree.range(lo, hi):
+                    pass
+        elif workload == "insert":
+            for row_number, key in enumerate(keys, len(data['pairs'])):
+                btree.insertion((key, row_number))
+        else:
+            for key in keys:
+                btree.delete(key)
+        return len(keys), time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def run_suite(sizes, degrees, distribution, operations, repeat, seed):
+    '''
+    Function run_suite
+    This function runs every workload for every table size and maximum degree.
+    Parameters:
+    sizes -- the table sizes
+    degrees -- the maximum degrees of the tree
+    distribution -- the distribution of the keys, one of KEY_DISTRIBUTIONS
+    operations -- the number of lookups, inserts and deletes per run
+    repeat -- the number of runs of a workload, the fastest is kept
+    seed -- the seed of the random generators
+    Returns the list of results, one dict per size, degree and workload.
+    '''
+    results = []
+    for size in sizes:
+        data = prepare(size, distribution, min(operations, size), seed)
+        for degree in degrees:
+            for workload in WORKLOADS:
+                ops, seconds = min((run_workload(workload, data, degree // 2) for _ in range(repeat)),
+                                   key=lambda run: run[1])
+                result = {'size': size, 'degree': degree, 'keys': distribution, 'workload': workload,
+                          'ops': ops, 'seconds': seconds, 'us_per_op': seconds / ops * 1e6}
+                results.append(result)
+                print(f"{size:>10} {degree:>7} {workload:>11} {ops:>9} {result['us_per_op']:>10.3f}", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''
+    Function compare
+    This function compares the results with a baseline, matching the size, the degree, the keys and the workload.
+    Parameters:
+    results -- the list of results of this run
+    baseline -- the list of results of the baseline
+    threshold -- the relative slowdown above which a workload is a regression, e.g. 0.1 for 10%
+    Returns the list of the regressions, each a result with the baseline time and the ratio of the times added.
+    '''
+    saved = {(r['size'], r['degree'], r['keys'], r['workload']): r for r in baseline}
+    regressions = []
+    print(f"{'size':>10} {'degree':>7} {'workload':>11} {'baseline us':>12} {'now us':>10} {'change':>8}")
+    for result in results:
+        old = saved.get((result['size'], result['degree'], result['keys'], result['workload']))
+        if old is None:
+            continue
+        ratio = result['us_per_op'] / old['us_per_op']
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{result['size']:>10} {result['degree']:>7} {result['workload']:>11} {old['us_per_op']:>12.3f} "
+              f"{result['us_per_op']:>10.3f} {ratio - 1:>+8.1%}{flag}")
+        if flag:
+            regressions.append(dict(result, baseline_us_per_op=old['us_per_op'], ratio=ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the B tree workloads and compare them with a baseline.")
+    parser.add_argument('--sizes', default="10000,100000", help="comma separated table sizes")
+    parser.add_argument('--degrees', default="4,16,64", help="comma separated maximum degrees")
+    parser.add_argument('--keys', choices=KEY_DISTRIBUTIONS, default="random", help="the distribution of the keys")
+    parser.add_argument('--operations', type=int, default=20000, help="lookups, inserts and deletes per run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each workload, the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file, e.g. to save a baseline")
+    parser.add_argument('--baseline', help="a JSON file written by --output to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown reported as a regression (default 0.1)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    degrees = [int(degree) for degree in args.degrees.split(',')]
+    print(f"{'size':>10} {'degree':>7} {'workload':>11} {'ops':>9} {'us/op':>10}")
+    results = run_suite(sizes, degrees, args.keys, args.operations, args.repeat, args.seed)
+    report = {
+        'machine': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                    'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.machine()},
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'settings': {'keys': args.keys, 'operations': args.operations, 'repeat': args.repeat, 'seed': args.seed},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['machine'] != report['machine']:
+            print("The baseline was measured on another machine or Python, the times may not compare:",
+                  baseline['machine'])
+        regressions = compare(results, baseline['results'], args.threshold)
+        print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+'''
+Benchmark: durable write throughput of the write-ahead log
+
+Logs n insert and delete records with fsync after every batch and reports the durable operations per second
+for several group commit batch sizes. Batch size 1 is one fsync per operation.
+Usage: python -m bench.wal [operations] [log directory]
+'''
+import os
+import sys
+import tempfile
+import time
+
+from wal import WriteAheadLog
+
+BATCH_SIZES = [1, 8, 64, 512]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    directory = sys.argv[2] if len(sys.argv) > 2 else tempfile.gettempdir()
+    path = os.path.join(directory, 'bench_wal.log')
+
+    print(f"operations: {n}, log file: {path}")
+    print(f"{'batch size':>10} {'fsyncs':>8} {'ops/s':>12} {'MB/s':>8}")
+    for batch_size in BATCH_SIZES:
+        if os.path.exists(path):
+            os.remove(path)
+        log = WriteAheadLog(path, batch_size=batch_size)
+        start = time.perf_counter()
+        for i in range(n):
+            if i % 4 == 3:
+                log.append('delete', key=i - 1, row_number=i - 1)
+            else:
+                log.append('insert', key=i, row_number=i, values={'key': i, 'row_number': i, 'name': f'name{i}'})
+        log.commit()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        log.close()
+        print(f"{batch_size:>10} {log.commits:>8} {n / elapsed:>12,.0f} {size / elapsed / 1e6:>8.2f}")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+'''
+Buffer pool for the page-file B tree.
+
+The pool keeps a bounded number of decoded nodes in memory, so the hot upper levels of the tree are not decoded
+from their page on every search. Nodes that are changed are marked dirty and only written back to their page
+when they are evicted or when the pool is flushed.
+'''
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 1024
+
+
+class Frame:
+    '''
+    Class Frame
+    This class holds one decoded node in the buffer pool with its pin count, dirty flag and CLOCK reference bit.
+    '''
+    __slots__ = ('node', 'pins', 'dirty', 'referenced')
+
+    def __init__(self, node):
+        self.node = node
+        self.pins = 0
+        self.dirty = False
+        self.referenced = True
+
+
+class BufferPool:
+    '''
+    Class BufferPool
+    This class caches decoded pages between a DiskBTree and its PageFile.
+    - get: return a node for reading, without pinning it
+    - pin / unpin: hold a node in memory while it is changed, and mark it dirty when it is released
+    - new: add a node for a newly allocated page
+    - free: drop a page from the pool and give it back to the page file
+    - flush: write back every dirty node
+    Pinned nodes are never evicted. Eviction follows either LRU order or the CLOCK algorithm.
+    The counters hits, misses, evictions and writes are kept for stats().
+    '''
+    def __init__(self, pages, load, store, capacity=None, capacity_bytes=None, policy="lru"):
+        '''
+        Parameters:
+        pages -- the PageFile
+        load -- a function that decodes the node of a page number
+        store -- a function that encodes a node into the page of a page number
+        capacity -- the maximum number of cached pages
+        capacity_bytes -- the maximum cache size in bytes, converted to pages of the page file
+        policy -- "lru" or "clock"
+        '''
+        if policy not in ("lru", "clock"):
+            raise ValueError("policy must be 'lru' or 'clock'")
+        if capacity_bytes is not None:
+            capacity = capacity_bytes // pages.page_size
+        elif capacity is None:
+            capacity = DEFAULT_CAPACITY
+        if capacity < 1:
+            raise ValueError("The buffer pool must hold at least one page")
+        self.pages = pages
+        self.load = load
+        self.store = store
+        self.capacity = capacity
+        self.policy = policy
+        self.frames = OrderedDict()  # page number -> Frame, oldest first for LRU
+        self.clock = []  # page numbers in CLOCK order
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def _frame(self, pid):
+        frame = self.frames.get(pid)
+        if frame is not None:
+            self.hits += 1
+            if self.policy == "lru":
+                self.frames.move_to_end(pid)
+            else:
+                frame.referenced = True
+            return frame
+        self.misses += 1
+        return self._add(pid, self.load(pid))
+
+    def _add(self, pid, node):
+        while len(self.frames) >= self.capacity and self._evict():
+            pass
+        frame = Frame(node)
+        self.frames[pid] = frame
+        if self.policy == "clock":
+            self.clock.append(pid)
+        return frame
+
+    def _evict(self):
+        '''
+        Function _evict
+        This function evicts one unpinned page, writing it back first if it is dirty.
+        If every cached page is pinned, nothing is evicted and the pool grows past its capacity for a while.
+        Returns True if a page was evicted.
+        '''
+        victim = None
+        if self.policy == "lru":
+            for pid, frame in self.frames.items():
+                if frame.pins == 0:
+                    victim = pid
+                    break
+        else:
+            # sweep at most twice around the clock: the first round clears the reference bits
+            for _ in range(2 * len(self.clock)):
+                if self.hand >= len(self.clock):
+                    self.hand = 0
+                pid = self.clock[self.hand]
+                frame = self.frames[pid]
+                if frame.pins == 0 and not frame.referenced:
+                    victim = pid
+                    self.clock.pop(self.hand)
+                    break
+                frame.referenced = False
+                self.hand += 1
+        if victim is None:
+            return False
+        frame = self.frames.pop(victim)
+        if frame.dirty:
+            self.store(victim, frame.node)
+            self.writes += 1
+        self.evictions += 1
+        return True
+
+    def get(self, pid):
+        '''
+        Function get
+        This function returns the node of a page for reading. The node is not pinned, so it must not be changed.
+        Parameters:
+        pid -- the page number
+        '''
+        return self._frame(pid).node
+
+    def pin(self, pid):
+        '''
+        Function pin
+        This function returns the node of a page and keeps it in the pool until it is unpinned.
+        Parameters:
+        pid -- the page number
+        '''
+        frame = self._frame(pid)
+        frame.pins += 1
+        return frame.node
+
+    def unpin(self, pid, dirty=False):
+        '''
+        Function unpin
+        This function releases a pinned page. Pages that were freed in the meantime are ignored.
+        Parameters:
+        pid -- the page number
+        dirty -- True if the node was changed and must be written back
+        '''
+        frame = self.frames.get(pid)
+        if frame is not None:
+            frame.pins -= 1
+            frame.dirty = frame.dirty or dirty
+
+    def mark_dirty(self, pid):
+        '''
+        Function mark_dirty
+        This function marks a pinned page as changed.
+        Parameters:
+        pid -- the page number
+        '''
+        self.frames[pid].dirty = True
+
+    def new(self, node):
+        '''
+        Function new
+        This function allocates a page for a new node. The node is pinned and dirty.
+        Parameters:
+        node -- the new node
+        Returns the page number.
+        '''
+        pid = self.pages.allocate()
+        frame = self._add(pid, node)
+        frame.pins = 1
+        frame.dirty = True
+        return pid
+
+    def free(self, pid):
+        '''
+        Function free
+        This function drops a page from the pool, without writing it back, and puts it on the free list of the page file.
+        Parameters:
+        pid -- the page number
+        '''
+        if self.frames.pop(pid, None) is not None and self.policy == "clock":
+            position = self.clock.index(pid)
+            self.clock.pop(position)
+            if position < self.hand:
+                self.hand -= 1
+        self.pages.free(pid)
+
+    def flush(self):
+        '''
+        Function flush
+        This function writes back every dirty page. The pages stay in the pool.
+        '''
+        for pid, frame in self.frames.items():
+            if frame.dirty:
+                self.store(pid, frame.node)
+                frame.dirty = False
+                self.writes += 1
+
+    def clear(self):
+        '''
+        Function clear
+        This function writes back the dirty pages and empties the pool.
+        '''
+        self.flush()
+        self.frames.clear()
+        self.clock.clear()
+        self.hand = 0
+
+    def stats(self):
+        '''
+        Function stats
+        This function returns the counters of the pool.
+        Returns a dict with the number of cached pages, the capacity, hits, misses, hit rate, evictions and write-backs.
+        '''
+        lookups = self.hits + self.misses
+        return {'pages': len(self.frames), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0, 'evictions': self.evictions, 'writes': self.writes}
@@ -0,0 +1,373 @@
+'''
+Concurrent B tree.
+
+ConcurrentBTree lets many threads look up keys while other threads insert and delete. Every node has a
+readers-writer latch:
+- a lookup holds the shared latch of a node only until it holds the shared latch of the child it goes to
+  (latch coupling), so readers never wait for each other
+- an insert or a delete crabs down with exclusive latches. Like BTree, it splits a full child, or fills a child
+  with t - 1 keys, before going down into it, so a latched child can never split into or merge out of its parent,
+  and the latch of the parent is released as soon as the child is latched.
+The root pointer has its own latch, held by a writer only while the root itself may split or shrink.
+Latches are taken from the root down, and the latches of children only while their parent is latched, so two
+threads never wait for each other in a cycle.
+A range scan is a series of such lookups, each of which copies the keys of one leaf and the separator after it, so it
+never holds a latch while the caller consumes the keys.
+The tree must be built, e.g. with from_sorted, before it is shared. print_tree and visualize do not take latches,
+call them while no writer is running.
+'''
+import threading
+from bisect import bisect_left, bisect_right
+
+from b_tree_v0 import BTree, BTreeNode, key_typecode
+
+
+class RWLatch:
+    '''
+    Class RWLatch
+    This class is a readers-writer latch. A waiting writer keeps new readers out, so a steady stream of lookups
+    cannot starve the writers.
+    '''
+    __slots__ = ('lock', 'condition', 'readers', 'writer', 'waiting')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.readers = 0
+        self.writer = False
+        self.waiting = 0  # writers waiting for the latch
+
+    def acquire_shared(self):
+        lock = self.lock
+        lock.acquire()
+        # the common case, nobody writes, takes the lock only once
+        if self.writer or self.waiting:
+            while self.writer or self.waiting:
+                self.condition.wait()
+        self.readers += 1
+        lock.release()
+
+    def release_shared(self):
+        lock = self.lock
+        lock.acquire()
+        self.readers -= 1
+        if self.readers == 0 and self.waiting:
+            self.condition.notify_all()
+        lock.release()
+
+    def acquire_exclusive(self):
+        lock = self.lock
+        lock.acquire()
+        if self.writer or self.readers:
+            self.waiting += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting -= 1
+        self.writer = True
+        lock.release()
+
+    def release_exclusive(self):
+        lock = self.lock
+        lock.acquire()
+        self.writer = False
+        self.condition.notify_all()
+        lock.release()
+
+
+class LatchedNode(BTreeNode):
+    '''
+    Class LatchedNode
+    This class is a node of the B tree with its latch.
+    '''
+    __slots__ = ('latch',)
+
+    def __init__(self, leaf=False, typecode=None):
+        super().__init__(leaf, typecode)
+        self.latch = RWLatch()
+
+
+class ConcurrentBTree(BTree):
+    '''
+    Class ConcurrentBTree
+    This class is a B tree that many threads can use at once.
+    - get / search_many: lookups with shared latches, coupled from the root down
+    - range / items: scans made of coupled descents, one leaf at a time
+    - insertion / delete: latch crabbing with exclusive latches, splitting or filling a child before going down
+    '''
+    # the latched writers change their nodes in place, so there are no snapshots
+    copy_on_write = False
+
+    def __init__(self, t):
+        self.root_latch = RWLatch()  # protects the root pointer
+        super().__init__(t)
+
+    def _new_node(self, leaf):
+        return LatchedNode(leaf, self.typecode)
+
+    def _widen_keys(self):
+        '''
+        Function _widen_keys
+        This function moves the keys of every node to lists, see BTree._widen_keys. It is called with the root latch
+        held, and latches every node from the root down, so the writers already in the tree finish first.
+        '''
+        self.typecode = None
+        latched = [self.root]
+        self.root.latch.acquire_exclusive()
+        for x in latched:
+            x.keys = list(x.keys)
+            for child in x.child:
+                child.latch.acquire_exclusive()
+                latched.append(child)
+        for x in latched:
+            x.latch.release_exclusive()
+
+    def get(self, k, default=None):
+        '''
+        Function get
+        This function looks up the row number of a key, holding at most two shared latches at a time.
+        Parameters:
+        k -- the key to search
+        default -- the value to return if the key is not in the B tree
+        Returns the row number of the key if found, otherwise default.
+        '''
+        self.root_latch.acquire_shared()
+        x = self.root
+        x.latch.acquire_shared()
+        self.root_latch.release_shared()
+        try:
+            while True:
+                keys = x.keys
+                i = bisect_left(keys, k)
+                if i < len(keys) and k == keys[i]:
+                    return x.rows[i]
+                if x.leaf:
+                    return default
+                child = x.child[i]
+                child.latch.acquire_shared()
+                x.latch.release_shared()
+                x = child
+        finally:
+            x.latch.release_shared()
+
+    def search_many(self, keys):
+        '''
+        Function search_many
+        This function looks up many keys, each with its own descent so writers can run in between.
+        Parameters:
+        keys -- the keys to search
+        Returns a list with the row number of each key, or None if the key is not in the B tree.
+        '''
+        return [self.get(k) for k in keys]
+
+    def range(self, lo=None, hi=None, inclusive="left"):
+        '''
+        Function range
+        This function lazily yields the (key, row_number) tuples with a key between lo and hi in key order, like
+        BTree.range, while writers may run. Each step descends with shared latches, coupled as in get, to the leaf
+        after the last key yielded, and copies the keys of that leaf and the smallest separator above it that
+        follows them. A key that is in the tree during the whole scan is always yielded; a key inserted or deleted
+        meanwhile may or may not be.
+        Parameters:
+        lo -- the lower bound of the keys, None for no lower bound
+        hi -- the upper bound of the keys, None for no upper bound
+        inclusive -- which bounds are included: "both", "neither", "left" or "right", as in pandas Series.between
+        '''
+        if inclusive not in ("both", "neither", "left", "right"):
+            raise ValueError("inclusive must be 'both', 'neither', 'left' or 'right'")
+        search = bisect_left if inclusive in ("both", "left") else bisect_right
+        hi_closed = inclusive in ("both", "right")
+        while True:
+            entries, separator = self._scan_leaf(lo, search)
+            for key, row_number in entries:
+                if hi is not None and (key > hi or (key == hi and not hi_closed)):
+                    return
+                yield key, row_number
+            if separator is None:
+                return
+            key, row_number = separator
+            if hi is not None and (key > hi or (key == hi and not hi_closed)):
+                return
+            yield key, row_number
+            # the next descent starts after the separator
+            lo, search = key, bisect_right
+
+    def _scan_leaf(self, lo, search):
+        '''
+        Function _scan_leaf
+        This function makes one step of range: a descent with coupled shared latches towards lo.
+        Returns the (key, row_number) tuples of the leaf from lo on, and the smallest separator key after them with its
+        row number, or None at the end of the tree.
+        '''
+        separator = None
+        self.root_latch.acquire_shared()
+        x = self.root
+        x.latch.acquire_shared()
+        self.root_latch.release_shared()
+        while True:
+            keys = x.keys
+            i = 0 if lo is None else search(keys, lo)
+            if x.leaf:
+                entries = list(zip(keys[i:], x.rows[i:]))
+                x.latch.release_shared()
+                return entries, separator
+            # the keys below child i all come before keys[i], so the deepest separator is the smallest
+            if i < len(keys):
+                separator = (keys[i], x.rows[i])
+            child = x.child[i]
+            child.latch.acquire_shared()
+            x.latch.release_shared()
+            x = child
+
+    def insertion(self, k):
+        '''
+        Function insertion
+        This function inserts a key. A full child is split before the insert goes down into it, so the parent
+        is never changed again and its latch is released once the child is latched.
+        Parameters:
+        k -- the (key, row_number) tuple to be inserted
+        '''
+        key, row_number = k
+        full = 2 * self.t - 1
+        self.root_latch.acquire_exclusive()
+        root = self.root
+        if root.leaf and not root.keys:  # The key storage of an empty tree follows the type of its first key
+            self.typecode = key_typecode(key)
+            root = self.root = self._new_node(True)
+        elif self.typecode and not key_typecode(key):
+            self._widen_keys()
+        root.latch.acquire_exclusive()
+        if len(root.keys) == full:
+            x = self._new_node(False)
+            x.child.append(root)
+            x.latch.acquire_exclusive()
+            self.split_child(x, 0)
+            self.root = x
+            root.latch.release_exclusive()
+        else:
+            x = root
+        self.root_latch.release_exclusive()
+        while not x.leaf:
+            i = bisect_left(x.keys, key)
+            child = x.child[i]
+            child.latch.acquire_exclusive()
+            if len(child.keys) == full:
+                # the new right half is only reachable through x, which is latched
+                self.split_child(x, i)
+                if key > x.keys[i]:
+                    right = x.child[i + 1]
+                    right.latch.acquire_exclusive()
+                    child.latch.release_exclusive()
+                    child = right
+            x.latch.release_exclusive()
+            x = child
+        i = bisect_left(x.keys, key)
+        x.keys.insert(i, key)
+        x.rows.insert(i, row_number)
+        x.latch.release_exclusive()
+
+    def delete(self, k):
+        '''
+        Function delete
+        This function deletes a key in a single pass from the root down, like BTree.delete. A child with t - 1 keys
+        borrows from a sibling or is merged with it before the delete goes down into it, with the siblings latched
+        while the parent is latched.
+        Parameters:
+        k -- the key to delete
+        Returns True if the key was deleted, False if it is not in the B tree.
+        '''
+        t = self.t
+        self.root_latch.acquire_exclusive()
+        x = self.root
+        x.latch.acquire_exclusive()
+        root_latched = True
+        while not x.leaf:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and k == x.keys[i]:
+                left, right = x.child[i], x.child[i + 1]
+                left.latch.acquire_exclusive()
+                right.latch.acquire_exclusive()
+                if len(left.keys) >= t:
+                    x.keys[i], x.rows[i] = self._edge_entry(left, -1)
+                    k = x.keys[i]
+                    right.latch.release_exclusive()
+                    child = left
+                elif len(right.keys) >= t:
+                    x.keys[i], x.rows[i] = self._edge_entry(right, 0)
+                    k = x.keys[i]
+                    left.latch.release_exclusive()
+                    child = right
+                else:
+                    # both children are minimal: k goes down into their merge
+                    self.merge_nodes(x, i)
+                    right.latch.release_exclusive()
+                    child = left
+            else:
+                child = x.child[i]
+                child.latch.acquire_exclusive()
+                if len(child.keys) < t:
+                    child = self._fill_latched(x, i)
+            # shrink the tree when a merge took the last key of the root
+            if root_latched:
+                if not x.keys:
+                    self.root = child
+                self.root_latch.release_exclusive()
+                root_latched = False
+            x.latch.release_exclusive()
+            x = child
+        i = bisect_left(x.keys, k)
+        found = i < len(x.keys) and k == x.keys[i]
+        if found:
+            x.keys.pop(i)
+            x.rows.pop(i)
+        if root_latched:
+            self.root_latch.release_exclusive()
+        x.latch.release_exclusive()
+        return found
+
+    def delete_many(self, keys):
+        '''
+        Function delete_many
+        This function deletes a batch of keys, each with its own descent so readers can run in between.
+        Parameters:
+        keys -- the keys to delete
+        Returns the number of keys deleted, the keys that are not found are skipped.
+        '''
+        deleted = 0
+        for k in sorted(keys):
+            deleted += self.delete(k)
+        return deleted
+
+    def _edge_entry(self, x, side):
+        '''
+        Function _edge_entry
+        This function returns the last (side -1) or the first (side 0) key of the subtree of a latched node and its
+        row number, coupling shared latches below it.
+        '''
+        held = None
+        while not x.leaf:
+            x = x.child[side]
+            x.latch.acquire_shared()
+            if held is not None:
+                held.latch.release_shared()
+            held = x
+        entry = (x.keys[side], x.rows[side])
+        if held is not None:
+            held.latch.release_shared()
+        return entry
+
+    def _fill_latched(self, x, i):
+        '''
+        Function _fill_latched
+        This function latches the siblings of the latched child x.child[i] and fills it, see BTree.fill_child.
+        Returns the latched child that now covers the range of x.child[i]; the other latches are released.
+        '''
+        latched = [x.child[i]]
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(x.child):
+                x.child[j].latch.acquire_exclusive()
+                latched.append(x.child[j])
+        child = x.child[self.fill_child(x, i)]
+        for node in latched:
+            if node is not child:
+                node.latch.release_exclusive()
+        return child
@@ -0,0 +1,781 @@
+'''
+Persistent B tree stored in a page file.
+
+The file is split into fixed-size pages. Page 0 is the header with the root page, the minimum degree, the key format
+and a fingerprint of the data the index was built from, every other page holds one B tree node. The file is opened through mmap, so a lookup only reads the pages on its search path
+and reopening an index only reads the header. Decoded nodes are cached in a BufferPool.
+'''
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+from b_tree_v0 import BTree, BTreeNode, check_tree, draw_tree, freeze_tree, key_typecode, keys_typecode, tree_stats
+from buffer_pool import BufferPool
+
+PAGE_SIZE = 4096
+MAGIC = b'BTPF'
+VERSION = 2
+# magic, version, page size, minimum degree, root page, page count, first free page, key count, key kind, key size, key name,
+# source fingerprint
+HEADER = struct.Struct('<4sHIIIIIQcH64sQ')
+# leaf flag and number of keys at the start of every node page
+NODE_HEADER = struct.Struct('<?xH')
+ROW_SIZE = 8  # row numbers are stored as int64
+CHILD_SIZE = 4  # child page numbers are stored as uint32
+
+
+def node_size(t, key_size):
+    '''
+    Function node_size
+    This function computes the number of bytes of a full node page.
+    Parameters:
+    t -- the minimum degree of the B tree
+    key_size -- the number of bytes of one key
+    Returns the size of a node with 2t - 1 keys and 2t children.
+    '''
+    return NODE_HEADER.size + (2 * t - 1) * (key_size + ROW_SIZE) + 2 * t * CHILD_SIZE
+
+
+def max_degree_for_page(page_size=PAGE_SIZE, key_size=8):
+    '''
+    Function max_degree_for_page
+    This function computes the largest even maximum degree whose full nodes fit in one page.
+    Parameters:
+    page_size -- the size of a page in bytes
+    key_size -- the number of bytes of one key
+    Returns the maximum degree, i.e. twice the minimum degree.
+    '''
+    # node_size(t) = header - key_size - row_size + t * 2 * (key_size + row_size + child_size)
+    t = (page_size - NODE_HEADER.size + key_size + ROW_SIZE) // (2 * (key_size + ROW_SIZE + CHILD_SIZE))
+    return 2 * t
+
+
+def page_key_kind(keys):
+    '''
+    Function page_key_kind
+    This function picks the key format of a page file for the given keys.
+    Parameters:
+    keys -- the key values
+    Returns b'q' if every key is an integer that fits in 64 bits, b's' if every key is a string, otherwise None:
+    other keys, e.g. floats, cannot be stored in a page file.
+    '''
+    if keys_typecode(keys) == 'q':
+        return b'q'
+    if all(type(key) is str for key in keys):
+        return b's'
+    return None
+
+
+def key_size_for(keys):
+    '''
+    Function key_size_for
+    This function picks the number of bytes per key for a page file holding the given keys.
+    Parameters:
+    keys -- the key values
+    Returns 8 for integer keys that all fit in 64 bits, otherwise the longest UTF-8 encoded key rounded up to 8 bytes, with room for keys up to 32 bytes.
+    Raises TypeError if the keys cannot be stored in a page file, see page_key_kind.
+    '''
+    key_kind = page_key_kind(keys)
+    if key_kind is None:
+        raise TypeError("Only integer and string keys can be stored in an index file")
+    if key_kind == b'q':
+        return 8
+    longest = max((len(key.encode('utf-8')) for key in keys), default=0)
+    return max(32, -(-longest // 8) * 8)
+
+
+class PageFile:
+    '''
+    Class PageFile
+    This class is a file of fixed-size pages accessed through mmap. Page 0 holds the header.
+    Freed pages are chained into a free list and reused before the file grows.
+    '''
+    def __init__(self, path, header):
+        self.path = path
+        self.page_size = header['page_size']
+        self.header = header
+        self.file = open(path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+    @classmethod
+    def create(cls, path, t, key_kind, key_size, key_name='', page_size=PAGE_SIZE):
+        '''
+        Function create
+        This function creates a new page file with an empty root leaf and opens it.
+        Parameters:
+        path -- the path of the file
+        t -- the minimum degree of the B tree
+        key_kind -- b'q' for integer keys, b's' for string keys
+        key_size -- the number of bytes of one key
+        key_name -- the name of the indexed column
+        page_size -- the size of a page in bytes
+        Returns the PageFile object.
+        '''
+        if node_size(t, key_size) > page_size:
+            raise ValueError(f"Minimum degree {t} does not fit in a page of {page_size} bytes, "
+                             f"the largest maximum degree is {max_degree_for_page(page_size, key_size)}")
+        header = {'page_size': page_size, 't': t, 'root': 1, 'page_count': 2, 'free': 0, 'key_count': 0,
+                  'key_kind': key_kind, 'key_size': key_size, 'key_name': key_name, 'source': 0}
+        with open(path, 'wb') as file:
+            file.truncate(2 * page_size)
+        page_file = cls(path, header)
+        page_file.write_header()
+        page_file.write_page(1, NODE_HEADER.pack(True, 0))
+        return page_file
+
+    @classmethod
+    def open(cls, path):
+        '''
+        Function open
+        This function opens an existing page file. Only the header is read.
+        Parameters:
+        path -- the path of the file
+        Returns the PageFile object.
+        '''
+        with open(path, 'rb') as file:
+            raw = file.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{path} is not a B tree page file")
+        magic, version, page_size, t, root, page_count, free, key_count, key_kind, key_size, key_name, source = \
+            HEADER.unpack(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a B tree page file")
+        header = {'page_size': page_size, 't': t, 'root': root, 'page_count': page_count, 'free': free,
+                  'key_count': key_count, 'key_kind': key_kind, 'key_size': key_size,
+                  'key_name': key_name.rstrip(b'\0').decode('utf-8'), 'source': source}
+        return cls(path, header)
+
+    def write_header(self):
+        h = self.header
+        self.mm[:HEADER.size] = HEADER.pack(MAGIC, VERSION, h['page_size'], h['t'], h['root'], h['page_count'], h['free'],
+                                            h['key_count'], h['key_kind'], h['key_size'], h['key_name'].encode('utf-8'),
+                                            h['source'])
+
+    def read_page(self, pid):
+        '''
+        Function read_page
+        This function returns a read-only view of a page, without copying it.
+        Parameters:
+        pid -- the page number
+        '''
+        offset = pid * self.page_size
+        return memoryview(self.mm)[offset:offset + self.page_size].toreadonly()
+
+    def write_page(self, pid, data):
+        '''
+        Function write_page
+        This function writes data at the start of a page.
+        Parameters:
+        pid -- the page number
+        data -- the bytes to write, at most one page
+        '''
+        offset = pid * self.page_size
+        self.mm[offset:offset + len(data)] = data
+
+    def allocate(self):
+        '''
+        Function allocate
+        This function returns a free page number, from the free list if possible, otherwise by growing the file.
+        '''
+        h = self.header
+        if h['free']:
+            pid = h['free']
+            h['free'] = struct.unpack_from('<I', self.mm, pid * self.page_size)[0]
+            return pid
+        pid = h['page_count']
+        h['page_count'] += 1
+        if h['page_count'] * self.page_size > len(self.mm):
+            # grow the file by doubling, so appending n pages remaps O(log n) times
+            self.mm.close()
+            self.file.truncate(2 * h['page_count'] * self.page_size)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+        return pid
+
+    def free(self, pid):
+        '''
+        Function free
+        This function puts a page on the free list.
+        Parameters:
+        pid -- the page number
+        '''
+        struct.pack_into('<I', self.mm, pid * self.page_size, self.header['free'])
+        self.header['free'] = pid
+
+    def flush(self):
+        self.write_header()
+        self.mm.flush()
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+        self.file.close()
+
+
+class DiskBTree:
+    '''
+    class DiskBTree
+    This class is a B tree whose nodes live in a PageFile. It has the same insertion, searching, delete, delete_many,
+    get, search_many, range, items, stats, check and check_key methods as BTree. Decoded nodes are cached in a BufferPool;
+    a node that is changed is pinned while it is in use and written back to its page when it is evicted or on flush.
+    The children of a decoded node are page numbers.
+    '''
+    def __init__(self, pages, **cache_options):
+        self.pages = pages
+        self.t = pages.header['t']
+        self.key_size = pages.header['key_size']
+        self.typecode = 'q' if pages.header['key_kind'] == b'q' else None
+        self.pool = BufferPool(pages, self._read_node, self._write_node, **cache_options)
+
+    @classmethod
+    def create(cls, path, t, key_kind=b'q', key_size=8, key_name='', page_size=PAGE_SIZE, **cache_options):
+        '''
+        Function create
+        This function creates an empty B tree in a new page file.
+        Parameters:
+        path -- the path of the file
+        t -- the minimum degree of the B tree
+        key_kind -- b'q' for integer keys, b's' for string keys
+        key_size -- the number of bytes of one key, 8 for integer keys
+        key_name -- the name of the indexed column
+        page_size -- the size of a page in bytes
+        cache_options -- capacity, capacity_bytes and policy of the buffer pool
+        Returns the DiskBTree object.
+        '''
+        if key_kind == b'q':
+            key_size = 8
+        return cls(PageFile.create(path, t, key_kind, key_size, key_name, page_size), **cache_options)
+
+    @classmethod
+    def open(cls, path, **cache_options):
+        '''
+        Function open
+        This function opens a B tree page file. Only the header is read, the nodes are read when they are visited.
+        Parameters:
+        path -- the path of the file
+        cache_options -- capacity, capacity_bytes and policy of the buffer pool
+        Returns the DiskBTree object.
+        '''
+        return cls(PageFile.open(path), **cache_options)
+
+    @classmethod
+    def from_btree(cls, path, btree, key_size=32, key_name='', page_size=PAGE_SIZE, source=0, **cache_options):
+        '''
+        Function from_btree
+        This function writes an in-memory B tree into a new page file, children before their parent.
+        Parameters:
+        path -- the path of the file
+        btree -- the BTree object to write
+        key_size -- the number of bytes of one string key, integer keys always take 8 bytes
+        key_name -- the name of the indexed column
+        page_size -- the size of a page in bytes
+        source -- a fingerprint of the data the B tree was built from, 0 if unknown
+        cache_options -- capacity, capacity_bytes and policy of the buffer pool
+        Returns the DiskBTree object. Raises TypeError if the keys are not all integers or all strings.
+        '''
+        key_kind = b'q' if btree.typecode == 'q' else page_key_kind([key for key, _ in btree.items()])
+        if key_kind is None:
+            raise TypeError("Only integer and string keys can be stored in an index file")
+        tree = cls.create(path, btree.t, key_kind, key_size, key_name, page_size, **cache_options)
+
+        def write(x, pid):
+            node = BTreeNode(x.leaf, tree.typecode)
+            node.keys = x.keys
+            node.rows = x.rows
+            for child in x.child:
+                child_pid = tree.pages.allocate()
+                write(child, child_pid)
+                node.child.append(child_pid)
+            tree._write_node(pid, node)
+
+        write(btree.root, tree.root_pid)
+        tree.pages.header['key_count'] = sum(1 for _ in btree.items())
+        tree.pages.header['source'] = source
+        tree.pages.flush()
+        return tree
+
+    @property
+    def root_pid(self):
+        return self.pages.header['root']
+
+    @property
+    def root(self):
+        return self.pool.get(self.root_pid)
+
+    @property
+    def key_count(self):
+        return self.pages.header['key_count']
+
+    @property
+    def source(self):
+        # the fingerprint given to from_btree, 0 once the B tree is changed
+        return self.pages.header['source']
+
+    def _read_node(self, pid):
+        '''
+        Function _read_node
+        This function decodes the node stored in a page.
+        Parameters:
+        pid -- the page number
+        Returns the BTreeNode, whose children are page numbers.
+        '''
+        page = self.pages.read_page(pid)
+        leaf, n = NODE_HEADER.unpack_from(page)
+        node = BTreeNode(leaf, self.typecode)
+        offset = NODE_HEADER.size
+        key_bytes = page[offset:offset + n * self.key_size]
+        if self.typecode:
+            node.keys.frombytes(key_bytes)
+        else:
+            size = self.key_size
+            node.keys = [bytes(key_bytes[j:j + size]).rstrip(b'\0').decode('utf-8') for j in range(0, n * size, size)]
+        offset += n * self.key_size
+        node.rows.frombytes(page[offset:offset + n * ROW_SIZE])
+        if not leaf:
+            offset += n * ROW_SIZE
+            children = array('I')
+            children.frombytes(page[offset:offset + (n + 1) * CHILD_SIZE])
+            node.child = children.tolist()
+        return node
+
+    def _write_node(self, pid, node):
+        '''
+        Function _write_node
+        This function encodes a node into its page.
+        Parameters:
+        pid -- the page number
+        node -- the BTreeNode, whose children are page numbers
+        '''
+        if self.typecode:
+            key_bytes = node.keys.tobytes() if isinstance(node.keys, array) else array('q', node.keys).tobytes()
+        else:
+            key_bytes = b''.join(key.encode('utf-8').ljust(self.key_size, b'\0') for key in node.keys)
+        data = [NODE_HEADER.pack(node.leaf, len(node.keys)), key_bytes, node.rows.tobytes()]
+        if not node.leaf:
+            data.append(array('I', node.child).tobytes())
+        self.pages.write_page(pid, b''.join(data))
+
+    def check_key(self, k):
+        '''
+        Function check_key
+        This function checks that a key can be stored in the pages of the index, before it is inserted.
+        Parameters:
+        k -- the key
+        Raises TypeError if the key does not match the key type of the index and ValueError if a string key is
+        longer than the key size of the pages.
+        '''
+        if (key_typecode(k) != 'q') if self.typecode else (type(k) is not str):
+            raise TypeError(f"Key {k!r} does not match the key type of the index")
+        if not self.typecode and len(k.encode('utf-8')) > self.key_size:
+            raise ValueError(f"Key longer than {self.key_size} bytes does not fit in the index")
+
+    def insertion(self, k):
+        '''
+        Function insertion
+        This function inserts a key into the B tree, splitting full nodes on the way down.
+        Parameters:
+        k -- the (key, row_number) tuple to be inserted
+        '''
+        self.check_key(k[0])
+        t = self.t
+        pool = self.pool
+        x_pid = self.root_pid
+        x = pool.pin(x_pid)
+        if len(x.keys) == (2 * t) - 1:  # If root is full, split it
+            new_root = BTreeNode(False, self.typecode)
+            new_root.child.append(x_pid)
+            new_pid = pool.new(new_root)
+            self.split_child(new_pid, new_root, 0, x)
+            pool.unpin(x_pid)
+            self.pages.header['root'] = new_pid
+            x_pid, x = new_pid, new_root
+        key, row_number = k
+        while True:
+            i = bisect_left(x.keys, key)
+            if x.leaf:
+                x.keys.insert(i, key)
+                x.rows.insert(i, row_number)
+                pool.unpin(x_pid, dirty=True)
+                break
+            child_pid = x.child[i]
+            child = pool.pin(child_pid)
+            if len(child.keys) == (2 * t) - 1:
+                self.split_child(x_pid, x, i, child)
+                if key > x.keys[i]:
+                    pool.unpin(child_pid)
+                    i += 1
+                    child_pid = x.child[i]
+                    child = pool.pin(child_pid)
+            pool.unpin(x_pid)
+            x_pid, x = child_pid, child
+        self.pages.header['key_count'] += 1
+        self.pages.header['source'] = 0
+
+    def split_child(self, x_pid, x, i, left_child):
+        '''
+        Function split_child
+        This function splits a full child node into a new page and marks the three changed pages dirty.
+        Parameters:
+        x_pid -- the page number of the pinned parent node
+        x -- the parent node
+        i -- the index of the child to split
+        left_child -- the pinned child x.child[i]
+        '''
+        t = self.t
+        right_child = BTreeNode(left_child.leaf, self.typecode)
+        right_pid = self.pool.new(right_child)
+
+        x.child.insert(i + 1, right_pid)
+        x.keys.insert(i, left_child.keys[t - 1])
+        x.rows.insert(i, left_child.rows[t - 1])
+
+        right_child.keys = left_child.keys[t:]
+        right_child.rows = left_child.rows[t:]
+        del left_child.keys[t - 1:]
+        del left_child.rows[t - 1:]
+        if not left_child.leaf:
+            right_child.child = left_child.child[t:]
+            del left_child.child[t:]
+
+        self.pool.mark_dirty(x.child[i])
+        self.pool.mark_dirty(x_pid)
+        self.pool.unpin(right_pid, dirty=True)
+
+    def searching(self, k):
+        '''
+        Function searching
+        This function searches for a key, reading only the pages on the search path.
+        Parameters:
+        k -- the key to search
+        Returns the decoded node and index of the key if found, otherwise None.
+        '''
+        get = self.pool.get
+        x = get(self.root_pid)
+        while True:
+            i = bisect_left(x.keys, k)
+            if i < len(x.keys) and k == x.keys[i]:
+                return (x, i)
+            if x.leaf:
+                return None
+            x = get(x.child[i])
+
+    def get(self, k, default=None):
+        '''
+        Function get
+        This function looks up the row number of a key.
+        Parameters:
+        k -- the key to search
+        default -- the value to return if the key is not in the B tree
+        Returns the row number of the key if found, otherwise default.
+        '''
+        result = self.searching(k)
+        if result is None:
+            return default
+        x, i = result
+        return x.rows[i]
+
+    def __contains__(self, k):
+        return self.searching(k) is not None
+
+    def search_many(self, keys):
+        '''
+        Function search_many
+        This function looks up many keys, in sorted order so that consecutive searches share their cached upper pages.
+        Parameters:
+        keys -- an iterable of keys, a NumPy array or a pandas Series
+        Returns a list of row numbers in the order of the keys, with None for keys that are not found.
+        '''
+        keys = keys.tolist() if hasattr(keys, 'tolist') else list(keys)
+        results = [None] * len(keys)
+        for j in sorted(range(len(keys)), key=keys.__getitem__):
+            results[j] = self.get(keys[j])
+        return results
+
+    def range(self, lo=None, hi=None, inclusive="left"):
+        '''
+        Function range
+        This function lazily yields the (key, row_number) tuples with a key between lo and hi in key order.
+        Parameters:
+        lo -- the lower bound of the keys, None for no lower bound
+        hi -- the upper bound of the keys, None for no upper bound
+        inclusive -- which bounds are included: "both", "neither", "left" or "right", as in pandas Series.between
+        '''
+        if inclusive not in ("both", "neither", "left", "right"):
+            raise ValueError("inclusive must be 'both', 'neither', 'left' or 'right'")
+        lo_search = bisect_left if inclusive in ("both", "left") else bisect_right
+        hi_closed = inclusive in ("both", "right")
+        hi_search = bisect_right if hi_closed else bisect_left
+        get = self.pool.get
+
+        stack = []
+        x = get(self.root_pid)
+        while True:
+            i = 0 if lo is None else lo_search(x.keys, lo)
+            stack.append((x, i))
+            if x.leaf:
+                break
+            x = get(x.child[i])
+
+        while stack:
+            x, i = stack.pop()
+            keys = x.keys
+            if x.leaf:
+                end = len(keys) if hi is None else hi_search(keys, hi, i)
+                for j in range(i, end):
+                    yield keys[j], x.rows[j]
+                if end < len(keys):
+                    return
+            elif i < len(keys):
+                if hi is not None and (keys[i] > hi or (keys[i] == hi and not hi_closed)):
+                    return
+                yield keys[i], x.rows[i]
+                stack.append((x, i + 1))
+                x = get(x.child[i + 1])
+                while True:
+                    stack.append((x, 0))
+                    if x.leaf:
+                        break
+                    x = get(x.child[0])
+
+    def items(self):
+        '''
+        Function items
+        This function lazily yields all (key, row_number) tuples of the B tree in key order.
+        '''
+        return self.range()
+
+    def delete(self, k):
+        '''
+        Function delete
+        This function deletes a key in a single pass from the root down. Before going down into a child with only t - 1 keys,
+        the child borrows a key from a sibling or is merged with it, so the key can always be removed where it is found.
+        Parameters:
+        k -- the key to delete
+        Returns True if the key was deleted, False if it is not in the B tree.
+        '''
+        t = self.t
+        pool = self.pool
+        x_pid = self.root_pid
+        x = pool.pin(x_pid)
+        while True:
+            i = bisect_left(x.keys, k)
+            found = i < len(x.keys) and k == x.keys[i]
+            if x.leaf:
+                if found:
+                    x.keys.pop(i)
+                    x.rows.pop(i)
+                    self.pages.header['key_count'] -= 1
+                    self.pages.header['source'] = 0
+                pool.unpin(x_pid, dirty=found)
+                return found
+            if found:
+                left_pid, right_pid = x.child[i], x.child[i + 1]
+                left, right = pool.pin(left_pid), pool.pin(right_pid)
+                if len(left.keys) >= t:
+                    # replace k by its predecessor, then delete the predecessor from the left subtree
+                    leaf = left
+                    while not leaf.leaf:
+                        leaf = pool.get(leaf.child[-1])
+                    x.keys[i], x.rows[i] = leaf.keys[-1], leaf.rows[-1]
+                    k = leaf.keys[-1]
+                    pool.unpin(right_pid)
+                    child_pid, child = left_pid, left
+                elif len(right.keys) >= t:
+                    # replace k by its successor, then delete the successor from the right subtree
+                    leaf = right
+                    while not leaf.leaf:
+                        leaf = pool.get(leaf.child[0])
+                    x.keys[i], x.rows[i] = leaf.keys[0], leaf.rows[0]
+                    k = leaf.keys[0]
+                    pool.unpin(left_pid)
+                    child_pid, child = right_pid, right
+                else:
+                    # both children are minimal: pull k down into the merged child and continue there
+                    self.merge_nodes(x_pid, x, i, left, right)
+                    child_pid, child = left_pid, left
+                pool.mark_dirty(x_pid)
+            else:
+                child_pid = x.child[i]
+                child = pool.pin(child_pid)
+                if len(child.keys) < t:
+                    child_pid, child = self.fill_child(x_pid, x, i, child)
+            pool.unpin(x_pid)
+            self._shrink_root(x_pid, x, child_pid)
+            x_pid, x = child_pid, child
+
+    def delete_many(self, keys):
+        '''
+        Function delete_many
+        This function deletes a batch of keys in key order, one descent per key. The pages of neighbouring keys are
+        still in the buffer pool when the next descent reaches them.
+        Parameters:
+        keys -- the keys to delete
+        Returns the number of keys deleted, the keys that are not found are skipped.
+        '''
+        deleted = 0
+        for k in sorted(keys):
+            deleted += self.delete(k)
+        return deleted
+
+    def _shrink_root(self, x_pid, x, child_pid):
+        '''
+        Function _shrink_root
+        This function makes the child the new root when a merge took the last key of the root.
+        '''
+        if x_pid == self.root_pid and not x.keys:
+            self.pages.header['root'] = child_pid
+            self.pool.free(x_pid)
+
+    def fill_child(self, x_pid, x, i, child):
+        '''
+        Function fill_child
+        This function gives the child x.child[i], which has t - 1 keys, at least t keys by borrowing from a sibling
+        through the parent, or by merging it with a sibling.
+        Parameters:
+        x_pid -- the page number of the pinned parent node
+        x -- the parent node
+        i -- the index of the child
+        child -- the pinned child
+        Returns the page number and pinned node of the child that now covers the range of x.child[i].
+        '''
+        t = self.t
+        pool = self.pool
+        child_pid = x.child[i]
+        if i > 0:
+            left_pid = x.child[i - 1]
+            left = pool.pin(left_pid)
+            if len(left.keys) >= t:
+                child.keys.insert(0, x.keys[i - 1])
+                child.rows.insert(0, x.rows[i - 1])
+                x.keys[i - 1], x.rows[i - 1] = left.keys.pop(), left.rows.pop()
+                if not child.leaf:
+                    child.child.insert(0, left.child.pop())
+                pool.unpin(left_pid, dirty=True)
+                pool.mark_dirty(child_pid)
+                pool.mark_dirty(x_pid)
+                return child_pid, child
+        if i < len(x.child) - 1:
+            if i > 0:
+                pool.unpin(left_pid)
+            right_pid = x.child[i + 1]
+            right = pool.pin(right_pid)
+            if len(right.keys) >= t:
+                child.keys.append(x.keys[i])
+                child.rows.append(x.rows[i])
+                x.keys[i], x.rows[i] = right.keys.pop(0), right.rows.pop(0)
+                if not child.leaf:
+                    child.child.append(right.child.pop(0))
+                pool.unpin(right_pid, dirty=True)
+                pool.mark_dirty(child_pid)
+                pool.mark_dirty(x_pid)
+                return child_pid, child
+            self.merge_nodes(x_pid, x, i, child, right)
+            return child_pid, child
+        self.merge_nodes(x_pid, x, i - 1, left, child)
+        return left_pid, left
+
+    def merge_nodes(self, x_pid, x, idx, left_child, right_child):
+        '''
+        Function merge_nodes
+        This function merges x.child[idx + 1] and the separator x.keys[idx] into x.child[idx] and frees the right page.
+        The parent and both children must be pinned; the left child stays pinned.
+        Parameters:
+        x_pid -- the page number of the parent node
+        x -- the parent node
+        idx -- the index of the left child
+        left_child -- the left child
+        right_child -- the right child
+        '''
+        left_child.keys.append(x.keys.pop(idx))
+        left_child.rows.append(x.rows.pop(idx))
+        left_child.keys.extend(right_child.keys)
+        left_child.rows.extend(right_child.rows)
+        if not left_child.leaf:
+            left_child.child.extend(right_child.child)
+        self.pool.free(x.child.pop(idx + 1))
+        self.pool.mark_dirty(x.child[idx])
+        self.pool.mark_dirty(x_pid)
+
+    def to_btree(self):
+        '''
+        Function to_btree
+        This function reads the whole page file into an in-memory BTree.
+        Returns the BTree object.
+        '''
+        self.pool.flush()
+        btree = BTree(self.t)
+        btree.typecode = self.typecode
+
+        def read(pid):
+            node = self._read_node(pid)
+            node.child = [read(child_pid) for child_pid in node.child]
+            return node
+
+        btree.root = read(self.root_pid)
+        return btree
+
+    def print_tree(self, x=None, l=0, prefix="", max_level=None):
+        '''
+        Function print_tree
+        This function prints the B tree.
+        Parameters:
+        x -- the node to start printing from, the root if None
+        l -- the level of the node
+        prefix -- the prefix to print before the node
+        max_level -- the number of levels to print, all of them if None
+        '''
+        if x is None:
+            x = self.root
+        if l == 0:
+            print("Root:", end=" ")
+        else:
+            print(prefix + "Level " + str(l) + ":", end=" ")
+        print("[" + ", ".join(str(key) for key in x.entries()) + "]")
+        if not x.leaf and (max_level is None or l + 1 < max_level):
+            for child_pid in x.child:
+                self.print_tree(self.pool.get(child_pid), l + 1, prefix + " " * (12 + l * 4), max_level)
+
+    def visualize(self, max_level=None, max_children=None, path=None):
+        '''
+        Function visualize
+        This function visualizes the B tree. Only the pages of the drawn nodes are read.
+        Parameters:
+        max_level -- the number of levels to draw, all of them if None
+        max_children -- the largest number of children drawn under a node, all of them if None
+        path -- an image file to save the drawing to instead of showing it
+        '''
+        draw_tree(self.freeze(max_level, max_children), path=path)
+
+    def freeze(self, max_level=None, max_children=None):
+        '''
+        Function freeze
+        This function copies the part of the B tree that visualize would draw, see freeze_tree.
+        '''
+        return freeze_tree(self.root, max_level, max_children, self.pool.get)
+
+    def stats(self):
+        '''
+        Function stats
+        This function measures the shape of the B tree, see tree_stats. Every node uses one page.
+        '''
+        return tree_stats(self.root, self.t, self.pool.get, node_bytes=lambda node: self.pages.page_size)
+
+    def check(self):
+        '''
+        Function check
+        This function checks the invariants of the B tree, see check_tree.
+        Returns a list of the problems found, empty if the B tree is valid.
+        '''
+        return check_tree(self.root, self.t, self.pool.get)
+
+    def flush(self):
+        '''
+        Function flush
+        This function writes back the dirty pages of the buffer pool and then the header.
+        '''
+        self.pool.flush()
+        self.pages.flush()
+
+    def close(self):
+        self.pool.flush()
+        self.pages.close()
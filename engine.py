@@ -0,0 +1,557 @@
+'''
+Engine of the mini database.
+
+MiniDatabase holds the table, the index, the write-ahead log and the renderer, and runs the insert, search and
+delete operations on them. The interactive menu in mini_database.py and the batch mode in batch.py both use it,
+so prompts and command parsing stay out of the operations.
+'''
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import parallel_build
+from b_tree_v0 import BTree, BPlusTree
+from disk_btree import DiskBTree
+from instrument import STATS
+from keys import KeyCodec
+from read_data import check_index
+from render import Renderer
+from query import run_query
+from row_store import RowStore
+from secondary_index import DEFAULT_DEGREE, SecondaryIndex
+from snapshot import read_snapshot, write_snapshot
+from wal import WriteAheadLog, LOG_NAME, read_checkpoint, write_checkpoint
+
+# number of logged inserts and deletes between two checkpoints
+CHECKPOINT_INTERVAL = 1000
+
+
+class MiniDatabase:
+    '''
+    Class MiniDatabase
+    This class runs the operations of the mini database on a RowStore and its B tree index.
+    - insert / delete / delete_many: change the table and the index, logged first if a log is open
+    - search / search_many / range: look up rows by key
+    - open_log / checkpoint / recover: durability through the write-ahead log
+    - save_snapshot / load_snapshot: a binary copy of the table and the index for a fast start
+    - create_index / drop_index / query: secondary indexes on columns that are not unique, and queries that use them
+    Keys are converted to the types of the key columns by a KeyCodec, so the text typed at a prompt finds numeric keys.
+    '''
+    def __init__(self, data, btree, user_defined_key, tree_type=BTree, renderer=None, encoded=False):
+        '''
+        Parameters:
+        data -- the RowStore of the data
+        btree -- the BTree, BPlusTree or DiskBTree object, None until the degree of a new table is chosen
+        user_defined_key -- the indexed column, or a tuple of columns for a composite key
+        tree_type -- the class of the index, BTree or BPlusTree
+        renderer -- the Renderer that shows the tree after a change, nothing is shown if None
+        encoded -- True if the B tree stores the keys as order-preserving bytes
+        '''
+        self.data = data
+        self.btree = btree
+        self.user_defined_key = user_defined_key
+        self.codec = KeyCodec(user_defined_key, encoded)
+        self.tree_type = tree_type
+        self.renderer = renderer if renderer is not None else Renderer("off")
+        self.indexes = {}  # name -> SecondaryIndex
+        self.log = None
+        self.log_directory = None
+
+    @classmethod
+    def from_frame(cls, data, user_defined_key, t, tree_type=BTree, renderer=None, encoded=False):
+        '''
+        Function from_frame
+        This function builds a database from a dataframe with a 'row_number' column, bulk loading the index.
+        Parameters:
+        data -- the dataframe of the data
+        user_defined_key -- the indexed column, or a tuple of columns for a composite key
+        t -- the minimum degree of the index
+        tree_type -- the class of the index, BTree or BPlusTree
+        renderer -- the Renderer that shows the tree after a change
+        encoded -- True to store the keys as order-preserving bytes
+        Returns the MiniDatabase object.
+        '''
+        btree = tree_type(t)
+        with STATS.phase('encode keys'):
+            keys = KeyCodec(user_defined_key, encoded).frame_keys(data)
+        # build the BTree bottom-up from the sorted keys instead of inserting one by one
+        btree.bulk_load(list(zip(keys, data['row_number'].tolist())))
+        with STATS.phase('store rows'):
+            data = RowStore.from_frame(data)
+        return cls(data, btree, user_defined_key, tree_type, renderer, encoded)
+
+    @classmethod
+    def from_chunks(cls, chunks, user_defined_key, t=None, tree_type=BTree, renderer=None, progress=None,
+                    encoded=False):
+        '''
+        Function from_chunks
+        This function builds a database from a stream of dataframes, e.g. read_chunks. Each chunk is checked, added to
+        the table and indexed before the next one is read, so besides the table and the index only one chunk is in memory.
+        Parameters:
+        chunks -- an iterable of dataframes with the same columns
+        user_defined_key -- the indexed column, or a tuple of columns, it must be unique over all the chunks
+        t -- the minimum degree of the index. If None, no index is built and the keys are only checked within a chunk.
+        tree_type -- the class of the index, BTree or BPlusTree
+        renderer -- the Renderer that shows the tree after a change
+        progress -- a function called after every chunk with the number of rows so far and the seconds since the start
+        encoded -- True to store the keys as order-preserving bytes
+        Returns the MiniDatabase object. Raises an Exception if the key column is not unique.
+        '''
+        start = time.perf_counter()
+        codec = KeyCodec(user_defined_key, encoded)
+        data = None
+        btree = tree_type(t) if t is not None else None
+        for chunk in chunks:
+            # the chunk alone must have unique string or numeric keys
+            with STATS.phase('check keys'):
+                check_index(chunk, user_defined_key)
+            first_row = data.next_row_number if data is not None else 0
+            chunk['row_number'] = range(first_row, first_row + chunk.shape[0])
+            if btree is not None:
+                with STATS.phase('encode keys'):
+                    keys = codec.frame_keys(chunk)
+                pairs = sorted(zip(keys, chunk['row_number'].tolist()))
+                if not btree.root.keys:
+                    btree.bulk_load(pairs)
+                else:
+                    # the chunk must not repeat a key of the earlier chunks
+                    repeated = [key for key, row in zip(keys, btree.search_many(keys)) if row is not None]
+                    if repeated:
+                        position = keys.index(repeated[0])
+                        key = tuple(chunk[column].tolist()[position] for column in codec.columns)
+                        raise Exception(f"Column is not unique, the key {key if codec.composite else key[0]} is repeated")
+                    with STATS.phase('index chunk'):
+                        for pair in pairs:
+                            btree.insertion(pair)
+            with STATS.phase('store rows'):
+                if data is None:
+                    data = RowStore.from_frame(chunk)
+                else:
+                    data.extend(chunk)
+            if progress is not None:
+                progress(data.shape[0], time.perf_counter() - start)
+        if data is None:
+            raise ValueError("The data has no rows and no columns")
+        return cls(data, btree, user_defined_key, tree_type, renderer, encoded)
+
+    def build_index(self, t, workers=1):
+        '''
+        Function build_index
+        This function builds the index of the table bottom-up from its key column.
+        Parameters:
+        t -- the minimum degree of the index
+        workers -- the number of processes that sort the keys, see parallel_build. Only a key of one integer column
+                   is sorted in parallel, other keys are sorted in this process.
+        Raises an Exception if the key column is not unique.
+        '''
+        column = self.data.columns[self.codec.columns[0]]
+        if workers != 1 and not self.codec.composite and not self.codec.encoded and column.dtype.kind in 'iu' \
+                and np.can_cast(column.dtype, np.int64):
+            # the key and row number arrays of the live rows are shared with the workers as they are
+            live = np.flatnonzero(self.data.live)
+            self.btree = parallel_build.build_index(column[live], self.data.columns['row_number'][live], t,
+                                                    self.tree_type, workers)
+            return
+        frame = self.data.to_frame()
+        check_index(frame, self.user_defined_key)
+        self.btree = self.tree_type(t)
+        self.btree.bulk_load(list(zip(self.codec.frame_keys(frame), frame['row_number'].tolist())))
+
+    def key_fingerprint(self):
+        '''
+        Function key_fingerprint
+        This function computes a checksum of the key columns and the row numbers of the live rows, in row order. An index
+        built from a table with the same fingerprint maps the same keys to the same row numbers.
+        Returns a non-zero 64-bit integer.
+        '''
+        digest = hashlib.blake2b(digest_size=8)
+        live = self.data.live[:self.data.size]
+        for name in self.codec.columns + ['row_number']:
+            column = self.data.columns[name][:self.data.size][live]
+            if column.dtype == object:
+                digest.update('\x1f'.join(map(repr, column.tolist())).encode('utf-8'))
+            else:
+                digest.update(column.dtype.str.encode('ascii'))
+                digest.update(np.ascontiguousarray(column).tobytes())
+            digest.update(b'\x1e')
+        return int.from_bytes(digest.digest(), 'little') or 1
+
+    def create_tree(self, t):
+        '''
+        Function create_tree
+        This function creates the empty index of a new table.
+        Parameters:
+        t -- the minimum degree of the index
+        '''
+        self.btree = self.tree_type(t)
+        if self.log is not None:
+            # keep the degree in a checkpoint before the first insert is logged
+            self.checkpoint()
+
+    def create_index(self, column, name=None, t=None):
+        '''
+        Function create_index
+        This function creates a secondary index on a column whose values can repeat.
+        Parameters:
+        column -- the indexed column
+        name -- the name of the index, the column name if None
+        t -- the minimum degree of the B tree of the index, the degree of the key index if None
+        Returns the SecondaryIndex object. Raises KeyError for an unknown column and ValueError if the name is taken
+        or the column mixes values that do not compare.
+        '''
+        name = name or column
+        if column not in self.data.column_names:
+            raise KeyError(f"The column {column} is not in the table")
+        if column in self.codec.columns or column == 'row_number':
+            raise ValueError(f"The column {column} is already indexed by the key index")
+        if name in self.indexes:
+            raise ValueError(f"There is already an index named {name}")
+        t = t or (self.btree.t if self.btree is not None else DEFAULT_DEGREE)
+        self.indexes[name] = index = SecondaryIndex.build(self.data, column, t, self.tree_type)
+        if self.log is not None:
+            # the indexes are rebuilt from the checkpoint at recovery
+            self.checkpoint()
+        return index
+
+    def drop_index(self, name):
+        '''
+        Function drop_index
+        This function removes a secondary index.
+        Parameters:
+        name -- the name of the index
+        Raises KeyError if there is no index with the name.
+        '''
+        if name not in self.indexes:
+            raise KeyError(f"There is no index named {name}")
+        del self.indexes[name]
+        if self.log is not None:
+            self.checkpoint()
+
+    def index_on(self, column):
+        '''
+        Function index_on
+        This function finds a secondary index on a column.
+        Parameters:
+        column -- the column
+        Returns the SecondaryIndex object, or None if the column has no secondary index.
+        '''
+        for index in self.indexes.values():
+            if index.column == column:
+                return index
+        return None
+
+    def _build_indexes(self, definitions):
+        # definitions: name -> (column, t), as kept in checkpoints and snapshots
+        for name, (column, t) in definitions.items():
+            self.indexes[name] = SecondaryIndex.build(self.data, column, t, self.tree_type)
+
+    def _index_definitions(self):
+        return {name: (index.column, index.btree.t) for name, index in self.indexes.items()}
+
+    def _normalize(self, key):
+        # a key that cannot have the types of the key columns is in no row
+        try:
+            return self.codec.normalize(self.data, key)
+        except (TypeError, ValueError):
+            return None
+
+    def _key(self, key):
+        values = self._normalize(key)
+        return None if values is None else self.codec.encode(values)
+
+    def insert(self, key, values):
+        '''
+        Function insert
+        This function inserts a new row into the table and the BTree.
+        Parameters:
+        key -- the key of the row, a tuple or a text of values separated by commas for a composite key
+        values -- a dict of the other columns of the row, missing columns are empty
+        Returns the row number of the new row. Raises ValueError if the key does not fit the key columns or the
+        index, TypeError if its type does not match the keys of the index, and KeyError if it is already in the table.
+        '''
+        key = self.codec.normalize(self.data, key)
+        tree_key = self.codec.encode(key)
+        # a key the index cannot store is refused before anything is logged or added to the table
+        self.btree.check_key(tree_key)
+        if self.btree.get(tree_key) is not None:
+            raise KeyError(f"The key {key} is already in the table")
+        # row numbers are never reused, so the BTree can keep pointing at a row after other rows are deleted
+        row_number = self.data.next_row_number
+        new_row = dict(values)
+        new_row.update(self.codec.row(key))
+        new_row['row_number'] = row_number
+        for index in self.indexes.values():
+            # indexed values must compare with the values already in the index, an empty value is not indexed
+            value = new_row.get(index.column)
+            try:
+                value = self.data.convert(index.column, value)
+            except (TypeError, ValueError):
+                if value not in (None, ''):
+                    raise ValueError(f"The value {value!r} does not fit the column {index.column}")
+                value = None
+            new_row[index.column] = index.coerce(value)
+        if self.log is not None:
+            self.log.append('insert', key=key, row_number=row_number, values=new_row)
+        # add the new row to the end of the table, without copying the other rows
+        self.data.append(new_row)
+        self.btree.insertion((tree_key, row_number))
+        for index in self.indexes.values():
+            index.insert(new_row[index.column], row_number)
+        self.renderer.changed(self.btree)
+        self._maybe_checkpoint()
+        return row_number
+
+    def delete(self, key):
+        '''
+        Function delete
+        This function deletes the row of a key from the table and the BTree.
+        Parameters:
+        key -- the key of the row
+        Returns the row number of the deleted row, or None if the key is not found.
+        '''
+        key = self._normalize(key)
+        if key is None or self.btree is None:
+            return None
+        tree_key = self.codec.encode(key)
+        row_number = self.btree.get(tree_key)
+        if row_number is None:
+            return None
+        if self.log is not None:
+            self.log.append('delete', key=key, row_number=row_number)
+        if self.indexes:
+            row = self.data.record(row_number)
+            for index in self.indexes.values():
+                index.delete(row[index.column], row_number)
+        # the row is only marked as deleted until the table is compacted
+        self.data.delete(row_number)
+        self.btree.delete(tree_key)
+        self.renderer.changed(self.btree)
+        self._maybe_checkpoint()
+        return row_number
+
+    def delete_many(self, keys):
+        '''
+        Function delete_many
+        This function deletes the rows of a list of keys, with one batch delete from the B tree.
+        Parameters:
+        keys -- the keys of the rows
+        Returns the list of row numbers of the deleted rows and the list of keys that are not found. A key given
+        more than once is deleted once and is not reported as missing.
+        '''
+        if self.btree is None:
+            return [], list(keys)
+        deleted, tree_keys, missing = [], {}, []
+        for key in keys:
+            normalized = self._normalize(key)
+            tree_key = None if normalized is None else self.codec.encode(normalized)
+            if tree_key in tree_keys:
+                continue
+            row_number = None if tree_key is None else self.btree.get(tree_key)
+            if row_number is None:
+                missing.append(key)
+                continue
+            if self.log is not None:
+                self.log.append('delete', key=normalized, row_number=row_number)
+            if self.indexes:
+                row = self.data.record(row_number)
+                for index in self.indexes.values():
+                    index.delete(row[index.column], row_number)
+            self.data.delete(row_number)
+            tree_keys[tree_key] = row_number
+            deleted.append(row_number)
+        self.btree.delete_many(list(tree_keys))
+        self.renderer.changed(self.btree)
+        self._maybe_checkpoint()
+        return deleted, missing
+
+    def search(self, key):
+        '''
+        Function search
+        This function searches for a key in the BTree.
+        Parameters:
+        key -- the key
+        Returns the row as a dict of column name to value, or None if the key is not found.
+        '''
+        key = self._key(key)
+        if key is None or self.btree is None:
+            return None
+        row_number = self.btree.get(key)
+        return None if row_number is None else self.data.record(row_number)
+
+    def search_many(self, keys):
+        '''
+        Function search_many
+        This function searches for a list of keys with one batch lookup.
+        Parameters:
+        keys -- the keys
+        Returns a DataFrame of the rows that are found and the list of keys that are not found.
+        '''
+        converted = [self._key(key) for key in keys]
+        lookup = [key for key in converted if key is not None]
+        found = dict(zip(lookup, self.btree.search_many(lookup))) if self.btree is not None else {}
+        missing = [key for key, key_value in zip(keys, converted) if found.get(key_value) is None]
+        rows = [found[key_value] for key_value in converted if found.get(key_value) is not None]
+        return self.data.rows(rows), missing
+
+    def range(self, lo=None, hi=None, inclusive="both"):
+        '''
+        Function range
+        This function returns the rows whose key lies between a lower and an upper bound.
+        Parameters:
+        lo -- the lower bound, no lower bound if None
+        hi -- the upper bound, no upper bound if None
+        inclusive -- which bounds are included, "both", "neither", "left" or "right"
+        Returns a DataFrame of the rows in key order. Raises ValueError if a bound does not fit the key columns.
+        '''
+        return self.data.rows(self.key_rows(lo, hi, inclusive))
+
+    def key_rows(self, lo=None, hi=None, inclusive="both"):
+        '''
+        Function key_rows
+        This function returns the row numbers of the keys between a lower and an upper bound.
+        The bounds of a composite key can be its first values only, e.g. (2024,) for all the keys that start with 2024.
+        Parameters:
+        lo -- the lower bound, no lower bound if None
+        hi -- the upper bound, no upper bound if None
+        inclusive -- which bounds are included, "both", "neither", "left" or "right"
+        Returns the list of row numbers in key order. Raises ValueError if a bound does not fit the key columns.
+        '''
+        if self.btree is None:
+            return []
+        if lo is not None:
+            lo = self.codec.bound(self.data, lo, upper=False, closed=inclusive in ("both", "left"))
+        if hi is not None:
+            hi = self.codec.bound(self.data, hi, upper=True, closed=inclusive in ("both", "right"))
+        return [row_number for _, row_number in self.btree.range(lo, hi, inclusive)]
+
+    def query(self, predicates):
+        '''
+        Function query
+        This function returns the rows that satisfy all the predicates, read through an index when one fits.
+        Parameters:
+        predicates -- a list of (column, operator, value) tuples, e.g. from parse_where
+        Returns a DataFrame of the rows and the QueryPlan that was used.
+        Raises KeyError for an unknown column and ValueError for a value that does not fit its column.
+        '''
+        return run_query(self, predicates)
+
+    def open_log(self, log_directory, batch_size=1, max_delay=None):
+        '''
+        Function open_log
+        This function starts logging every insert and delete. The current state is the first checkpoint.
+        Parameters:
+        log_directory -- the directory of the log and the checkpoint
+        batch_size -- the number of log records written with one fsync, above 1 a crash can lose the pending records
+        max_delay -- the seconds a log record can wait for its batch, see WriteAheadLog
+        '''
+        os.makedirs(log_directory, exist_ok=True)
+        self.log_directory = log_directory
+        self.log = WriteAheadLog(os.path.join(log_directory, LOG_NAME), batch_size, max_delay=max_delay)
+        self.checkpoint()
+
+    def checkpoint(self):
+        '''
+        Function checkpoint
+        This function saves the table and the keys of the BTree, then empties the write-ahead log.
+        '''
+        self.log.commit()
+        state = {
+            'data': self.data,
+            'user_defined_key': self.user_defined_key,
+            'encoded': self.codec.encoded,
+            'tree_type': self.tree_type.__name__,
+            't': self.btree.t if self.btree is not None else None,
+            # the keys come out sorted, so recovery can build the tree bottom-up
+            'keys': list(self.btree.items()) if self.btree is not None else [],
+            'indexes': self._index_definitions(),
+        }
+        write_checkpoint(self.log_directory, state, self.log.lsn)
+        self.log.reset()
+
+    def _maybe_checkpoint(self):
+        if self.log is not None and self.log.lsn - self.log.checkpoint_lsn >= CHECKPOINT_INTERVAL:
+            self.checkpoint()
+
+    @classmethod
+    def recover(cls, log_directory, renderer=None, batch_size=1, max_delay=None):
+        '''
+        Function recover
+        This function rebuilds the database from the checkpoint of a directory and replays the log records
+        written after it.
+        Parameters:
+        log_directory -- the directory of the log and the checkpoint
+        renderer -- the Renderer that shows the tree after a change
+        batch_size -- the number of log records written with one fsync from now on
+        max_delay -- the seconds a log record can wait for its batch, see WriteAheadLog
+        Returns the MiniDatabase object, or None if the directory has no checkpoint.
+        '''
+        state = read_checkpoint(log_directory)
+        if state is None:
+            return None
+        data = state['data']
+        tree_type = BPlusTree if state['tree_type'] == 'BPlusTree' else BTree
+        btree = tree_type.from_sorted(state['keys'], state['t']) if state['t'] is not None else None
+        db = cls(data, btree, state['user_defined_key'], tree_type, renderer, state.get('encoded', False))
+        encode = db.codec.encode
+        db.log_directory = log_directory
+        db.log = WriteAheadLog(os.path.join(log_directory, LOG_NAME), batch_size, lsn=state['lsn'], max_delay=max_delay)
+
+        for record in db.log.records(state['lsn']):
+            if record['op'] == 'insert':
+                # missing values are logged as null
+                data.append({name: pd.NA if value is None else value for name, value in record['values'].items()})
+                btree.insertion((encode(record['key']), record['row_number']))
+            else:
+                data.delete(record['row_number'])
+                btree.delete(encode(record['key']))
+        # the secondary indexes are built from the recovered table
+        db._build_indexes(state.get('indexes', {}))
+        replayed = db.log.lsn - state['lsn']
+        print(f"Recovered {data.shape[0]} rows from the checkpoint in {log_directory} and {replayed} log records")
+        return db
+
+    def save_snapshot(self, path):
+        '''
+        Function save_snapshot
+        This function writes the table and the index to a binary snapshot file.
+        Parameters:
+        path -- the snapshot file, replaced if it exists
+        '''
+        write_snapshot(path, self.data, self.btree, self.user_defined_key, self.tree_type, self._index_definitions(),
+                       self.codec.encoded)
+
+    @classmethod
+    def load_snapshot(cls, path, renderer=None):
+        '''
+        Function load_snapshot
+        This function opens a database from a snapshot file written by save_snapshot.
+        The numeric columns are mapped from the file and the index is rebuilt node by node, without sorting.
+        Secondary indexes are built again from the table.
+        Parameters:
+        path -- the snapshot file
+        renderer -- the Renderer that shows the tree after a change
+        Returns the MiniDatabase object. Raises ValueError if the file is not a snapshot.
+        '''
+        state = read_snapshot(path)
+        db = cls(state['data'], state['btree'], state['user_defined_key'], state['tree_type'], renderer,
+                 state['encoded'])
+        db._build_indexes(state['indexes'])
+        return db
+
+    def close(self):
+        '''
+        Function close
+        This function writes a last checkpoint, writes back the pages of an index file and stops the renderer.
+        '''
+        if self.log is not None:
+            self.checkpoint()
+            self.log.close()
+            self.log = None
+        # write the cached pages of an index file back before leaving
+        if isinstance(self.btree, DiskBTree):
+            self.btree.close()
+        # draw the last pending copy of the tree before leaving
+        self.renderer.close()
@@ -0,0 +1,187 @@
+'''
+Instrumentation of the mini database.
+
+Counters and timers that show where a session spends its time: node visits, binary search comparisons, splits,
+fills (a borrow or a merge before a delete goes down) and merges of the B tree, and the wall time of phases such as
+reading the file, convert_dtypes, building the tree, drawing it and every menu command. It is off by default.
+Each probe first checks STATS.on, so a probe that is off costs one attribute lookup; cProfile is only imported
+and attached while a capture is running.
+The comparisons are counted per binary search in a node as the bits of its key count, the most bisect makes.
+'''
+import functools
+import time
+from collections import defaultdict
+
+
+class Instrumentation:
+    '''
+    Class Instrumentation
+    This class collects the counters and the timers of a session.
+    - enable / disable / reset: turn the probes on and off, and clear what they collected
+    - count: add to a counter
+    - visit: count a node visit and the comparisons of a binary search in it
+    - phase: time a block of code, used in a with statement
+    - report / dump: the counters and the timers as a dict, or written to a JSON file
+    - start_profile / stop_profile: a cProfile capture written as a pstats file
+    '''
+    def __init__(self):
+        self.on = False
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(lambda: [0, 0.0])  # phase -> [calls, seconds]
+        self.profiler = None
+        self.profile_path = None
+
+    def enable(self):
+        self.on = True
+
+    def disable(self):
+        self.on = False
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+
+    def count(self, name, n=1):
+        '''
+        Function count
+        This function adds to a counter.
+        Parameters:
+        name -- the counter, e.g. "splits"
+        n -- the amount to add
+        '''
+        self.counters[name] += n
+
+    def visit(self, node):
+        '''
+        Function visit
+        This function counts a visit of a node and the comparisons of a binary search in its keys.
+        Parameters:
+        node -- the visited node
+        '''
+        counters = self.counters
+        counters['node_visits'] += 1
+        counters['comparisons'] += len(node.keys).bit_length()
+
+    def phase(self, name):
+        '''
+        Function phase
+        This function times a block of code when the probes are on: with STATS.phase("build tree"): ...
+        Parameters:
+        name -- the phase
+        Returns the context manager.
+        '''
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        timer = self.timers[name]
+        timer[0] += 1
+        timer[1] += seconds
+
+    def report(self):
+        '''
+        Function report
+        This function returns the counters and the timers.
+        Returns a dict with "counters", name -> value, and "phases", name -> {"calls", "seconds"}.
+        '''
+        return {'counters': dict(self.counters),
+                'phases': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.timers.items()}}
+
+    def dump(self, path):
+        '''
+        Function dump
+        This function writes the report to a JSON file.
+        Parameters:
+        path -- the JSON file
+        '''
+        import json
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def start_profile(self, path):
+        '''
+        Function start_profile
+        This function starts a cProfile capture of every function call.
+        Parameters:
+        path -- the pstats file the capture is written to when it stops, read with pstats.Stats(path)
+        '''
+        import cProfile
+        self.profiler = cProfile.Profile()
+        self.profile_path = path
+        self.profiler.enable()
+
+    def stop_profile(self):
+        '''
+        Function stop_profile
+        This function stops the cProfile capture and writes it to its pstats file.
+        Returns the path of the file.
+        '''
+        self.profiler.disable()
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+        return self.profile_path
+
+
+class _Phase:
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if self.stats.on:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+STATS = Instrumentation()
+
+
+def timed(name):
+    '''
+    Function timed
+    This function is a decorator that times every call of a function as a phase, see Instrumentation.phase.
+    Parameters:
+    name -- the phase
+    '''
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not STATS.on:
+                return function(*args, **kwargs)
+            with STATS.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def format_report(report):
+    '''
+    Function format_report
+    This function formats a report as text, the phases by decreasing time.
+    Parameters:
+    report -- a dict returned by Instrumentation.report
+    Returns the text.
+    '''
+    lines = [f"{name:>24}: {value}" for name, value in sorted(report['counters'].items())]
+    phases = sorted(report['phases'].items(), key=lambda item: -item[1]['seconds'])
+    lines += [f"{name:>24}: {phase['seconds']:.4f} s in {phase['calls']} calls" for name, phase in phases]
+    return "\n".join(lines) or "Nothing was recorded."
+
+
+def print_profile(path, limit=20):
+    '''
+    Function print_profile
+    This function prints the functions of a pstats file that took the most time, including the calls they made.
+    Parameters:
+    path -- the pstats file
+    limit -- the number of functions printed
+    '''
+    import pstats
+    pstats.Stats(path).sort_stats('cumulative').print_stats(limit)
@@ -0,0 +1,237 @@
+'''
+Keys of the index.
+
+A key is normalised once, when it enters the database, to the types of its columns, so the B tree never compares
+text typed at a prompt with numbers. A key can span several columns (a composite key); it is then a tuple that
+compares column by column. Keys can also be encoded to bytes that sort like the values they encode, so every
+comparison inside a node is a single memcmp of two bytes objects, whatever the types of the columns.
+
+Each value of an encoded key is a tag byte followed by the value:
+- 0x00: a missing value, nothing follows, so missing values sort first
+- 0x01: an integer, 8 bytes big-endian with the sign bit flipped
+- 0x02: a float, 8 bytes big-endian with the sign bit flipped, or every bit flipped for negative floats
+- 0x03: text, UTF-8 with 0x00 escaped as 0x00 0xFF, ended by 0x00 0x00 so a prefix sorts before a longer text
+A column holds one type, so the order of the tags only matters for missing values.
+'''
+import struct
+
+import numpy as np
+import pandas as pd
+
+NULL, INTEGER, FLOAT, TEXT = b'\x00', b'\x01', b'\x02', b'\x03'
+TEXT_END = b'\x00\x00'
+SIGN = 1 << 63
+ENCODED = struct.Struct('>cQ')
+
+
+class _After:
+    # compares greater than any value, closes the range of a prefix of a composite key
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __le__(self, other):
+        return self is other
+
+    def __ge__(self, other):
+        return True
+
+    def __repr__(self):
+        return 'AFTER'
+
+
+AFTER = _After()
+
+
+def encode_value(value):
+    '''
+    Function encode_value
+    This function encodes one value of a key to bytes that sort like the value.
+    Parameters:
+    value -- an integer, a float, a text or a missing value
+    Returns the bytes. Raises ValueError for other types and for integers that do not fit 64 bits.
+    '''
+    if isinstance(value, str):
+        return TEXT + value.encode('utf-8').replace(b'\x00', b'\x00\xff') + TEXT_END
+    if value is None:
+        return NULL
+    if isinstance(value, (bool, int, np.integer)):
+        if not -SIGN <= value < SIGN:
+            raise ValueError(f"The key {value} does not fit 64 bits")
+        return ENCODED.pack(INTEGER, int(value) + SIGN)
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return NULL
+        # adding 0.0 turns -0.0 into 0.0, they are equal keys
+        bits = struct.unpack('>Q', struct.pack('>d', float(value) + 0.0))[0]
+        return ENCODED.pack(FLOAT, bits ^ (0xFFFFFFFFFFFFFFFF if bits & SIGN else SIGN))
+    if pd.isna(value) is True:
+        return NULL
+    raise ValueError(f"Keys of type {type(value).__name__} cannot be encoded")
+
+
+def _encode_column(column):
+    # a whole column at once: integer and float columns are encoded with NumPy, others value by value
+    dtype = getattr(column.dtype, 'numpy_dtype', column.dtype)
+    # unsigned values of 2 ** 63 and more would wrap around as int64, encode_value refuses them one by one
+    fits = isinstance(dtype, np.dtype) and (dtype.kind != 'u' or dtype.itemsize < 8 or not len(column)
+                                            or int(column.max()) < SIGN)
+    if fits and dtype.kind in 'iuf' and not column.isna().any():
+        n = len(column)
+        if dtype.kind == 'f':
+            bits = (column.to_numpy(np.float64) + 0.0).view(np.uint64)
+            body = bits ^ np.where(bits >> np.uint64(63), np.uint64(0xFFFFFFFFFFFFFFFF), np.uint64(SIGN))
+            tag = FLOAT[0]
+        else:
+            body = column.to_numpy(np.int64).view(np.uint64) ^ np.uint64(SIGN)
+            tag = INTEGER[0]
+        records = np.empty((n, 9), dtype=np.uint8)
+        records[:, 0] = tag
+        records[:, 1:] = body.astype('>u8').view(np.uint8).reshape(n, 8)
+        buffer = records.tobytes()
+        return [buffer[i:i + 9] for i in range(0, 9 * n, 9)]
+    if pd.api.types.is_string_dtype(column.dtype) and not column.isna().any():
+        return [TEXT + value.encode('utf-8').replace(b'\x00', b'\x00\xff') + TEXT_END for value in column.tolist()]
+    return [encode_value(value) for value in column.tolist()]
+
+
+def key_columns(user_defined_key):
+    '''
+    Function key_columns
+    This function returns the columns of a key.
+    Parameters:
+    user_defined_key -- a column name, or a tuple of column names for a composite key
+    Returns the list of column names.
+    '''
+    return [user_defined_key] if isinstance(user_defined_key, str) else list(user_defined_key)
+
+
+class KeyCodec:
+    '''
+    Class KeyCodec
+    This class turns keys as they are given, e.g. typed at a prompt, into the keys stored in the B tree.
+    - normalize: the values of the key, converted to the types of the key columns
+    - encode: the B tree key of normalised values, a value, a tuple or order-preserving bytes
+    - tree_key: normalize and encode
+    - bound: the B tree key of a range bound, which can be a prefix of a composite key
+    - frame_keys: the B tree keys of all the rows of a dataframe
+    '''
+    def __init__(self, user_defined_key, encoded=False):
+        '''
+        Parameters:
+        user_defined_key -- a column name, or a tuple of column names for a composite key
+        encoded -- True to store the keys as order-preserving bytes
+        '''
+        self.columns = key_columns(user_defined_key)
+        self.composite = len(self.columns) > 1
+        self.encoded = encoded
+
+    def _split(self, key):
+        if not self.composite:
+            return (key,)
+        # a composite key is typed as its values separated by commas
+        if isinstance(key, str):
+            return tuple(part.strip() for part in key.split(','))
+        return tuple(key)
+
+    def normalize(self, data, key, prefix=False):
+        '''
+        Function normalize
+        This function converts the values of a key to the types of the key columns.
+        Parameters:
+        data -- the RowStore of the data
+        key -- a value, or for a composite key a tuple, a list or a text of values separated by commas
+        prefix -- True to accept the first values of a composite key only
+        Returns the value, or a tuple of values for a composite key. Raises ValueError if the key does not fit.
+        '''
+        values = self._split(key)
+        if len(values) != len(self.columns) and not (prefix and 0 < len(values) < len(self.columns)):
+            raise ValueError(f"A key has {len(self.columns)} values, one for each of {', '.join(self.columns)}")
+        values = tuple(data.convert(column, value) for column, value in zip(self.columns, values))
+        return values if self.composite else values[0]
+
+    def encode(self, values):
+        '''
+        Function encode
+        This function returns the B tree key of normalised values.
+        Parameters:
+        values -- the value, or the tuple or list of values of a composite key
+        Returns the value, a tuple for a composite key, or bytes if the keys are encoded.
+        '''
+        if not self.encoded:
+            return tuple(values) if self.composite else values
+        if not self.composite:
+            return encode_value(values)
+        return b''.join(encode_value(value) for value in values)
+
+    def tree_key(self, data, key):
+        '''
+        Function tree_key
+        This function normalises and encodes a key.
+        Parameters:
+        data -- the RowStore of the data
+        key -- the key as given
+        Returns the B tree key. Raises ValueError if the key does not fit.
+        '''
+        return self.encode(self.normalize(data, key))
+
+    def bound(self, data, key, upper, closed):
+        '''
+        Function bound
+        This function returns the B tree key of a range bound. A prefix of a composite key stands for all the
+        keys that start with it.
+        Parameters:
+        data -- the RowStore of the data
+        key -- the bound as given
+        upper -- True for an upper bound
+        closed -- True if the keys equal to the bound are in the range
+        Returns the B tree key. Raises ValueError if the bound does not fit.
+        '''
+        values = self.normalize(data, key, prefix=True)
+        bound = self.encode(values)
+        if self.composite and len(values) < len(self.columns) and upper == closed:
+            # past every key that starts with the prefix
+            bound = bound + (b'\xff' if self.encoded else (AFTER,))
+        return bound
+
+    def frame_keys(self, data):
+        '''
+        Function frame_keys
+        This function returns the B tree keys of all the rows of a dataframe, a column at a time.
+        Parameters:
+        data -- the dataframe, with the key columns
+        Returns the list of keys in the order of the rows.
+        '''
+        if not self.encoded:
+            columns = [data[column].tolist() for column in self.columns]
+            return list(zip(*columns)) if self.composite else columns[0]
+        columns = [_encode_column(data[column]) for column in self.columns]
+        return [b''.join(parts) for parts in zip(*columns)] if self.composite else columns[0]
+
+    def row(self, values):
+        '''
+        Function row
+        This function returns the key columns of a row.
+        Parameters:
+        values -- the normalised value, or tuple of values of a composite key
+        Returns a dict of column name to value.
+        '''
+        return dict(zip(self.columns, values if self.composite else (values,)))
+
+
+def choose_key_encoding():
+    '''
+    Function choose_key_encoding
+    This function prompts the user to choose how the keys are compared in the B tree.
+    Returns True to store the keys as order-preserving bytes.
+    '''
+    while True:
+        try:
+            choice = input("Enter 1 to compare the keys as values, 2 to compare them as encoded bytes (default 1): ")
+            if choice not in ['', '1', '2']:
+                raise ValueError("Invalid choice")
+            return choice == '2'
+        except ValueError as error:
+            print("Invalid value:", error)
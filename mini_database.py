@@ -1,156 +1,360 @@
-from read_data import read_in_data, choose_index, add_row_number
-from b_tree_v0 import BTree, BTreeNode, choose_max_degree
+from read_data import read_in_data, read_in_chunks, choose_index, add_row_number, print_progress
+from b_tree_v0 import BTree, BTreeNode, choose_max_degree, choose_tree_type
+from disk_btree import DiskBTree, PAGE_SIZE, key_size_for, max_degree_for_page, page_key_kind
+from engine import MiniDatabase
+from instrument import STATS, format_report, print_profile, timed
+from keys import choose_key_encoding
+from parallel_build import choose_workers
+from query import parse_where, describe_plan
+from row_store import RowStore
+from render import Renderer, choose_render_mode
 import pandas as pd
+import itertools
+import os
 
-def search_driver(data, btree):
+@timed('search command')
+def search_driver(db):
     '''
     Function search_driver
-    This function searches for a key in the BTree and displays the row in the dataframe that contains the key.
+    This function searches for a key in the BTree and displays the row in the table that contains the key.
     Parameters:
-    data -- the dataframe of the data
-    btree -- the BTree object
-    '''
-    search_value = input("Enter the key you want to search: ")
-    result = btree.searching(search_value)
-    if result is not None:
-        node, index = result
-        # convert node to a list of keys
-        print(f"Key {search_value} found in node with keys: {node.keys[index]}")
+    db -- the MiniDatabase object
+    '''
+    search_value = input(f"Enter the key you want to search{key_hint(db)}: ")
+    row = db.search(search_value)
+    if row is None:
+        print(f"The key {search_value} is not found in the BTree")
+        return
+    print(f"Key {search_value} found with row number: {row['row_number']}")
+    print(pd.Series(row, name=row['row_number'], dtype=object))
+
+@timed('search many command')
+def search_many_driver(db):
+    '''
+    Function search_many_driver
+    This function searches for a list of keys in the BTree with one batch lookup and displays the rows that are found.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    if db.codec.composite:
+        search_values = [value.strip() for value in input(f"Enter the keys you want to search separated by semicolon{key_hint(db)}: ").split(";")]
     else:
-        print(f"The key {key} is not found in the BTree")
-    # get the row from the dataframe using the row number
-    row_number = node.keys[index][1]
-    row = data.iloc[row_number]
-    print(row)
+        search_values = [value.strip() for value in input("Enter the keys you want to search separated by comma: ").split(",")]
+    rows, missing = db.search_many(search_values)
+    if missing:
+        print(f"The keys {missing} are not found in the BTree")
+    print(rows)
+
+@timed('range search command')
+def range_search_driver(db):
+    '''
+    Function range_search_driver
+    This function displays the rows whose key lies between a lower and an upper bound, both included.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    lo = input(f"Enter the lower bound of the keys{key_hint(db, prefix=True)} (leave empty for no lower bound): ")
+    hi = input(f"Enter the upper bound of the keys{key_hint(db, prefix=True)} (leave empty for no upper bound): ")
+    try:
+        print(db.range(lo or None, hi or None, inclusive="both"))
+    except ValueError as error:
+        print("Invalid value:", error)
 
-def import_driver():
+def key_hint(db, prefix=False):
+    '''
+    Function key_hint
+    This function explains how to type a composite key at a prompt.
+    Parameters:
+    db -- the MiniDatabase object
+    prefix -- True if the first values of the key are enough
+    Returns the text to add to the prompt, empty for a key of one column.
+    '''
+    if not db.codec.composite:
+        return ""
+    first = " (or the first ones)" if prefix else ""
+    return f" (the values of {', '.join(db.codec.columns)}{first} separated by comma)"
+
+@timed('import command')
+def import_driver(tree_type=BTree, renderer=None):
     '''
     Function import_driver
-    This function imports the data from a file and creates a BTree object.
-    Returns the dataframe of the data, the BTree object, and the user defined key.
+    This function imports the data from a file a chunk at a time and creates a BTree object.
+    Parameters:
+    tree_type -- the class of the index, BTree or BPlusTree
+    renderer -- the Renderer that shows the new tree
+    Returns the MiniDatabase object.
     '''
-    data = read_in_data()
-    user_defined_key = choose_index(data)
-    data = add_row_number(data)
+    chunks = read_in_chunks()
+    # the key is chosen from the columns of the first chunk, the other chunks are read while they are indexed
+    first = next(chunks)
+    user_defined_key = choose_index(first)
+    chunks = itertools.chain([first], chunks)
+    # the keys can be compared as typed values or as order-preserving bytes
+    encoded = choose_key_encoding()
 
-    # store row_number and key in a list of tuples, put key in the first element of the tuple
-    keys = list(zip(data[user_defined_key], data['row_number']))
-    # get the max degree of the BTree
-    t = choose_max_degree(data.shape[0])
+    # a B tree can be kept in an index file, so the next launch reopens it instead of rebuilding it
+    db = None
+    index_path = ""
+    # a page file stores integer or string keys only
+    if tree_type is BTree and isinstance(user_defined_key, str) and not encoded \
+            and page_key_kind(first[user_defined_key].tolist()) is not None:
+        index_path = input("Enter an index file to keep the B tree on disk (leave empty to keep it in memory): ")
+    if index_path and os.path.exists(index_path):
+        try:
+            btree = DiskBTree.open(index_path)
+        except ValueError as error:
+            print(f"{error}, it is replaced by a new index")
+        else:
+            if btree.pages.header['key_name'] == user_defined_key:
+                # read the table without indexing it, the index file is reused if it was built from the same keys
+                db = MiniDatabase.from_chunks(chunks, user_defined_key, None, tree_type, renderer, print_progress)
+                if btree.source == db.key_fingerprint() and btree.key_count == db.data.shape[0]:
+                    print(f"Reopened the index in {index_path}")
+                    db.btree = btree
+                    return db
+            print(f"The index in {index_path} does not match the data, rebuilding it")
+            btree.close()
+    # get the max degree of the BTree, an index file limits it to the nodes that fit in one page
+    limit = max_degree_for_page(PAGE_SIZE, key_size_for(first[user_defined_key].tolist())) if index_path else None
+    t = choose_max_degree(first.shape[0], limit)
     
+    # integer keys can be sorted by several processes once the whole table is read
+    workers = 1
+    if db is None and isinstance(user_defined_key, str) and not encoded and first[user_defined_key].dtype.kind in 'iu':
+        workers = choose_workers()
+
     #create a BTree object
-    btree = BTree(t)
-    # insert the keys into the BTree
-    for key in keys:
-        btree.insertion(key)
+    if db is None and workers == 1:
+        # index every chunk as soon as it is read
+        db = MiniDatabase.from_chunks(chunks, user_defined_key, t, tree_type, renderer, print_progress, encoded)
+    else:
+        if db is None:
+            db = MiniDatabase.from_chunks(chunks, user_defined_key, None, tree_type, renderer, print_progress)
+        db.build_index(t, workers)
+    if index_path:
+        # string keys of the later chunks can be longer than the ones of the first chunk
+        keys = list(db.btree.items())
+        try:
+            key_size = key_size_for([key for key, _ in keys])
+        except TypeError as error:
+            print(f"{error}, the B tree is kept in memory")
+            index_path = ""
+    if index_path:
+        limit = max_degree_for_page(PAGE_SIZE, key_size)
+        if 2 * t > limit:
+            print(f"Longer keys were read, the maximum degree is lowered to {limit} to fit a node in a page")
+            db.btree = tree_type.from_sorted(keys, limit // 2)
+        db.btree = DiskBTree.from_btree(index_path, db.btree, key_size, user_defined_key, source=db.key_fingerprint())
     
-    # print the tree
-    btree.print_tree(btree.root)
-    # visualize the tree
-    btree.visualize()
-    return data, btree, user_defined_key
+    # print and visualize the tree, or leave it to the renderer to do it later
+    db.renderer.changed(db.btree)
+    return db
 
-def insert_driver(data, user_defined_key):
+@timed('insert command')
+def insert_driver(db):
     '''
     Function insert_driver
-    This function inserts a new row into the dataframe and the BTree.
+    This function inserts a new row into the table and the BTree.
     Parameters:
-    data -- the dataframe of the data
-    user_defined_key -- the user defined key
-    Returns the updated dataframe, the new key, and the row number.
-    '''
-    new_key = input("Enter the key you want to insert: ")
-    # set the row number to be the last row number + 1
-    if data.empty:
-        row_number = 0
-    else:
-        row_number = data['row_number'].max() + 1
-    # ask the user to input value for all the columns in the dataframe except the key column and row_number column
-    column_name = data.columns.tolist()
-    column_name.remove(user_defined_key)
-    column_name.remove('row_number')
-    values = []
+    db -- the MiniDatabase object
+    '''
+    # the key gets the types of the key columns, so it compares with the keys already in the BTree
+    while True:
+        try:
+            new_key = db.codec.normalize(db.data, input(f"Enter the key you want to insert{key_hint(db)}: "))
+            break
+        except ValueError as error:
+            print("Invalid value:", error)
+    # ask the user to input value for all the columns in the table except the key columns and row_number column
+    column_name = [name for name in db.data.column_names if name not in db.codec.columns and name != 'row_number']
+    values = {}
     for column in column_name:
-        value = input(f"Enter the value for {column}: ")
-        values.append(value)
-
-    # add the new row to the end of the dataframe
-    rows = []
-    new_row = {user_defined_key: new_key, 'row_number': row_number}
-    for i in range(len(column_name)):
-        new_row[column_name[i]] = values[i]
-    rows.append(new_row)
-    new_data = pd.DataFrame(rows)
-    data = pd.concat([data, new_data], ignore_index=True)
-    
-    return data, new_key, row_number
+        values[column] = input(f"Enter the value for {column}: ")
+    try:
+        db.insert(new_key, values)
+    except KeyError as error:
+        print("Invalid key:", error)
+    except (TypeError, ValueError) as error:
+        # e.g. a key too long for the pages of an index file, nothing was logged or added
+        print("Cannot insert the row:", error)
     
-def delete_driver(data, btree, user_defined_key):
+@timed('delete command')
+def delete_driver(db):
     '''
     Function delete_driver
-    This function deletes a row from the dataframe and the BTree.
+    This function deletes a row from the table and the BTree.
     Parameters:
-    data -- the dataframe of the data
-    btree -- the BTree object
-    user_defined_key -- the user defined key
-    Returns the updated dataframe and BTree.
-    '''
-    delete_key = input("Enter the key you want to delete: ")
-    result = btree.searching(delete_key)
-    if result is not None:
-        node, index = result
-        print(f"Deleting key {delete_key} from node with keys: {node.keys[index]}")
-        row_number = node.keys[index][1]
-        # Delete the row from the dataframe
-        data = data[data['row_number'] != row_number]
-        # Delete the key from the BTree
-        btree.delete(delete_key)
-        btree.print_tree(btree.root)
-        btree.visualize()
+    db -- the MiniDatabase object
+    '''
+    delete_key = input(f"Enter the key you want to delete{key_hint(db)}: ")
+    row_number = db.delete(delete_key)
+    if row_number is not None:
+        print(f"Deleted key {delete_key} with row number: {row_number}")
         print("Row deleted successfully.")
     else:
         print(f"The key {delete_key} is not found in the BTree")
-    return data, btree
+
+@timed('save snapshot command')
+def snapshot_driver(db):
+    '''
+    Function snapshot_driver
+    This function saves the table and the BTree to a snapshot file, which can be loaded at the next start.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    path = input("Enter the snapshot file: ")
+    try:
+        db.save_snapshot(path)
+    except OSError as error:
+        print("Cannot write the snapshot:", error)
+        return
+    print(f"Saved {db.data.shape[0]} rows to {path}")
+
+@timed('create index command')
+def create_index_driver(db):
+    '''
+    Function create_index_driver
+    This function creates a secondary index on a column whose values can repeat, e.g. grade.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    print("Indexes:", ", ".join(f"{name} on {index.column}" for name, index in db.indexes.items()) or "none")
+    column = input("Enter the column you want to index: ")
+    name = input("Enter a name for the index (leave empty to use the column name): ")
+    try:
+        index = db.create_index(column, name or None)
+    except (KeyError, ValueError) as error:
+        print("Invalid index:", error)
+        return
+    print(f"Created the index {name or column} on {column} with {len(index)} rows")
+
+@timed('query command')
+def query_driver(db):
+    '''
+    Function query_driver
+    This function displays the rows that satisfy conditions on any columns, using an index when one fits.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    where = input("Enter the conditions, e.g. grade >= 90 and grade_letter = A: ")
+    try:
+        rows, plan = db.query(parse_where(where))
+    except (KeyError, ValueError) as error:
+        print("Invalid query:", error)
+        return
+    print("Read with the", describe_plan(plan))
+    print(rows)
+
+@timed('tree statistics command')
+def stats_driver(db):
+    '''
+    Function stats_driver
+    This function displays the shape of the BTree, how full its nodes are, and whether it is valid.
+    Parameters:
+    db -- the MiniDatabase object
+    '''
+    stats = db.btree.stats()
+    levels = ", ".join(str(count) for count in stats['nodes_per_level'])
+    print(f"Height: {stats['height']}, nodes per level: {levels}, keys: {stats['keys']}")
+    print(f"Average fill: {stats['fill']:.1%}, bytes: {stats['bytes']}, "
+          f"average search path: {stats['average_path']:.2f} nodes")
+    print("Nodes by fill:", ", ".join(f"{10 * i}-{10 * i + 10}%: {count}"
+                                      for i, count in enumerate(stats['fill_histogram'])))
+    problems = db.btree.check()
+    if problems:
+        print(f"The BTree has {len(problems)} problems:")
+        for problem in problems:
+            print(" ", problem)
+    else:
+        print("The BTree is valid.")
+
+def instrument_driver():
+    '''
+    Function instrument_driver
+    This function turns the instrumentation on, or turns it off and displays what it collected.
+    A cProfile capture of the commands in between can be written to a file.
+    '''
+    if not STATS.on:
+        STATS.reset()
+        path = input("Enter a file for a cProfile capture of the next commands (leave empty for none): ")
+        if path:
+            STATS.start_profile(path)
+        STATS.enable()
+        print("Instrumentation is on.")
+        return
+    STATS.disable()
+    print("Instrumentation is off.")
+    print(format_report(STATS.report()))
+    if STATS.profiler is not None:
+        path = STATS.stop_profile()
+        print_profile(path)
+        print(f"Saved the cProfile capture to {path}")
+    path = input("Enter a JSON file for the counters and timers (leave empty to skip): ")
+    if path:
+        try:
+            STATS.dump(path)
+        except OSError as error:
+            print("Cannot write the file:", error)
 
 def mini_database():
     ''' 
     Function mini_database
     This function is the main function that runs the mini database.
     '''
-    # ask the user whether to read in the data from a file or generate the data
-    while True:
-        try:
-            choice = int(input("Enter 1 to read in data from a file, 2 to generate data: "))
-            if choice not in [1, 2]:
-                raise ValueError("Invalid choice")
-            break
-        except ValueError as error:
-            print("Invalid value:", error)
-    
+    # with a log directory every insert and delete is logged, and a previous session is recovered from it
+    log_directory = input("Enter a directory for the write-ahead log (leave empty to run without one): ")
+    # ask the user when the tree is printed and drawn
+    renderer = Renderer(choose_render_mode())
+    db = MiniDatabase.recover(log_directory, renderer) if log_directory else None
+    if db is not None:
+        # continue in the menu of the data source the session started with
+        choice = 1 if db.btree is not None else 2
+    else:
+        # ask the user whether to read in the data from a file, generate the data or load a snapshot
+        while True:
+            try:
+                choice = int(input("Enter 1 to read in data from a file, 2 to generate data, 3 to load a snapshot: "))
+                if choice not in [1, 2, 3]:
+                    raise ValueError("Invalid choice")
+                if choice == 3:
+                    db = MiniDatabase.load_snapshot(input("Enter the snapshot file: "), renderer)
+                break
+            except ValueError as error:
+                print("Invalid value:", error)
+            except OSError as error:
+                print("Cannot read the snapshot:", error)
+        if db is not None:
+            # the snapshot has the index and the tree type, continue in the menu of its data source
+            choice = 1 if db.btree is not None else 2
+            if log_directory:
+                db.open_log(log_directory)
+        else:
+            # ask the user whether to index the data with a B tree or a B+ tree
+            tree_type = choose_tree_type()
+
     if choice == 1:
-        data, btree, user_defined_key = import_driver()
+        if db is None:
+            db = import_driver(tree_type, renderer)
+            if log_directory:
+                # the imported data is the starting point of the log
+                db.open_log(log_directory)
        
         # ask user if they want to insert, search, delete or exit
         while True:
             try:
-                crud_choice = input("Do you want to insert, search, delete or exit? (1 to insert, 2 to search, 3 to delete, 4 to exit): ")
-                if crud_choice not in ['1', '2', '3', '4']:
+                crud_choice = input("Do you want to insert, search, delete or exit? (1 to insert, 2 to search, 3 to delete, 4 to exit, 5 to search many keys, 6 to range search, 7 to show the tree, 8 to save a snapshot, 9 to create an index, 10 to query, 11 to show the tree statistics, 12 to turn the instrumentation on or off): ")
+                if crud_choice not in ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12']:
                     raise ValueError("Invalid choice")
             except ValueError as error:
                 print("Invalid value:", error, "Please enter a valid choice.")
                 continue
             if crud_choice == '1':
-                data, new_key, row_number = insert_driver(data, user_defined_key)
-                # Display the new dataframe
-                print(data)
-                # insert the new key into the BTree
-                btree.insertion((new_key, row_number))
-                btree.print_tree(btree.root)
-                print('-'*50)
-                btree.visualize()
+                insert_driver(db)
+                # Display the new table
+                print(db.data)
             elif crud_choice == '2':
                 # ask the user if they want to search for a key
-                search_driver(data, btree)
+                search_driver(db)
             elif crud_choice == '3':
                 # optional cheat when the code doesnt work
                 # delete_key = input("Enter the key you want to delete: ")
@@ -168,52 +372,63 @@ def mini_database():
                 # for key in keys:
                 #     btree.insertion(key)
                 # btree.print_tree(btree.root)
-                data, btree = delete_driver(data, btree, user_defined_key)
+                delete_driver(db)
+            elif crud_choice == '5':
+                search_many_driver(db)
+            elif crud_choice == '6':
+                range_search_driver(db)
+            elif crud_choice == '7':
+                renderer.render(db.btree)
+            elif crud_choice == '8':
+                snapshot_driver(db)
+            elif crud_choice == '9':
+                create_index_driver(db)
+            elif crud_choice == '10':
+                query_driver(db)
+            elif crud_choice == '11':
+                stats_driver(db)
+            elif crud_choice == '12':
+                instrument_driver()
             else:
                 break
 
     if choice == 2:
-        # add a flag to check if the BTree object has been created
-        btree = None
-        t = None
-        # generate data, ask the user the column names they want to generate
-        column_names = input("Enter the column names separated by comma: ")
-        column_names = column_names.split(',')
-        # create a dataframe with the column names
-        data = pd.DataFrame(columns=column_names)
-        user_defined_key = choose_index(data)
-        data = add_row_number(data)
+        if db is None:
+            # generate data, ask the user the column names they want to generate
+            column_names = input("Enter the column names separated by comma: ")
+            column_names = column_names.split(',')
+            # create a dataframe with the column names
+            data = pd.DataFrame(columns=column_names)
+            user_defined_key = choose_index(data)
+            encoded = choose_key_encoding()
+            # the BTree object is created at the first insert
+            db = MiniDatabase(RowStore.from_frame(add_row_number(data)), None, user_defined_key, tree_type, renderer,
+                              encoded)
+            if log_directory:
+                db.open_log(log_directory)
         # ask user if they want to insert, search, delete or exit
         while True:
             try:
-                crud_choice = input("Do you want to insert, search, delete or exit? (1 to insert, 2 to search, 3 to delete, 4 to exit): ")
-                if crud_choice not in ['1', '2', '3', '4']:
+                crud_choice = input("Do you want to insert, search, delete or exit? (1 to insert, 2 to search, 3 to delete, 4 to exit, 5 to search many keys, 6 to range search, 7 to show the tree, 8 to save a snapshot, 9 to create an index, 10 to query, 11 to show the tree statistics, 12 to turn the instrumentation on or off): ")
+                if crud_choice not in ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12']:
                     raise ValueError("Invalid choice")
             except ValueError as error:
                 print("Invalid value:", error, "Please enter a valid choice.")
                 continue
 
             if crud_choice == '1':
-                data, new_key, row_number = insert_driver(data, user_defined_key)
-                #Display the new dataframe
-                print(data)
-                
-                # ask the user to input the max degree of the BTree
-                if t is None:
-                    t = choose_max_degree(data.shape[0])
-                #create a BTree object
-                if btree is None:
-                    btree = BTree(t)
-                # insert the new key into the BTree
-                btree.insertion((new_key, row_number))
-                btree.print_tree(btree.root)
-                btree.visualize()
+                if db.btree is None:
+                    # ask the user to input the max degree of the BTree
+                    db.create_tree(choose_max_degree(db.data.shape[0] + 1))
+                insert_driver(db)
+                #Display the new table
+                print(db.data)
             elif crud_choice == '2':
-                if btree is None:
+                if db.btree is None:
                     print("Database is empty. Please insert data first before searching.")
                     continue
                 # ask the user if they want to search for a key
-                search_driver(data, btree)
+                search_driver(db)
             elif crud_choice == '3':
                 # # ask the user if they want to delete a key
                 # delete_key = input("Enter the key you want to delete: ")
@@ -231,11 +446,44 @@ def mini_database():
                 # for key in keys:
                 #     btree.insertion(key)
                 # btree.print_tree(btree.root)
-                if btree is None:
+                if db.btree is None:
                     print("Database is empty. Please insert data first before deleting.")
                     continue
-                data, btree = delete_driver(data, btree, user_defined_key)
+                delete_driver(db)
+            elif crud_choice == '5':
+                if db.btree is None:
+                    print("Database is empty. Please insert data first before searching.")
+                    continue
+                search_many_driver(db)
+            elif crud_choice == '6':
+                if db.btree is None:
+                    print("Database is empty. Please insert data first before searching.")
+                    continue
+                range_search_driver(db)
+            elif crud_choice == '7':
+                if db.btree is None:
+                    print("Database is empty. Please insert data first before showing the tree.")
+                    continue
+                renderer.render(db.btree)
+            elif crud_choice == '8':
+                snapshot_driver(db)
+            elif crud_choice == '9':
+                create_index_driver(db)
+            elif crud_choice == '10':
+                query_driver(db)
+            elif crud_choice == '11':
+                if db.btree is None:
+                    print("Database is empty. Please insert data first before showing the tree statistics.")
+                    continue
+                stats_driver(db)
+            elif crud_choice == '12':
+                instrument_driver()
             else:
                 break
-            
-mini_database()
\ No newline at end of file
+
+    # write the last checkpoint and the index file, and draw the last pending copy of the tree before leaving
+    db.close()
+
+
+if __name__ == '__main__':
+    mini_database()
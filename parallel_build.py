@@ -0,0 +1,208 @@
+'''
+Parallel build of the index.
+
+For a large import, sorting the (key, row_number) pairs is most of the bulk load. parallel_sort spreads it over
+processes with a sample sort. The keys and the row numbers are kept in shared memory, so the workers sort them in
+place and only offsets are pickled:
+1. every worker sorts one contiguous chunk of the pairs and finds where the splitters cut it into key ranges
+2. every worker gathers the pieces of one key range from all the chunks into its place in the output, and merges them
+The output is sorted as a whole, so every leaf is a run of it. build_from_arrays packs the leaves and stitches the
+upper levels exactly like from_sorted, but copies the keys of a node with one memcpy instead of a Python loop,
+so the tree is identical to a serial build. Only integer keys have a NumPy layout the workers can share.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from b_tree_v0 import BPlusTree
+
+# below this many keys starting the processes costs more than they save
+MIN_PARALLEL_KEYS = 200000
+# keys sampled per worker to choose the splitters of the key ranges
+SAMPLE_PER_WORKER = 1000
+
+
+def _views(blocks, n):
+    return [np.ndarray(n, dtype=np.int64, buffer=block.buf) for block in blocks]
+
+
+def _attach(names, n):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    return blocks, _views(blocks, n)
+
+
+def _close(blocks):
+    for block in blocks:
+        block.close()
+
+
+def _sort_chunk(names, n, start, end, splitters):
+    # step 1 in a worker: sort keys[start:end] with its row numbers and cut it at the splitters
+    blocks, (keys, rows) = _attach(names, n)
+    order = np.argsort(keys[start:end], kind='stable')
+    keys[start:end] = keys[start:end][order]
+    rows[start:end] = rows[start:end][order]
+    cuts = (start + np.searchsorted(keys[start:end], splitters)).tolist()
+    # the views must be gone before the shared memory is closed
+    del keys, rows
+    _close(blocks)
+    return cuts
+
+
+def _merge_range(names, n, pieces, offset):
+    # step 2 in a worker: gather the sorted pieces of one key range and merge them at offset in the output
+    blocks, (keys, rows, out_keys, out_rows) = _attach(names, n)
+    end = offset + sum(piece_end - start for start, piece_end in pieces)
+    if end > offset:
+        out_keys[offset:end] = np.concatenate([keys[start:piece_end] for start, piece_end in pieces])
+        out_rows[offset:end] = np.concatenate([rows[start:piece_end] for start, piece_end in pieces])
+        # a stable sort of sorted runs is a merge
+        order = np.argsort(out_keys[offset:end], kind='stable')
+        out_keys[offset:end] = out_keys[offset:end][order]
+        out_rows[offset:end] = out_rows[offset:end][order]
+    del keys, rows, out_keys, out_rows
+    _close(blocks)
+
+
+def parallel_sort(keys, rows, workers):
+    '''
+    Function parallel_sort
+    This function sorts integer keys with their row numbers, with a sample sort over processes.
+    Parameters:
+    keys -- a NumPy array of int64 keys
+    rows -- a NumPy array of the int64 row numbers of the keys
+    workers -- the number of processes, 1 sorts in this process
+    Returns the sorted keys and the row numbers in the same order, as new arrays.
+    '''
+    n = len(keys)
+    if workers <= 1 or n < MIN_PARALLEL_KEYS:
+        order = np.argsort(keys, kind='stable')
+        return keys[order], rows[order]
+    blocks = [shared_memory.SharedMemory(create=True, size=8 * n) for _ in range(4)]
+    names = [block.name for block in blocks]
+    try:
+        src_keys, src_rows = _views(blocks[:2], n)
+        src_keys[:] = keys
+        src_rows[:] = rows
+        del src_keys, src_rows
+        sample = np.sort(np.random.default_rng(0).choice(keys, min(n, SAMPLE_PER_WORKER * workers), replace=False))
+        splitters = sample[len(sample) * np.arange(1, workers) // workers]
+        bounds = np.linspace(0, n, workers + 1).astype(np.int64).tolist()
+        with ProcessPoolExecutor(workers) as pool:
+            cuts = list(pool.map(_sort_chunk, [names[:2]] * workers, [n] * workers, bounds[:-1], bounds[1:],
+                                 [splitters] * workers))
+            # key range r is cut r - 1 to cut r of every chunk, the first and the last ranges reach the chunk ends
+            ranges = [[(([start] + chunk_cuts)[r], (chunk_cuts + [end])[r])
+                       for start, end, chunk_cuts in zip(bounds[:-1], bounds[1:], cuts)] for r in range(workers)]
+            offsets = np.cumsum([0] + [sum(end - start for start, end in pieces) for pieces in ranges]).tolist()
+            list(pool.map(_merge_range, [names] * workers, [n] * workers, ranges, offsets[:-1]))
+        out_keys, out_rows = _views(blocks[2:], n)
+        result = out_keys.copy(), out_rows.copy()
+        del out_keys, out_rows
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def build_from_arrays(tree_type, keys, rows, t, fill_factor=1.0):
+    '''
+    Function build_from_arrays
+    This function builds a B tree or a B+ tree bottom-up from sorted integer keys, with the same nodes as from_sorted.
+    Parameters:
+    tree_type -- BTree or BPlusTree
+    keys -- a sorted NumPy array of int64 keys
+    rows -- a NumPy array of the row numbers of the keys
+    t -- the minimum degree of the tree
+    fill_factor -- the fraction of the maximum node size to fill, between 0 and 1
+    Returns the new tree.
+    '''
+    if not 0 < fill_factor <= 1:
+        raise ValueError("Fill factor must be between 0 and 1")
+    tree = tree_type(t)
+    if len(keys):
+        tree.typecode = 'q'
+    capacity = max(t - 1, min(2 * t - 1, int((2 * t - 1) * fill_factor)))
+    keys = np.ascontiguousarray(keys, dtype=np.int64)
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+
+    def node(leaf, start, end, level_keys, level_rows):
+        x = tree._new_node(leaf)
+        if end == start:  # the root of an empty tree keeps plain lists
+            return x
+        x.keys.frombytes(level_keys[start:end].tobytes())
+        if level_rows is not None:
+            x.rows.frombytes(level_rows[start:end].tobytes())
+        return x
+
+    if issubclass(tree_type, BPlusTree):
+        # the leaves keep every key and are linked, the separators are the first keys of the leaves after the first
+        n = len(keys)
+        m = max(1, min(-(-n // capacity), n // (t - 1)))
+        size, extra = divmod(n, m)
+        ends = np.cumsum([size + (1 if g < extra else 0) for g in range(m)])
+        nodes = [node(True, start, end, keys, rows) for start, end in zip([0] + ends[:-1].tolist(), ends.tolist())]
+        for left, right in zip(nodes, nodes[1:]):
+            left.next = right
+            right.prev = left
+        level_keys, level_rows = keys[ends[:-1]], None
+    else:
+        nodes = None
+        level_keys, level_rows = keys, rows
+    while nodes is None or len(nodes) > 1:
+        spans = tree._pack(len(level_keys), capacity)
+        parents = [node(nodes is None, start, end, level_keys, level_rows) for start, end in spans]
+        if nodes is not None:
+            child_start = 0
+            for parent, (start, end) in zip(parents, spans):
+                parent.child = nodes[child_start:child_start + end - start + 1]
+                child_start += end - start + 1
+        # the key right after a group separates it from the next group
+        separators = [end for _, end in spans[:-1]]
+        nodes = parents
+        level_keys = level_keys[separators]
+        level_rows = level_rows[separators] if level_rows is not None else None
+    tree.root = nodes[0]
+    return tree
+
+
+def build_index(keys, rows, t, tree_type, workers=None, fill_factor=1.0):
+    '''
+    Function build_index
+    This function sorts integer keys over processes and builds the tree of them bottom-up.
+    Parameters:
+    keys -- a NumPy array of the integer keys, in any order
+    rows -- a NumPy array of the row numbers of the keys
+    t -- the minimum degree of the tree
+    tree_type -- BTree or BPlusTree
+    workers -- the number of processes, all the CPUs if None
+    fill_factor -- the fraction of the maximum node size to fill, between 0 and 1
+    Returns the new tree. Raises an Exception if a key is repeated.
+    '''
+    workers = workers or os.cpu_count() or 1
+    keys, rows = parallel_sort(np.asarray(keys, dtype=np.int64), np.asarray(rows, dtype=np.int64), workers)
+    repeated = np.flatnonzero(keys[1:] == keys[:-1])
+    if len(repeated):
+        raise Exception(f"Column is not unique, the key {keys[repeated[0]]} is repeated")
+    return build_from_arrays(tree_type, keys, rows, t, fill_factor)
+
+
+def choose_workers():
+    '''
+    Function choose_workers
+    This function prompts the user for the number of processes that build the index.
+    Returns the number of processes.
+    '''
+    cpus = os.cpu_count() or 1
+    while True:
+        try:
+            workers = input(f"Enter the number of processes to build the index, 1 to {cpus} (default 1): ")
+            workers = 1 if workers == "" else int(workers)
+            if workers < 1:
+                raise ValueError("The number of processes must be at least 1")
+            return workers
+        except ValueError as error:
+            print("Invalid value:", error)
@@ -0,0 +1,173 @@
+'''
+Query layer of the mini database.
+
+A query is a list of predicates (column, operator, value) that must all hold. The planner looks for a predicate on
+an indexed column, the key column or a column with a secondary index, and reads the matching rows from that index:
+an equality first, then a range with two bounds, then a range with one bound. The other predicates are checked on
+those rows only. Without an index on any predicate column, the columns are scanned with NumPy.
+'''
+import operator
+import re
+from collections import namedtuple
+
+import numpy as np
+
+OPERATORS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+             '>': operator.gt, '>=': operator.ge}
+# longer operators first, so "<=" is not read as "<"
+PREDICATE = re.compile(r'^\s*(.+?)\s*(==|!=|<=|>=|=|<|>)\s*(.*?)\s*$')
+
+QueryPlan = namedtuple('QueryPlan', ['index', 'column', 'lo', 'hi', 'inclusive'])
+QueryPlan.__doc__ = '''
+Class QueryPlan
+The access path of a query: index is "primary", the name of a secondary index or None for a scan of the table.
+lo, hi and inclusive are the bounds read from the index, lo == hi with inclusive "both" for an equality.
+'''
+
+
+def parse_where(text):
+    '''
+    Function parse_where
+    This function parses conditions such as "grade >= 90 and grade_letter = A".
+    Parameters:
+    text -- the conditions joined by "and", values may be quoted
+    Returns a list of (column, operator, value) tuples. Raises ValueError if a condition has no operator.
+    '''
+    predicates = []
+    for condition in re.split(r'\s+and\s+', text.strip(), flags=re.IGNORECASE):
+        match = PREDICATE.match(condition)
+        if match is None:
+            raise ValueError(f"The condition {condition!r} has no operator, e.g. grade >= 90")
+        column, op, value = match.groups()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            value = value[1:-1]
+        predicates.append((column, op, value))
+    return predicates
+
+
+def _convert(db, predicates):
+    # the values get the type of their column, and the kind of the values of a secondary index on it
+    converted = []
+    for column, op, value in predicates:
+        if column not in db.data.column_names:
+            raise KeyError(f"The column {column} is not in the table")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}")
+        value = db.data.convert(column, value)
+        index = db.index_on(column)
+        if index is not None:
+            value = index.coerce(value)
+        converted.append((column, op, value))
+    return converted
+
+
+def _bounds(predicates):
+    # the tightest lower and upper bound of the predicates on one column
+    lo = hi = None
+    lo_closed = hi_closed = True
+    for _, op, value in predicates:
+        if op in ('=', '==', '>', '>='):
+            closed = op != '>'
+            if lo is None or value > lo or (value == lo and not closed):
+                lo, lo_closed = value, closed
+        if op in ('=', '==', '<', '<='):
+            closed = op != '<'
+            if hi is None or value < hi or (value == hi and not closed):
+                hi, hi_closed = value, closed
+    inclusive = {(True, True): "both", (True, False): "left", (False, True): "right", (False, False): "neither"}
+    return lo, hi, inclusive[(lo_closed, hi_closed)]
+
+
+def plan_query(db, predicates):
+    '''
+    Function plan_query
+    This function chooses how a query reads the table.
+    Parameters:
+    db -- the MiniDatabase object
+    predicates -- a list of (column, operator, value) tuples with converted values
+    Returns the QueryPlan.
+    '''
+    best, best_score = QueryPlan(None, None, None, None, "both"), 0
+    # the key index is ordered by the first key column first
+    candidates = [("primary", db.codec.columns[0])] if db.btree is not None else []
+    candidates += [(name, index.column) for name, index in db.indexes.items()]
+    for name, column in candidates:
+        on_column = [predicate for predicate in predicates if predicate[0] == column and predicate[1] != '!=']
+        if not on_column:
+            continue
+        lo, hi, inclusive = _bounds(on_column)
+        if lo is not None and lo == hi and inclusive == "both":
+            score = 3
+        else:
+            score = 2 if lo is not None and hi is not None else 1
+        # the key column wins a tie, it has one row per key
+        if score > best_score:
+            best, best_score = QueryPlan(name, column, lo, hi, inclusive), score
+    return best
+
+
+def _matches(column, slots, op, value):
+    values = column[slots]
+    if values.dtype != object:
+        return OPERATORS[op](values, value)
+    # missing values and values that do not compare never match
+    matches = np.zeros(len(values), dtype=bool)
+    test = OPERATORS[op]
+    for i, item in enumerate(values.tolist()):
+        try:
+            matches[i] = bool(test(item, value))
+        except TypeError:
+            pass
+    return matches
+
+
+def run_query(db, predicates):
+    '''
+    Function run_query
+    This function returns the rows that satisfy all the predicates.
+    Parameters:
+    db -- the MiniDatabase object
+    predicates -- a list of (column, operator, value) tuples, the values can be text
+    Returns a DataFrame of the rows, in the order of the index that was used, and the QueryPlan.
+    Raises KeyError for an unknown column and ValueError for a value that does not fit its column.
+    '''
+    predicates = _convert(db, predicates)
+    plan = plan_query(db, predicates)
+    data = db.data
+    if plan.index is None:
+        slots = np.flatnonzero(data.live[:data.size])
+    else:
+        if plan.index == "primary":
+            # a bound on the first column of a composite key is a prefix of the key
+            lo, hi = ((bound,) if db.codec.composite and bound is not None else bound for bound in (plan.lo, plan.hi))
+            row_numbers = db.key_rows(lo, hi, plan.inclusive)
+        else:
+            index = db.indexes[plan.index]
+            if plan.inclusive == "both" and plan.lo is not None and plan.lo == plan.hi:
+                row_numbers = index.get(plan.lo)
+            else:
+                row_numbers = index.range(plan.lo, plan.hi, plan.inclusive)
+        slots = data.slots[np.asarray(row_numbers, dtype=np.int64)]
+    for column, op, value in predicates:
+        slots = slots[_matches(data.columns[column], slots, op, value)]
+    return data.rows(data.columns['row_number'][slots]), plan
+
+
+def describe_plan(plan):
+    '''
+    Function describe_plan
+    This function describes a QueryPlan in words.
+    Parameters:
+    plan -- the QueryPlan
+    Returns the description.
+    '''
+    if plan.index is None:
+        return "scan of the table"
+    name = "primary index" if plan.index == "primary" else f"index {plan.index}"
+    if plan.inclusive == "both" and plan.lo is not None and plan.lo == plan.hi:
+        return f"{name}, {plan.column} = {plan.lo!r}"
+    left = "[" if plan.lo is not None and plan.inclusive in ("both", "left") else "("
+    right = "]" if plan.hi is not None and plan.inclusive in ("both", "right") else ")"
+    lo = "-inf" if plan.lo is None else repr(plan.lo)
+    hi = "inf" if plan.hi is None else repr(plan.hi)
+    return f"{name}, {plan.column} in {left}{lo}, {hi}{right}"
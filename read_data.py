@@ -6,10 +6,16 @@ Final Project: read_data.py
 This program reads data from an excel file by taking user input filepath and filename. It also let user choose a unique column to be the index of the dataframe.
 The program will check whether the file exists and whether the file is in the correct format. Also, it will check whether the column is unique, has correct type and exists in the dataframe.
 '''
-import pandas as pd
-import numpy as np
+import itertools
 import sys
 
+import pandas as pd
+
+from instrument import STATS
+
+# number of rows read at a time by read_chunks
+CHUNK_SIZE = 50000
+
 
 def read_in_data() -> pd.DataFrame:
     '''
@@ -21,9 +27,7 @@ def read_in_data() -> pd.DataFrame:
     if filepath == "":
         filepath = "data/data_with_grade.xlsx"
     try:
-        data = pd.read_excel(filepath)
-        data = data.convert_dtypes()
-        return data
+        return load_data(filepath)
     except FileNotFoundError as error:
         print("File not found:", type(error), error)
     except TypeError as error:
@@ -32,30 +36,141 @@ def read_in_data() -> pd.DataFrame:
         print("Error:", type(error), error)
 
 
-def choose_index(data: pd.DataFrame) -> str:
+def load_data(filepath: str) -> pd.DataFrame:
+    '''
+    Function load_data
+    This function reads the data from an excel file, or from a csv file if the name ends with .csv.
+    Parameter:
+    filepath -- the path and name of the file
+    Returns the dataframe of the data.
+    '''
+    with STATS.phase('read file'):
+        if filepath.lower().endswith('.csv'):
+            data = pd.read_csv(filepath)
+        else:
+            data = pd.read_excel(filepath)
+    return _convert(data)
+
+
+def _convert(data):
+    # the types of the columns are inferred again by pandas, it is timed apart from the parsing
+    with STATS.phase('convert_dtypes'):
+        return data.convert_dtypes()
+
+
+def read_in_chunks(chunk_size: int = CHUNK_SIZE):
+    '''
+    Function read_in_chunks
+    This function opens an excel, csv or parquet file by taking user input filepath and filename, for reading it in chunks.
+    The first chunk is read before the generator is returned, so the user is asked for another file until one can be read.
+    Parameter:
+    chunk_size -- the number of rows of a chunk
+    Returns a generator of dataframes, see read_chunks.
+    '''
+    while True:
+        filepath = input("Please enter the data file path and name(default name:data/data_with_grade.xlsx): ")
+        if filepath == "":
+            filepath = "data/data_with_grade.xlsx"
+        try:
+            chunks = read_chunks(filepath, chunk_size)
+            first = next(chunks, None)
+            if first is not None and first.shape[0]:
+                return itertools.chain([first], chunks)
+            print("The file has no rows")
+        except FileNotFoundError as error:
+            print("File not found:", type(error), error)
+        except ImportError as error:
+            print("Missing package:", type(error), error)
+        except Exception as error:
+            print("Error:", type(error), error)
+
+
+def read_chunks(filepath: str, chunk_size: int = CHUNK_SIZE):
+    '''
+    Function read_chunks
+    This function reads a file a chunk of rows at a time, so only one chunk is parsed and converted in memory at once.
+    .csv files are read with pandas, .parquet files with pyarrow, .xlsx and .xlsm files row by row with openpyxl.
+    Other excel files are read at once and then split.
+    Parameters:
+    filepath -- the path and name of the file
+    chunk_size -- the number of rows of a chunk
+    Returns a generator of dataframes, converted with convert_dtypes. The file is opened before the generator is returned,
+    so a missing file raises right away.
+    '''
+    name = filepath.lower()
+    if name.endswith('.csv'):
+        reader = pd.read_csv(filepath, chunksize=chunk_size)
+        return (_convert(chunk) for chunk in reader)
+    if name.endswith('.parquet'):
+        # pyarrow is only needed for parquet files
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(filepath).iter_batches(batch_size=chunk_size)
+        return (_convert(batch.to_pandas()) for batch in batches)
+    if name.endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        return _excel_chunks(workbook, chunk_size)
+    with STATS.phase('read file'):
+        data = pd.read_excel(filepath)
+    return (_convert(data.iloc[start:start + chunk_size].reset_index(drop=True))
+            for start in range(0, max(len(data), 1), chunk_size))
+
+
+def _excel_chunks(workbook, chunk_size):
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = next(rows, ())
+        chunk = []
+        count = 0
+        for row in rows:
+            # read-only sheets can report empty rows after the data
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield _convert(pd.DataFrame(chunk, columns=columns))
+                count += len(chunk)
+                chunk = []
+        # a sheet with a header only still gives one empty chunk with its columns
+        if chunk or count == 0:
+            yield _convert(pd.DataFrame(chunk, columns=columns))
+    finally:
+        workbook.close()
+
+
+def print_progress(rows: int, seconds: float, file=sys.stdout) -> None:
+    '''
+    Function print_progress
+    This function prints how many rows were read so far and how fast.
+    Parameters:
+    rows -- the number of rows read so far
+    seconds -- the time since the start of the reading
+    file -- the file to print to
+    '''
+    print(f"Read {rows} rows in {seconds:.1f} s, {rows / seconds if seconds else 0:,.0f} rows/s", file=file)
+
+
+def choose_index(data: pd.DataFrame):
     '''
     Function choose_index
-    This function let user choose a unique column to be the index of the dataframe.
+    This function let user choose a unique column, or several columns that are unique together, to be the index of the dataframe.
     Parameter:
     data -- the dataframe of the data
-    Returns the name of the column that is set as index.
+    Returns the name of the column that is set as index, or a tuple of names for a composite index.
     '''
     all_columns = data.columns.tolist()
-    print(f"The columns in the dataframe are: {all_columns} \nYou can choose one of the columns to be the index. The column must be unique, and the data type must be string or numeric.")
+    print(f"The columns in the dataframe are: {all_columns} \nYou can choose one of the columns to be the index. The column must be unique, and the data type must be string or numeric.\nSeveral columns separated by comma make a composite index, they must be unique together.")
     try:
         column_name = input("Please enter the column name you want to set as index: ")
     except IndexError:
         print("Please enter correct column name")
         return
-    
+    names = [name.strip() for name in column_name.split(",")]
+    if len(names) > 1:
+        column_name = tuple(names)
+
     try:
-        if column_name not in data.columns:
-            raise Exception("Column name does not exist in the dataframe")
-        if not data[column_name].is_unique:
-            raise Exception("Column is not unique")
-        # check if the column pandas dataframe type is string or numeric
-        if not (pd.api.types.is_string_dtype(data[column_name].dtype) or pd.api.types.is_numeric_dtype(data[column_name].dtype)):
-            raise Exception("Column type is not string or numeric")
+        check_index(data, column_name)
         return column_name
     except TypeError as error:
         print("Invalid type:", type(error), error)
@@ -63,6 +178,29 @@ def choose_index(data: pd.DataFrame) -> str:
         print("Error:", type(error), error)
  
 
+def check_index(data: pd.DataFrame, column_name) -> None:
+    '''
+    Function check_index
+    This function checks that a column, or several columns together, can be the index of the dataframe.
+    Parameter:
+    data -- the dataframe of the data
+    column_name -- the name of the column, or a tuple of names for a composite index
+    Raises an Exception if a column does not exist, the key is not unique, or a column is not string or numeric.
+    '''
+    names = [column_name] if isinstance(column_name, str) else list(column_name)
+    for name in names:
+        if name not in data.columns:
+            raise Exception("Column name does not exist in the dataframe")
+    if len(names) == 1 and not data[names[0]].is_unique:
+        raise Exception("Column is not unique")
+    if len(names) > 1 and data.duplicated(subset=names).any():
+        raise Exception("Columns are not unique together")
+    # check if the column pandas dataframe type is string or numeric
+    for name in names:
+        if not (pd.api.types.is_string_dtype(data[name].dtype) or pd.api.types.is_numeric_dtype(data[name].dtype)):
+            raise Exception("Column type is not string or numeric")
+
+
 def add_row_number(data: pd.DataFrame) -> pd.DataFrame:
     '''
     Function add_row_number
@@ -0,0 +1,132 @@
+'''
+Rendering of the index for the mini database.
+
+Printing and drawing the whole tree after every insert and delete costs far more than the B tree work itself,
+so the renderer decides when the tree is shown:
+- "sync": print and draw after every change
+- "request": only when the user asks for it
+- "background": a thread draws the latest copy of the tree to an image file, older copies that were not drawn yet
+  are dropped. A BTree gives the thread a copy-on-write snapshot, so the copy costs nothing until the next change.
+- "off": never, for scripted workloads
+'''
+import threading
+
+from b_tree_v0 import TreeSnapshot, draw_tree
+
+RENDER_MODES = ("sync", "request", "background", "off")
+# large trees are drawn with their top levels and a sample of the children only
+DEFAULT_MAX_LEVEL = 4
+DEFAULT_MAX_CHILDREN = 12
+DEFAULT_PATH = "btree.png"
+
+
+def choose_render_mode():
+    '''
+    Function choose_render_mode
+    This function prompts the user to choose when the tree is printed and drawn.
+    Returns one of RENDER_MODES.
+    '''
+    while True:
+        try:
+            choice = input("Enter 1 to show the tree after every change, 2 to show it only on request, "
+                           "3 to draw it to a file in the background, 4 to never show it (default 2): ")
+            choice = 2 if choice == "" else int(choice)
+            if choice not in [1, 2, 3, 4]:
+                raise ValueError("Invalid choice")
+            return RENDER_MODES[choice - 1]
+        except ValueError as error:
+            print("Invalid value:", error)
+
+
+class Renderer:
+    '''
+    Class Renderer
+    This class prints and draws the tree according to its mode.
+    - changed: called after every change of the tree
+    - render: print and draw the tree now
+    - close: draw the last pending copy and stop the background thread
+    '''
+    def __init__(self, mode="request", max_level=DEFAULT_MAX_LEVEL, max_children=DEFAULT_MAX_CHILDREN,
+                 path=DEFAULT_PATH):
+        '''
+        Parameters:
+        mode -- one of RENDER_MODES
+        max_level -- the number of levels printed and drawn, all of them if None
+        max_children -- the largest number of children drawn under a node, all of them if None
+        path -- the image file of the background mode
+        '''
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Render mode must be one of {RENDER_MODES}")
+        self.mode = mode
+        self.max_level = max_level
+        self.max_children = max_children
+        self.path = path
+        self.rendered = 0
+        self.dropped = 0
+        self.thread = None
+        if mode == "background":
+            self.condition = threading.Condition()
+            self.latest = None
+            self.closing = False
+            self.thread = threading.Thread(target=self._run, name="btree-render", daemon=True)
+            self.thread.start()
+
+    def changed(self, btree):
+        '''
+        Function changed
+        This function is called after an insert or delete.
+        Parameters:
+        btree -- the BTree, BPlusTree or DiskBTree object
+        '''
+        if self.mode == "sync":
+            self.render(btree)
+        elif self.mode == "background":
+            # take a snapshot, or copy the drawn part now, the thread draws it while the tree keeps changing
+            if getattr(btree, 'copy_on_write', False):
+                view = btree.snapshot()
+            else:
+                view = btree.freeze(self.max_level, self.max_children)
+            with self.condition:
+                if self.latest is not None:
+                    self.dropped += 1
+                    # the writes stop copying the nodes of a snapshot that will not be drawn
+                    if isinstance(self.latest, TreeSnapshot):
+                        self.latest.close()
+                self.latest = view
+                self.condition.notify()
+
+    def render(self, btree, path=None):
+        '''
+        Function render
+        This function prints the tree and draws it, in a window or to an image file.
+        Parameters:
+        btree -- the BTree, BPlusTree or DiskBTree object
+        path -- an image file to save the drawing to instead of showing it
+        '''
+        btree.print_tree(btree.root, max_level=self.max_level)
+        btree.visualize(self.max_level, self.max_children, path)
+        self.rendered += 1
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.latest is None and not self.closing:
+                    self.condition.wait()
+                view, self.latest = self.latest, None
+            if view is None:
+                return
+            if isinstance(view, TreeSnapshot):
+                frozen = view.freeze(self.max_level, self.max_children)
+                view.close()
+            else:
+                frozen = view
+            draw_tree(frozen, path=self.path)
+            self.rendered += 1
+
+    def close(self):
+        if self.thread is not None:
+            with self.condition:
+                self.closing = True
+                self.condition.notify()
+            self.thread.join()
+            self.thread = None
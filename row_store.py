@@ -0,0 +1,309 @@
+'''
+Columnar row store for the mini database.
+
+Each column is kept in a NumPy array with spare capacity, which doubles when it is full, so an insert writes one slot
+per column instead of copying the table. Text and mixed columns are kept in object arrays. A delete only clears the
+live flag of the row (a tombstone), and the arrays are compacted once half of the slots are tombstones.
+The row number of a row never changes, so the B tree can keep it; a separate array maps row numbers to slots.
+A DataFrame of the live rows is only built when the table is displayed or returned as a whole.
+'''
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 16
+# compact once this many slots are used and at least half of them are tombstones
+COMPACT_MIN_SLOTS = 1024
+
+
+def _grow(array, capacity, fill):
+    grown = np.full(capacity, fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class RowStore:
+    '''
+    Class RowStore
+    This class keeps the rows of the table in column arrays.
+    - append: add a row, amortized O(1)
+    - delete: mark a row as deleted, amortized O(1)
+    - row / rows: return rows by their row number
+    - to_frame: the live rows as a DataFrame, built lazily and cached until the next change
+    '''
+    def __init__(self, columns, dtypes=None, capacity=INITIAL_CAPACITY):
+        '''
+        Parameters:
+        columns -- the column names, including 'row_number'
+        dtypes -- a dict of NumPy dtypes for numeric columns, every other column is stored as objects
+        capacity -- the initial number of slots
+        '''
+        dtypes = dtypes or {}
+        self.column_names = list(columns)
+        self.columns = {name: np.empty(capacity, dtype=dtypes.get(name, object)) for name in self.column_names}
+        self.columns['row_number'] = np.empty(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.slots = np.full(capacity, -1, dtype=np.int64)  # row number -> slot, -1 when deleted
+        self.size = 0  # slots in use, including tombstones
+        self.count = 0  # live rows
+        self.next_row_number = 0
+        self.frame = None
+
+    @classmethod
+    def from_frame(cls, data):
+        '''
+        Function from_frame
+        This function copies a DataFrame with a 'row_number' column into a new row store.
+        Numeric columns without missing values keep a NumPy dtype, the other columns are stored as objects.
+        Parameters:
+        data -- the dataframe of the data
+        Returns the RowStore object.
+        '''
+        dtypes = {}
+        for name in data.columns:
+            column = data[name]
+            # nullable pandas dtypes such as Int64 have a NumPy counterpart once there are no missing values
+            dtype = getattr(column.dtype, 'numpy_dtype', column.dtype)
+            if isinstance(dtype, np.dtype) and dtype.kind in 'iuf' and not column.isna().any():
+                dtypes[name] = dtype
+        n = data.shape[0]
+        store = cls(data.columns, dtypes, max(INITIAL_CAPACITY, n))
+        for name in store.column_names:
+            store.columns[name][:n] = data[name].to_numpy(dtype=store.columns[name].dtype)
+        row_numbers = store.columns['row_number'][:n]
+        store.live[:n] = True
+        store.size = store.count = n
+        store.next_row_number = int(row_numbers.max()) + 1 if n else 0
+        store.slots = np.full(max(INITIAL_CAPACITY, store.next_row_number), -1, dtype=np.int64)
+        store.slots[row_numbers] = np.arange(n)
+        return store
+
+    @classmethod
+    def from_arrays(cls, columns, next_row_number):
+        '''
+        Function from_arrays
+        This function makes a row store of column arrays without copying them, e.g. arrays mapped from a snapshot file.
+        The arrays are copied only when they grow at the next append.
+        Parameters:
+        columns -- a dict of column name to array of live rows, including 'row_number', in the order of the columns
+        next_row_number -- the row number of the next appended row
+        Returns the RowStore object.
+        '''
+        n = len(columns['row_number'])
+        if n == 0:
+            dtypes = {name: column.dtype for name, column in columns.items() if column.dtype != object}
+            store = cls(columns, dtypes)
+            store.next_row_number = next_row_number
+            return store
+        store = cls.__new__(cls)
+        store.column_names = list(columns)
+        store.columns = dict(columns)
+        store.live = np.ones(n, dtype=bool)
+        store.slots = np.full(max(INITIAL_CAPACITY, next_row_number), -1, dtype=np.int64)
+        store.slots[store.columns['row_number']] = np.arange(n)
+        store.size = store.count = n
+        store.next_row_number = next_row_number
+        store.frame = None
+        return store
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def shape(self):
+        return (self.count, len(self.column_names))
+
+    @property
+    def empty(self):
+        return self.count == 0
+
+    def convert(self, name, value):
+        '''
+        Function convert
+        This function converts a value, e.g. text typed by the user, to the type of a column.
+        Parameters:
+        name -- the column name
+        value -- the value
+        Returns the converted value. Raises ValueError if it does not fit a numeric column.
+        '''
+        dtype = self.columns[name].dtype
+        if dtype == object:
+            return value
+        return dtype.type(value).item()
+
+    def _slot(self, row_number):
+        if 0 <= row_number < len(self.slots) and self.slots[row_number] >= 0:
+            return self.slots[row_number]
+        raise KeyError(f"Row number {row_number} is not in the table")
+
+    def append(self, values):
+        '''
+        Function append
+        This function adds a row at the end of the column arrays, doubling them when they are full.
+        Parameters:
+        values -- a dict of column name to value. A missing 'row_number' gets the next free row number.
+        Returns the row number of the new row.
+        '''
+        row_number = int(values.get('row_number', self.next_row_number))
+        if row_number < len(self.slots) and self.slots[row_number] >= 0:
+            raise ValueError(f"Row number {row_number} is already in the table")
+        if self.size == len(self.live):
+            capacity = 2 * len(self.live)
+            for name, column in self.columns.items():
+                self.columns[name] = _grow(column, capacity, None if column.dtype == object else 0)
+            self.live = _grow(self.live, capacity, False)
+        if row_number >= len(self.slots):
+            self.slots = _grow(self.slots, max(2 * len(self.slots), row_number + 1), -1)
+
+        slot = self.size
+        for name in self.column_names:
+            if name == 'row_number':
+                continue
+            column = self.columns[name]
+            value = values.get(name)
+            try:
+                column[slot] = value
+            except (TypeError, ValueError):
+                # a value that does not fit the NumPy dtype, e.g. text typed into a numeric column
+                self.columns[name] = column = column.astype(object)
+                column[slot] = value
+        self.columns['row_number'][slot] = row_number
+        self.live[slot] = True
+        self.slots[row_number] = slot
+        self.size += 1
+        self.count += 1
+        self.next_row_number = max(self.next_row_number, row_number + 1)
+        self.frame = None
+        return row_number
+
+    def extend(self, data):
+        '''
+        Function extend
+        This function adds the rows of a dataframe at the end of the column arrays, one array copy per column.
+        Parameters:
+        data -- a dataframe with the columns of the table, including 'row_number'
+        '''
+        n = data.shape[0]
+        row_numbers = data['row_number'].to_numpy(dtype=np.int64)
+        if n == 0:
+            return
+        known = row_numbers[row_numbers < len(self.slots)]
+        if (self.slots[known] >= 0).any():
+            raise ValueError("A row number of the new rows is already in the table")
+        capacity = len(self.live)
+        while self.size + n > capacity:
+            capacity *= 2
+        if capacity > len(self.live):
+            for name, column in self.columns.items():
+                self.columns[name] = _grow(column, capacity, None if column.dtype == object else 0)
+            self.live = _grow(self.live, capacity, False)
+        largest = int(row_numbers.max())
+        if largest >= len(self.slots):
+            self.slots = _grow(self.slots, max(2 * len(self.slots), largest + 1), -1)
+
+        start, end = self.size, self.size + n
+        for name in self.column_names:
+            column = self.columns[name]
+            try:
+                column[start:end] = data[name].to_numpy(dtype=column.dtype)
+            except (TypeError, ValueError):
+                # e.g. missing values or text in a column that was numeric so far
+                self.columns[name] = column = column.astype(object)
+                column[start:end] = data[name].to_numpy(dtype=object)
+        self.live[start:end] = True
+        self.slots[row_numbers] = np.arange(start, end)
+        self.size = end
+        self.count += n
+        self.next_row_number = max(self.next_row_number, largest + 1)
+        self.frame = None
+
+    def delete(self, row_number):
+        '''
+        Function delete
+        This function marks a row as deleted. The slots are compacted once half of them are tombstones.
+        Parameters:
+        row_number -- the row number of the row
+        '''
+        slot = self._slot(row_number)
+        self.live[slot] = False
+        self.slots[row_number] = -1
+        self.count -= 1
+        self.frame = None
+        if self.size >= COMPACT_MIN_SLOTS and 2 * self.count <= self.size:
+            self.compact()
+
+    def compact(self):
+        '''
+        Function compact
+        This function moves the live rows to the front of the column arrays and drops the tombstones.
+        Row numbers are kept, only their slots change.
+        '''
+        keep = self.live[:self.size]
+        for name, column in self.columns.items():
+            column[:self.count] = column[:self.size][keep]
+        self.live[:self.size] = False
+        self.live[:self.count] = True
+        self.size = self.count
+        self.slots[self.columns['row_number'][:self.count]] = np.arange(self.count)
+
+    def row(self, row_number):
+        '''
+        Function row
+        This function returns one row by its row number.
+        Parameters:
+        row_number -- the row number of the row
+        Returns a Series indexed by the column names.
+        '''
+        slot = self._slot(row_number)
+        return pd.Series([self.columns[name][slot] for name in self.column_names], index=self.column_names,
+                         name=row_number, dtype=object)
+
+    def record(self, row_number):
+        '''
+        Function record
+        This function returns one row by its row number as a dict of column name to value.
+        Parameters:
+        row_number -- the row number of the row
+        '''
+        slot = self._slot(row_number)
+        return {name: self.columns[name][slot] for name in self.column_names}
+
+    def rows(self, row_numbers):
+        '''
+        Function rows
+        This function returns the rows of a list of row numbers, in the order of the list.
+        Parameters:
+        row_numbers -- the row numbers
+        Returns a DataFrame.
+        '''
+        row_numbers = np.asarray(row_numbers, dtype=np.int64)
+        slots = np.full(len(row_numbers), -1, dtype=np.int64)
+        known = (row_numbers >= 0) & (row_numbers < len(self.slots))
+        slots[known] = self.slots[row_numbers[known]]
+        if (slots < 0).any():
+            raise KeyError(f"Row number {row_numbers[slots < 0][0]} is not in the table")
+        return self._frame_of(slots, index=row_numbers)
+
+    def _frame_of(self, slots, index=None):
+        return pd.DataFrame({name: self.columns[name][slots] for name in self.column_names},
+                            index=index if index is not None else pd.RangeIndex(len(slots)))
+
+    def to_frame(self):
+        '''
+        Function to_frame
+        This function returns the live rows as a DataFrame. It is cached until the table changes.
+        '''
+        if self.frame is None:
+            self.frame = self._frame_of(np.flatnonzero(self.live[:self.size]))
+        return self.frame
+
+    def __str__(self):
+        # only the rows that pandas would show are copied into a DataFrame
+        max_rows = pd.get_option('display.max_rows')
+        if self.frame is not None or self.count <= max_rows:
+            return str(self.to_frame())
+        slots = np.flatnonzero(self.live[:self.size])
+        half = pd.get_option('display.min_rows') // 2
+        index = list(range(half)) + list(range(self.count - half, self.count))
+        lines = self._frame_of(np.concatenate([slots[:half], slots[-half:]]), index).to_string().splitlines()
+        footer = f'[{self.count} rows x {len(self.column_names)} columns]'
+        return '\n'.join(lines[:half + 1] + ['...'] + lines[half + 1:] + ['', footer])
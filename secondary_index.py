@@ -0,0 +1,200 @@
+'''
+Secondary indexes on columns that are not unique.
+
+A secondary index is a B tree from each distinct value of a column to a posting list, the sorted array of the row
+numbers that have the value. The B tree stores the position of the posting list in place of a row number, so the
+BTree and BPlusTree classes are used unchanged. Row numbers only grow, so a new row is appended at the end of its
+posting list and the lists stay sorted without sorting them. Missing values are not indexed.
+'''
+from array import array
+from bisect import bisect_left
+from numbers import Integral, Number
+
+import numpy as np
+import pandas as pd
+
+from b_tree_v0 import BTree
+
+DEFAULT_DEGREE = 32
+
+
+def _kind(value):
+    # values of one kind compare with each other and share the key storage of one B tree
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, Integral):
+        return 'integer'
+    return 'number' if isinstance(value, Number) else type(value).__name__
+
+
+def _missing(value):
+    return value is None or bool(pd.isna(value))
+
+
+class SecondaryIndex:
+    '''
+    Class SecondaryIndex
+    This class indexes a column that can repeat values, with one posting list of row numbers per value.
+    - build: index the live rows of a RowStore bottom-up
+    - insert / delete: add or remove the row number of one row
+    - get: the row numbers of one value
+    - range: the row numbers of the values between two bounds, in value order
+    '''
+    def __init__(self, column, t=DEFAULT_DEGREE, tree_type=BTree):
+        '''
+        Parameters:
+        column -- the indexed column
+        t -- the minimum degree of the B tree of the values
+        tree_type -- the class of the B tree, BTree or BPlusTree
+        '''
+        self.column = column
+        self.tree_type = tree_type
+        self.btree = tree_type(t)
+        self.postings = []  # posting lists, the B tree points at them by position
+        self.free = []  # positions of emptied posting lists, reused by new values
+        self.kind = None  # the kind of the indexed values, set by the first value
+        self.size = 0  # indexed rows
+
+    @classmethod
+    def build(cls, data, column, t=DEFAULT_DEGREE, tree_type=BTree):
+        '''
+        Function build
+        This function indexes a column of a RowStore. The values are sorted once and the B tree is built bottom-up.
+        Parameters:
+        data -- the RowStore of the data
+        column -- the indexed column
+        t -- the minimum degree of the B tree of the values
+        tree_type -- the class of the B tree, BTree or BPlusTree
+        Returns the SecondaryIndex object. Raises ValueError if the column mixes values that do not compare.
+        '''
+        index = cls(column, t, tree_type)
+        slots = np.flatnonzero(data.live[:data.size])
+        values = data.columns[column][slots]
+        rows = data.columns['row_number'][slots]
+        if values.dtype != object:
+            if values.dtype.kind == 'f':
+                keep = ~np.isnan(values)
+                values, rows = values[keep], rows[keep]
+            # a stable sort keeps the row numbers of a value in increasing order
+            order = np.argsort(values, kind='stable')
+            values, rows = values[order], rows[order]
+            starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) else np.zeros(0, int)
+            keys = values[starts].tolist()
+            groups = np.split(rows, starts[1:]) if len(values) else []
+        else:
+            pairs = [(value, row) for value, row in zip(values.tolist(), rows.tolist()) if not _missing(value)]
+            if len({_kind(value) for value, _ in pairs}) > 1:
+                raise ValueError(f"The column {column} mixes values of different types and cannot be indexed")
+            pairs.sort(key=lambda pair: pair[0])
+            keys, groups = [], []
+            for value, row in pairs:
+                if not keys or value != keys[-1]:
+                    keys.append(value)
+                    groups.append([])
+                groups[-1].append(row)
+
+        for group in groups:
+            posting = array('q')
+            posting.frombytes(np.asarray(group, dtype=np.int64).tobytes())
+            index.postings.append(posting)
+        index.btree = tree_type.from_sorted(list(zip(keys, range(len(keys)))), t)
+        index.kind = _kind(keys[0]) if keys else None
+        index.size = sum(len(posting) for posting in index.postings)
+        return index
+
+    def coerce(self, value):
+        '''
+        Function coerce
+        This function converts a value to the kind of the values already in the index, e.g. text typed by the user.
+        Parameters:
+        value -- the value
+        Returns the converted value. Raises ValueError if it cannot be compared with the indexed values.
+        '''
+        value = value.item() if isinstance(value, np.generic) else value
+        if _missing(value) or self.kind is None or _kind(value) == self.kind:
+            return value
+        if isinstance(value, str) and self.kind in ('integer', 'number'):
+            try:
+                return int(value) if self.kind == 'integer' else float(value)
+            except ValueError:
+                pass
+        raise ValueError(f"The value {value!r} does not fit the index on {self.column}")
+
+    def insert(self, value, row_number):
+        '''
+        Function insert
+        This function adds a row to the posting list of its value.
+        Parameters:
+        value -- the value of the indexed column in the row, not indexed if missing
+        row_number -- the row number of the row, larger than the row numbers already indexed
+        '''
+        if _missing(value):
+            return
+        value = self.coerce(value)
+        position = self.btree.get(value)
+        if position is None:
+            position = self.free.pop() if self.free else len(self.postings)
+            if position == len(self.postings):
+                self.postings.append(array('q'))
+            self.btree.insertion((value, position))
+            self.kind = self.kind or _kind(value)
+        posting = self.postings[position]
+        if posting and posting[-1] > row_number:
+            # only a replayed or restored row can come out of order
+            posting.insert(bisect_left(posting, row_number), row_number)
+        else:
+            posting.append(row_number)
+        self.size += 1
+
+    def delete(self, value, row_number):
+        '''
+        Function delete
+        This function removes a row from the posting list of its value. An empty posting list removes the value.
+        Parameters:
+        value -- the value of the indexed column in the row
+        row_number -- the row number of the row
+        '''
+        if _missing(value):
+            return
+        value = value.item() if isinstance(value, np.generic) else value
+        position = self.btree.get(value)
+        if position is None:
+            return
+        posting = self.postings[position]
+        i = bisect_left(posting, row_number)
+        if i == len(posting) or posting[i] != row_number:
+            return
+        del posting[i]
+        self.size -= 1
+        if not posting:
+            self.btree.delete(value)
+            self.free.append(position)
+
+    def get(self, value):
+        '''
+        Function get
+        This function returns the row numbers of one value.
+        Parameters:
+        value -- the value
+        Returns an array of row numbers in increasing order, empty if the value is not indexed.
+        '''
+        position = self.btree.get(value)
+        return self.postings[position] if position is not None else array('q')
+
+    def range(self, lo=None, hi=None, inclusive="both"):
+        '''
+        Function range
+        This function returns the row numbers of the values between a lower and an upper bound.
+        Parameters:
+        lo -- the lower bound, no lower bound if None
+        hi -- the upper bound, no upper bound if None
+        inclusive -- which bounds are included, "both", "neither", "left" or "right"
+        Returns an array of row numbers in the order of the values.
+        '''
+        rows = array('q')
+        for _, position in self.btree.range(lo, hi, inclusive):
+            rows.extend(self.postings[position])
+        return rows
+
+    def __len__(self):
+        return self.size
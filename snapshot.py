@@ -0,0 +1,222 @@
+'''
+Binary snapshot of the table and its index.
+
+A snapshot file holds the live rows of the RowStore as raw column buffers and the B tree in level order, so loading it
+needs neither parsing nor sorting. Layout:
+- 16 bytes: the magic bytes and the offset of the footer
+- the buffers, each starting at a multiple of ALIGNMENT bytes
+- the footer: JSON with the table metadata and the offset and size of every buffer
+Numeric columns are read back through a copy-on-write memory map, so they are not copied until they change, and
+integer keys are copied from the map into the nodes without being parsed. Text columns are stored as UTF-8 separated by NUL bytes, other object columns are pickled.
+The tree is stored as the number of nodes of each level and, per node in level order, its number of keys and row
+numbers, followed by all the keys and all the row numbers. The children of the nodes of a level are the nodes of the
+next level in the same order, so no child pointers are stored and the tree is rebuilt with the shape it had.
+'''
+import json
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from itertools import islice
+
+import numpy as np
+
+from b_tree_v0 import BTree, BPlusTree
+from disk_btree import DiskBTree
+from row_store import RowStore
+
+MAGIC = b'MINIDB\x00\x01'
+# magic bytes, offset of the footer
+SNAPSHOT_HEADER = struct.Struct('<8sQ')
+ALIGNMENT = 64
+SEPARATOR = '\x00'
+
+
+def _write_buffer(file, data):
+    # every buffer starts aligned, so it can be viewed as a NumPy array in place
+    padding = -file.tell() % ALIGNMENT
+    file.write(b'\x00' * padding)
+    offset = file.tell()
+    data = memoryview(data).cast('B')
+    file.write(data)
+    return {'offset': offset, 'nbytes': data.nbytes}
+
+
+def _write_objects(file, values):
+    # text without NUL characters is joined into one UTF-8 buffer, anything else is pickled
+    if all(type(value) is str for value in values):
+        text = SEPARATOR.join(values)
+        if text.count(SEPARATOR) == max(len(values) - 1, 0):
+            return dict(_write_buffer(file, text.encode('utf-8')), kind='text')
+    return dict(_write_buffer(file, pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)), kind='pickle')
+
+
+def _read_objects(buffer, entry, count):
+    data = buffer[entry['offset']:entry['offset'] + entry['nbytes']]
+    if entry['kind'] == 'pickle':
+        return pickle.loads(data)
+    return bytes(data).decode('utf-8').split(SEPARATOR) if count else []
+
+
+def _levels(btree):
+    # the nodes of the tree level by level, the nodes of an index file are read through its buffer pool
+    get = btree.pool.get if isinstance(btree, DiskBTree) else None
+    level = [btree.root]
+    while level:
+        yield level
+        below = []
+        for node in level:
+            if not node.leaf:
+                below.extend(node.child if get is None else map(get, node.child))
+        level = below
+
+
+def write_snapshot(path, data, btree, user_defined_key, tree_type=BTree, indexes=None, encoded=False):
+    '''
+    Function write_snapshot
+    This function writes the live rows of a table and its index to a snapshot file.
+    The file is written next to the path and then renamed, so a crash never leaves half a snapshot.
+    Parameters:
+    path -- the snapshot file
+    data -- the RowStore of the data
+    btree -- the BTree, BPlusTree or DiskBTree index, or None if it is not created yet
+    user_defined_key -- the indexed column, or a tuple of columns for a composite key
+    tree_type -- the class of the index, BTree or BPlusTree. A DiskBTree is loaded back as an in-memory BTree.
+    indexes -- a dict of secondary index name to (column, minimum degree), only the definitions are written
+    encoded -- True if the B tree keys are order-preserving bytes
+    '''
+    keep = data.live[:data.size]
+    dense = data.count == data.size
+    footer = {
+        'user_defined_key': user_defined_key,
+        'encoded': encoded,
+        'tree_type': tree_type.__name__,
+        'count': data.count,
+        'next_row_number': data.next_row_number,
+        'columns': [],
+        'tree': None,
+        'indexes': indexes or {},
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(SNAPSHOT_HEADER.pack(MAGIC, 0))
+        for name in data.column_names:
+            column = data.columns[name][:data.size]
+            column = column if dense else column[keep]
+            if column.dtype == object:
+                entry = _write_objects(file, column.tolist())
+            else:
+                entry = dict(_write_buffer(file, np.ascontiguousarray(column)), kind='numpy', dtype=column.dtype.str)
+            footer['columns'].append(dict(entry, name=name))
+
+        if btree is not None:
+            level_sizes = []
+            key_counts = array('i')
+            row_counts = array('i')
+            keys = array(btree.typecode) if btree.typecode else []
+            rows = array('q')
+            for level in _levels(btree):
+                level_sizes.append(len(level))
+                for node in level:
+                    key_counts.append(len(node.keys))
+                    row_counts.append(len(node.rows))
+                    keys.extend(node.keys)
+                    rows.extend(node.rows)
+            footer['tree'] = {
+                't': btree.t,
+                'typecode': btree.typecode,
+                'level_sizes': level_sizes,
+                'key_counts': _write_buffer(file, key_counts),
+                'row_counts': _write_buffer(file, row_counts),
+                'keys': _write_buffer(file, keys) if btree.typecode else _write_objects(file, keys),
+                'rows': _write_buffer(file, rows),
+            }
+
+        footer_offset = file.tell()
+        file.write(json.dumps(footer).encode('utf-8'))
+        file.seek(0)
+        file.write(SNAPSHOT_HEADER.pack(MAGIC, footer_offset))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_tree(buffer, tree_type, entry):
+    tree = tree_type(entry['t'])
+    tree.typecode = typecode = entry['typecode']
+    key_counts = np.frombuffer(buffer, np.int32, sum(entry['level_sizes']), entry['key_counts']['offset']).tolist()
+    row_counts = np.frombuffer(buffer, np.int32, len(key_counts), entry['row_counts']['offset']).tolist()
+    view = memoryview(buffer)
+    keys_offset, rows_offset = entry['keys']['offset'], entry['rows']['offset']
+    keys = None if typecode else _read_objects(buffer, entry['keys'], sum(key_counts))
+    width = array(typecode).itemsize if typecode else 0
+
+    parents = None
+    k = r = i = 0
+    for depth, size in enumerate(entry['level_sizes']):
+        leaf = depth == len(entry['level_sizes']) - 1
+        nodes = []
+        for _ in range(size):
+            node = tree._new_node(leaf)
+            nk, nr = key_counts[i], row_counts[i]
+            if typecode:
+                node.keys.frombytes(view[keys_offset + width * k:keys_offset + width * (k + nk)])
+            else:
+                node.keys = keys[k:k + nk]
+            node.rows.frombytes(view[rows_offset + 8 * r:rows_offset + 8 * (r + nr)])
+            nodes.append(node)
+            k, r, i = k + nk, r + nr, i + 1
+        if parents is None:
+            tree.root = nodes[0]
+        else:
+            # a node with n keys has n + 1 children, the next ones of the level below
+            children = iter(nodes)
+            for parent in parents:
+                parent.child = list(islice(children, len(parent.keys) + 1))
+        parents = nodes
+    view.release()
+    if issubclass(tree_type, BPlusTree):
+        # the leaves of the last level are in key order
+        for left, right in zip(parents, parents[1:]):
+            left.next = right
+            right.prev = left
+    return tree
+
+
+def read_snapshot(path):
+    '''
+    Function read_snapshot
+    This function reads a snapshot file written by write_snapshot.
+    Numeric columns are mapped from the file copy-on-write instead of being read, so they load in constant time.
+    Parameters:
+    path -- the snapshot file
+    Returns a dict with the RowStore 'data', the 'btree' (None if the table had no index yet), the 'user_defined_key',
+    the 'tree_type' class, whether the keys are 'encoded' and the secondary 'indexes' definitions. Raises ValueError if the file is not a snapshot.
+    '''
+    with open(path, 'rb') as file:
+        magic, footer_offset = SNAPSHOT_HEADER.unpack(file.read(SNAPSHOT_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        # a private mapping: the arrays can be changed in memory without writing to the file
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    footer = json.loads(buffer[footer_offset:])
+    count = footer['count']
+
+    columns = {}
+    for entry in footer['columns']:
+        if entry['kind'] == 'numpy':
+            columns[entry['name']] = np.frombuffer(buffer, np.dtype(entry['dtype']), count, entry['offset'])
+        else:
+            column = np.empty(count, dtype=object)
+            column[:] = _read_objects(buffer, entry, count)
+            columns[entry['name']] = column
+    data = RowStore.from_arrays(columns, footer['next_row_number'])
+
+    tree_type = BPlusTree if footer['tree_type'] == 'BPlusTree' else BTree
+    btree = _read_tree(buffer, tree_type, footer['tree']) if footer['tree'] is not None else None
+    # JSON keeps the columns of a composite key as a list
+    user_defined_key = footer['user_defined_key']
+    user_defined_key = user_defined_key if isinstance(user_defined_key, str) else tuple(user_defined_key)
+    return {'data': data, 'btree': btree, 'user_defined_key': user_defined_key, 'tree_type': tree_type,
+            'encoded': footer.get('encoded', False), 'indexes': {name: tuple(definition) for name, definition in footer.get('indexes', {}).items()}}
@@ -0,0 +1,67 @@
+'''
+Helpers shared by the tests: small databases and trees, and the nodes of a tree level by level.
+'''
+import pandas as pd
+
+from b_tree_v0 import BTree
+from engine import MiniDatabase
+
+
+def make_database(tree_type=BTree, rows=100, key='id', t=3, encoded=False, grades=False):
+    '''
+    Function make_database
+    This function makes a database of rows with an 'id' column numbered from 0.
+    Parameters:
+    tree_type -- the B tree class of the index
+    rows -- the number of rows
+    key -- the key column, or a tuple of columns for a composite key
+    t -- the minimum degree of the tree
+    encoded -- True to store the keys as encoded bytes
+    grades -- True for the columns code, year and grade, False for a column name
+    Returns the MiniDatabase object.
+    '''
+    if grades:
+        columns = {'code': [f"C{i:05d}" for i in range(rows)], 'year': [2000 + i % 7 for i in range(rows)],
+                   'grade': [float(i % 100) for i in range(rows)]}
+    else:
+        columns = {'name': [f"n{i}" for i in range(rows)]}
+    data = pd.DataFrame({'row_number': range(rows), 'id': range(rows), **columns})
+    return MiniDatabase.from_frame(data, key, t, tree_type, encoded=encoded)
+
+
+def inserted(tree_type, pairs, t):
+    '''
+    Function inserted
+    This function builds a tree by inserting (key, row number) pairs one by one.
+    Parameters:
+    tree_type -- the B tree class
+    pairs -- the (key, row number) pairs, in any order
+    t -- the minimum degree of the tree
+    Returns the tree.
+    '''
+    tree = tree_type(t)
+    for pair in pairs:
+        tree.insertion(pair)
+    return tree
+
+
+def levels(tree, storage=False):
+    '''
+    Function levels
+    This function lists the nodes of a tree level by level, to compare two trees node for node.
+    Parameters:
+    tree -- the tree
+    storage -- True to also compare the array typecodes of the keys and the row numbers
+    Returns a list of levels, each a list of (leaf, keys, rows) tuples, with the typecodes if storage is True.
+    '''
+    out, level = [], [tree.root]
+    while level:
+        nodes = []
+        for node in level:
+            entry = (node.leaf, list(node.keys), list(node.rows))
+            if storage:
+                entry += (getattr(node.keys, 'typecode', None), getattr(node.rows, 'typecode', None))
+            nodes.append(entry)
+        out.append(nodes)
+        level = [child for node in level for child in node.child]
+    return out
@@ -0,0 +1,77 @@
+'''
+Tests of the bottom-up build: from_sorted and bulk_load hold the same keys as repeated insertion, in a valid and
+fuller tree.
+'''
+import random
+
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from tests.conftest import inserted
+
+TREE_TYPES = (BTree, BPlusTree)
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+@pytest.mark.parametrize('t', (2, 3, 8, 32))
+@pytest.mark.parametrize('n', (0, 1, 2, 7, 100, 5000))
+def test_from_sorted_matches_insertion(tree_type, t, n):
+    pairs = [(key, key * 3) for key in random.Random(n).sample(range(10 * n + 1), n)]
+    built = tree_type.from_sorted(sorted(pairs), t)
+    grown = inserted(tree_type, pairs, t)
+    assert built.check() == []
+    assert list(built.items()) == list(grown.items()) == sorted(pairs)
+    assert all(built.get(key) == row for key, row in pairs)
+    built_stats, grown_stats = built.stats(), grown.stats()
+    assert built_stats['keys'] == grown_stats['keys'] == n
+    # packed nodes never make the tree taller or emptier than inserts that split nodes in half
+    assert built_stats['height'] <= grown_stats['height']
+    assert built_stats['nodes'] <= grown_stats['nodes']
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_full_nodes(tree_type):
+    t = 4
+    tree = tree_type.from_sorted([(key, key) for key in range(10000)], t)
+    stats = tree.stats()
+    assert tree.check() == []
+    # only the root and the nodes that even out the end of a level are less than full
+    assert stats['fill'] > 0.95
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+@pytest.mark.parametrize('fill_factor', (0.5, 0.7, 1.0))
+def test_fill_factor(tree_type, fill_factor):
+    tree = tree_type.from_sorted([(key, key) for key in range(20000)], 16, fill_factor)
+    assert tree.check() == []
+    assert tree.stats()['fill'] == pytest.approx(fill_factor, abs=0.05)
+
+
+def test_fill_factor_out_of_range():
+    with pytest.raises(ValueError):
+        BTree.from_sorted([(1, 1)], 2, 0)
+    with pytest.raises(ValueError):
+        BTree.from_sorted([(1, 1)], 2, 1.5)
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_bulk_load_sorts_and_replaces(tree_type):
+    tree = inserted(tree_type, [(key, key) for key in range(50)], 3)
+    pairs = [(key, -key) for key in random.Random(1).sample(range(1000), 400)]
+    tree.bulk_load(pairs)
+    assert tree.check() == []
+    assert list(tree.items()) == sorted(pairs)
+    # the loaded tree takes later inserts and deletes like any other
+    tree.insertion((5000, 1))
+    tree.delete(pairs[0][0])
+    assert tree.check() == []
+    assert tree.get(5000) == 1 and pairs[0][0] not in tree
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_string_keys(tree_type):
+    pairs = sorted((f"S{key:06d}", key) for key in random.Random(2).sample(range(10 ** 6), 3000))
+    tree = tree_type.from_sorted(pairs, 5)
+    assert tree.typecode is None
+    assert tree.check() == []
+    assert list(tree.items()) == pairs
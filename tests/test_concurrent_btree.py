@@ -0,0 +1,88 @@
+'''
+Tests of the concurrent B tree: writer threads insert and delete their own key ranges while reader threads look up
+and scan keys that never change.
+'''
+import random
+import threading
+
+import pytest
+
+from b_tree_v0 import check_tree
+from concurrent_btree import ConcurrentBTree
+
+WRITERS = 4
+READERS = 3
+WRITES = 3000
+RANGE = 100000  # keys of a writer, the writer w owns [w * RANGE, (w + 1) * RANGE)
+
+
+def run_threads(targets):
+    errors = []
+
+    def guard(target):
+        try:
+            target()
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guard, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+@pytest.mark.parametrize('t', (2, 3, 8))
+def test_writers_and_readers(t):
+    rng = random.Random(t)
+    # the negative keys are in the tree from the start and are never changed
+    stable = {key: key * 10 for key in rng.sample(range(-RANGE, 0), 2000)}
+    tree = ConcurrentBTree.from_sorted(sorted(stable.items()), t)
+    written = [{} for _ in range(WRITERS)]
+    stop = threading.Event()
+
+    def writer(w):
+        def run():
+            rng = random.Random(w)
+            mine = written[w]
+            for _ in range(WRITES):
+                if mine and rng.random() < 0.4:
+                    key = rng.choice(list(mine))
+                    assert tree.delete(key)
+                    del mine[key]
+                else:
+                    key = w * RANGE + rng.randrange(RANGE)
+                    if key not in mine:
+                        tree.insertion((key, -key))
+                        mine[key] = -key
+        return run
+
+    def reader(r):
+        def run():
+            rng = random.Random(100 + r)
+            keys = sorted(stable)
+            while not stop.is_set():
+                key = rng.choice(keys)
+                assert tree.get(key) == stable[key]
+                # a scan of the stable keys sees exactly them, a scan across the writers is in key order
+                lo, hi = sorted(rng.sample(keys, 2))
+                assert [k for k, _ in tree.range(lo, hi, "both")] == [k for k in keys if lo <= k <= hi]
+                scanned = [k for k, _ in tree.range(-50, 2 * RANGE)]
+                assert scanned == sorted(scanned)
+                assert len(set(scanned)) == len(scanned)
+        return run
+
+    def writers():
+        run_threads([writer(w) for w in range(WRITERS)])
+        stop.set()
+
+    run_threads([writers] + [reader(r) for r in range(READERS)])
+
+    assert check_tree(tree.root, tree.t) == []
+    expected = dict(stable)
+    for mine in written:
+        expected.update(mine)
+    assert dict(tree.items()) == expected
+    assert list(tree.items()) == sorted(expected.items())
+    assert all(tree.get(key) == row for key, row in expected.items())
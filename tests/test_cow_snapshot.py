@@ -0,0 +1,73 @@
+'''
+Tests of the copy-on-write snapshots: a view keeps the keys the tree had when it was taken, while the tree goes on
+changing.
+'''
+import random
+
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from concurrent_btree import ConcurrentBTree
+from instrument import STATS
+
+
+def test_snapshot_unchanged_after_writes():
+    rng = random.Random(23)
+    keys = rng.sample(range(0, 100000, 2), 2000)
+    tree = BTree.from_sorted(sorted((key, key) for key in keys), 3)
+    view = tree.snapshot()
+    before = list(view.items())
+
+    added = rng.sample(range(1, 100000, 2), 1000)
+    for key in added:
+        tree.insertion((key, -key))
+    removed = rng.sample(keys, 800)
+    for key in removed:
+        tree.delete(key)
+    tree.delete_many(keys[:300])
+
+    assert list(view.items()) == before
+    assert view.check() == []
+    assert all(view.get(key) == key for key in removed)
+    assert added[0] not in view
+    expected = sorted({(key, key) for key in keys if key not in set(removed) | set(keys[:300])} |
+                      {(key, -key) for key in added})
+    assert tree.check() == []
+    assert list(tree.items()) == expected
+    view.close()
+
+
+def test_snapshots_of_every_version():
+    tree = BTree(2)
+    views = []
+    for key in range(200):
+        views.append((key, tree.snapshot()))
+        tree.insertion((key, key))
+    for key in range(0, 200, 3):
+        tree.delete(key)
+    for size, view in views:
+        assert [key for key, _ in view.items()] == list(range(size))
+        assert view.check() == []
+        view.close()
+    assert tree.readers == set()
+
+
+def test_no_copies_after_the_snapshot_is_closed():
+    tree = BTree.from_sorted([(key, key) for key in range(0, 10000, 2)], 4)
+    STATS.reset()
+    STATS.enable()
+    try:
+        with tree.snapshot():
+            tree.insertion((1, 1))
+        copies = STATS.counters['node_copies']
+        # once the view is closed, the path copied for it belongs to the tree
+        tree.insertion((3, 3))
+        assert STATS.counters['node_copies'] == copies > 0
+    finally:
+        STATS.disable()
+
+
+@pytest.mark.parametrize('tree_type', (BPlusTree, ConcurrentBTree))
+def test_in_place_trees_have_no_snapshots(tree_type):
+    with pytest.raises(TypeError):
+        tree_type(2).snapshot()
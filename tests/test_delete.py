@@ -0,0 +1,80 @@
+'''
+Tests of the single-pass delete and of delete_many: the tree must stay valid, see BTree.check, after every change.
+'''
+import random
+
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from concurrent_btree import ConcurrentBTree
+from tests.conftest import inserted
+
+TREE_TYPES = (BTree, BPlusTree, ConcurrentBTree)
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+@pytest.mark.parametrize('t', (2, 3, 5))
+def test_delete_keeps_the_tree_valid(tree_type, t):
+    rng = random.Random(t)
+    keys = rng.sample(range(10000), 600)
+    tree = inserted(tree_type, [(key, key * 10) for key in keys], t)
+    for key in rng.sample(keys, len(keys)):
+        tree.delete(key)
+        assert tree.check() == []
+        assert key not in tree
+    assert list(tree.items()) == []
+    assert not tree.root.keys
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_delete_internal_keys(tree_type):
+    # deleting the separators first goes through the predecessor, successor and merge cases
+    tree = inserted(tree_type, [(key, key * 10) for key in range(200)], 2)
+    separators = list(tree.root.keys) + [key for child in tree.root.child for key in child.keys]
+    for key in separators:
+        tree.delete(key)
+        assert tree.check() == []
+    expected = [key for key in range(200) if key not in set(separators)]
+    assert [key for key, _ in tree.items()] == expected
+    assert all(tree.get(key) == key * 10 for key in expected)
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_delete_missing_key(tree_type, capsys):
+    tree = inserted(tree_type, [(key, key * 10) for key in range(0, 100, 2)], 3)
+    assert tree.delete(51) is False
+    assert tree.delete(50) is True
+    # the library leaves the messages to the menu
+    assert capsys.readouterr().out == ""
+    assert tree.check() == []
+    assert len(list(tree.items())) == 49
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+@pytest.mark.parametrize('t', (2, 4, 16))
+def test_delete_many(tree_type, t):
+    rng = random.Random(t)
+    keys = rng.sample(range(100000), 3000)
+    tree = tree_type.from_sorted(sorted((key, key * 10) for key in keys), t)
+    remaining = set(keys)
+    for size in (1, 10, 300, 1000):
+        batch = rng.sample(sorted(remaining), size)
+        # keys that are not in the tree are skipped
+        missing = [-1, 100001]
+        assert tree.delete_many(batch + missing) == size
+        remaining.difference_update(batch)
+        assert tree.check() == []
+        assert [key for key, _ in tree.items()] == sorted(remaining)
+    assert tree.delete_many(sorted(remaining)) == len(remaining)
+    assert tree.check() == []
+    assert list(tree.items()) == []
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_delete_many_runs_of_neighbours(tree_type):
+    # contiguous runs share the descents of delete_many, including runs that empty whole leaves
+    tree = tree_type.from_sorted([(key, key) for key in range(5000)], 3)
+    batch = [key for start in range(0, 5000, 500) for key in range(start, start + 120)]
+    assert tree.delete_many(batch) == len(batch)
+    assert tree.check() == []
+    assert [key for key, _ in tree.items()] == sorted(set(range(5000)) - set(batch))
@@ -0,0 +1,115 @@
+'''
+Tests of the B tree in a page file: the changes made through a small buffer pool, which evicts and writes back pages
+all the time, are all in the file after it is closed and reopened.
+'''
+import os
+import random
+
+import pandas as pd
+import pytest
+
+import mini_database
+from b_tree_v0 import BTree
+from disk_btree import DiskBTree, PAGE_SIZE, key_size_for, max_degree_for_page
+from render import Renderer
+
+
+@pytest.mark.parametrize('policy', ('lru', 'clock'))
+def test_close_and_reopen_with_evictions(tmp_path, policy):
+    path = os.path.join(tmp_path, 'index.pages')
+    rng = random.Random(8)
+    keys = rng.sample(range(10 ** 6), 4000)
+    tree = DiskBTree.create(path, 4, capacity=8, policy=policy)
+    for key in keys:
+        tree.insertion((key, key * 2))
+    deleted = keys[::3]
+    assert tree.delete_many(deleted) == len(deleted)
+    remaining = sorted(set(keys) - set(deleted))
+    assert tree.pool.evictions > 0
+    tree.close()
+
+    reopened = DiskBTree.open(path, capacity=8, policy=policy)
+    assert reopened.key_count == len(remaining)
+    assert reopened.check() == []
+    assert list(reopened.items()) == [(key, key * 2) for key in remaining]
+    assert all(reopened.get(key) == key * 2 for key in remaining[::50])
+    assert deleted[0] not in reopened
+    # free pages of merged nodes are reused by later inserts
+    page_count = reopened.pages.header['page_count']
+    for key in deleted[:200]:
+        reopened.insertion((key, 0))
+    assert reopened.pages.header['page_count'] <= page_count
+    reopened.close()
+    assert DiskBTree.open(path).check() == []
+
+
+def test_from_btree_string_keys(tmp_path):
+    path = os.path.join(tmp_path, 'index.pages')
+    pairs = sorted((f"key{i:07d}", i) for i in random.Random(9).sample(range(10 ** 6), 3000))
+    t = max_degree_for_page(PAGE_SIZE, 16) // 2
+    tree = DiskBTree.from_btree(path, BTree.from_sorted(pairs, t), 16, 'code', source=1234, capacity=4)
+    assert tree.source == 1234
+    tree.close()
+
+    reopened = DiskBTree.open(path, capacity=4)
+    assert reopened.pages.header['key_name'] == 'code'
+    assert reopened.source == 1234
+    assert list(reopened.items()) == pairs
+    assert reopened.to_btree().check() == []
+    # a changed index no longer matches the data it was built from
+    assert reopened.delete("missing") is False
+    assert reopened.source == 1234
+    assert reopened.delete(pairs[0][0]) is True
+    assert reopened.source == 0
+    reopened.close()
+    assert DiskBTree.open(path).source == 0
+
+
+def test_check_key(tmp_path):
+    tree = DiskBTree.create(os.path.join(tmp_path, 'text.pages'), 4, b's', 8)
+    tree.check_key("12345678")
+    with pytest.raises(ValueError):
+        tree.check_key("123456789")
+    with pytest.raises(TypeError):
+        tree.check_key(5)
+    tree.close()
+    tree = DiskBTree.create(os.path.join(tmp_path, 'int.pages'), 4)
+    with pytest.raises(TypeError):
+        tree.check_key(2 ** 63)
+    tree.close()
+
+
+def test_not_a_page_file(tmp_path):
+    path = os.path.join(tmp_path, 'data.csv')
+    with open(path, 'w') as file:
+        file.write("id,name\n1,a\n")
+    with pytest.raises(ValueError):
+        DiskBTree.open(path)
+
+
+def test_float_and_mixed_keys_are_refused(tmp_path):
+    with pytest.raises(TypeError):
+        key_size_for([1.5, 2.5])
+    with pytest.raises(TypeError):
+        key_size_for(["a", 1])
+    with pytest.raises(TypeError):
+        DiskBTree.from_btree(os.path.join(tmp_path, 'float.pages'), BTree.from_sorted([(0.5, 0), (1.5, 1)], 2))
+    for key_kind in (b'q', b's'):
+        tree = DiskBTree.create(os.path.join(tmp_path, f'{key_kind.decode()}.pages'), 4, key_kind)
+        with pytest.raises(TypeError):
+            tree.check_key(1.5)
+        with pytest.raises(TypeError):
+            tree.insertion((1.5, 0))
+        assert tree.key_count == 0
+        tree.close()
+
+
+def test_import_float_key_stays_in_memory(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, 'data.csv')
+    pd.DataFrame({'score': [0.5, 2.25, 1.75], 'name': ['a', 'b', 'c']}).to_csv(path, index=False)
+    # file, key column, key encoding, maximum degree; no index file is offered for float keys
+    answers = iter([path, 'score', '1', '4'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    db = mini_database.import_driver(renderer=Renderer('off'))
+    assert isinstance(db.btree, BTree)
+    assert db.search(2.25)['name'] == 'b'
@@ -0,0 +1,38 @@
+'''
+Tests of the operations of MiniDatabase on its table and index.
+'''
+import pandas as pd
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from engine import MiniDatabase
+from read_data import add_row_number
+from row_store import RowStore
+from tests.conftest import make_database
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+def test_delete_many(tree_type):
+    db = make_database(tree_type)
+    # a repeated key is deleted once, and is not reported as missing
+    row_numbers, missing = db.delete_many([5, '6', 7, 7, '7', 999, 'x'])
+    assert row_numbers == [5, 6, 7]
+    assert missing == [999, 'x']
+    assert len(db.data) == 97
+    assert db.btree.check() == []
+    assert [key for key, _ in db.btree.items()] == [key for key in range(100) if key not in (5, 6, 7)]
+
+
+def test_insert_refuses_a_key_of_another_type(tmp_path):
+    # the key column of a new empty table holds any object, so only the index can catch a str key among ints
+    data = add_row_number(pd.DataFrame(columns=['id', 'name']))
+    db = MiniDatabase(RowStore.from_frame(data), None, 'id')
+    db.create_tree(3)
+    db.open_log(str(tmp_path))
+    db.insert(1, {'name': "a"})
+    lsn = db.log.lsn
+    with pytest.raises(TypeError):
+        db.insert("x", {'name': "b"})
+    assert db.log.lsn == lsn
+    assert len(db.data) == 1
+    db.close()
@@ -0,0 +1,73 @@
+'''
+Tests of the key storage: integer keys are kept in 64-bit arrays only while every key fits, any other key moves the
+nodes to lists without changing the content of the tree.
+'''
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree, key_typecode, keys_typecode
+from concurrent_btree import ConcurrentBTree
+
+TREE_TYPES = (BTree, BPlusTree, ConcurrentBTree)
+
+
+def test_key_typecode():
+    assert key_typecode(2 ** 63 - 1) == 'q' and key_typecode(-2 ** 63) == 'q'
+    assert key_typecode(2 ** 63) is None and key_typecode(-2 ** 63 - 1) is None
+    assert key_typecode(2.5) is None and key_typecode("1") is None
+    assert keys_typecode([1, 2 ** 62]) == 'q'
+    assert keys_typecode([1, 2 ** 64]) is None
+    assert keys_typecode([]) is None
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+@pytest.mark.parametrize('key', (2 ** 63, -2 ** 63 - 1, 2.5))
+def test_insert_key_outside_int64(tree_type, key):
+    tree = tree_type(2)
+    for k in range(100):
+        tree.insertion((k, k))
+    assert tree.typecode == 'q'
+    tree.insertion((key, -1))
+    assert tree.typecode is None
+    assert tree.check() == []
+    assert tree.get(key) == -1
+    assert all(tree.get(k) == k for k in range(100))
+    # later inserts and deletes go on in the list nodes
+    tree.insertion((1000, 1000))
+    tree.delete(key)
+    assert tree.check() == []
+    assert [k for k, _ in tree.items()] == list(range(100)) + [1000]
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_bulk_load_key_outside_int64(tree_type):
+    tree = tree_type(2)
+    tree.bulk_load([(2 ** 64, 0), (1, 1)])
+    assert tree.typecode is None
+    assert list(tree.items()) == [(1, 1), (2 ** 64, 0)]
+    tree.bulk_load([(2 ** 63 - 1, 0), (-2 ** 63, 1)])
+    assert tree.typecode == 'q'
+    assert tree.get(-2 ** 63) == 1
+
+
+def test_snapshot_sees_the_same_keys_after_widening():
+    tree = BTree.from_sorted([(k, k) for k in range(200)], 3)
+    with tree.snapshot() as view:
+        tree.insertion((2 ** 70, 1))
+        assert 2 ** 70 not in view
+        assert [k for k, _ in view.items()] == list(range(200))
+        assert view.check() == []
+    assert tree.get(2 ** 70) == 1
+
+
+@pytest.mark.parametrize('tree_type', TREE_TYPES)
+def test_check_key(tree_type):
+    tree = tree_type(2)
+    # an empty tree takes any key
+    tree.check_key("a")
+    for k in range(10):
+        tree.insertion((k, k))
+    tree.check_key(2.5)
+    tree.check_key(2 ** 70)
+    with pytest.raises(TypeError):
+        tree.check_key("5")
+    assert tree.check() == []
@@ -0,0 +1,91 @@
+'''
+Tests of the keys of the index: normalised and order-preserving encoded keys.
+'''
+import itertools
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from keys import NULL, KeyCodec, _encode_column, encode_value
+
+INTEGERS = [0, 1, -1, 2, -2, 255, 256, -256, 2 ** 31, -2 ** 31, 2 ** 63 - 1, -2 ** 63]
+FLOATS = [0.0, -0.0, 1.5, -1.5, 1e-300, -1e-300, 5e-324, -5e-324, 1e300, -1e300, float('inf'), float('-inf')]
+# the NUL character and prefixes are where a naive encoding sorts wrongly
+TEXTS = ["", "a", "a\x00", "a\x00\x00", "a\x00b", "a\x01", "ab", "b", "\x00", "\xff", "\u00e9", "\U0001f600", "A"]
+
+
+def test_unsigned_column_above_int64_is_refused():
+    with pytest.raises(ValueError):
+        _encode_column(pd.Series(np.array([1, 2 ** 63 + 5], dtype=np.uint64)))
+    with pytest.raises(ValueError):
+        _encode_column(pd.Series([1, 2 ** 63 + 5]).convert_dtypes())
+
+
+@pytest.mark.parametrize('dtype', (np.uint8, np.uint32, np.uint64))
+def test_unsigned_column_in_int64(dtype):
+    values = np.array([0, 1, np.iinfo(dtype).max if dtype != np.uint64 else 2 ** 63 - 1], dtype=dtype)
+    assert _encode_column(pd.Series(values)) == [encode_value(int(value)) for value in values]
+
+
+def assert_same_order(values, encode):
+    # every pair compares the same way as the values and as their encodings
+    for a, b in itertools.product(values, repeat=2):
+        assert (a < b, a == b) == (encode(a) < encode(b), encode(a) == encode(b)), (a, b)
+
+
+@pytest.mark.parametrize('values', (INTEGERS, FLOATS, TEXTS))
+def test_encoded_values_sort_like_values(values):
+    assert_same_order(values, encode_value)
+
+
+def test_missing_values_sort_first():
+    assert encode_value(None) == encode_value(float('nan')) == encode_value(pd.NA) == NULL
+    assert all(NULL < encode_value(value) for value in INTEGERS + FLOATS + TEXTS)
+    with pytest.raises(ValueError):
+        encode_value(2 ** 63)
+    with pytest.raises(ValueError):
+        encode_value(b'bytes')
+
+
+@pytest.mark.parametrize('columns', (
+    (INTEGERS, TEXTS),
+    (TEXTS, INTEGERS),
+    (TEXTS, TEXTS),
+    (FLOATS, TEXTS, INTEGERS),
+))
+def test_composite_keys_sort_like_tuples(columns):
+    codec = KeyCodec(tuple(f"c{i}" for i in range(len(columns))), encoded=True)
+    keys = list(itertools.product(*columns))
+    keys = random.Random(len(keys)).sample(keys, min(len(keys), 400))
+    assert_same_order(keys, codec.encode)
+    assert sorted(keys, key=codec.encode) == sorted(keys)
+
+
+def test_composite_prefix_bound():
+    # the upper bound of a prefix comes after every key that starts with it, and before the next prefix
+    codec = KeyCodec(('c0', 'c1'), encoded=True)
+    after = codec.encode(("a",)) + b'\xff'
+    for text in TEXTS:
+        assert codec.encode(("a", text)) < after
+    for text in ("a\x00", "a\x01", "ab", "b"):
+        assert after < codec.encode((text, ""))
+
+
+@pytest.mark.parametrize('values', (
+    INTEGERS,
+    FLOATS,
+    TEXTS,
+    [1.5, None, -2.0],
+    ["a", None, "a\x00"],
+))
+def test_encode_column_matches_encode_value(values):
+    assert _encode_column(pd.Series(values)) == [encode_value(value) for value in values]
+
+
+def test_frame_keys():
+    data = pd.DataFrame({'c0': TEXTS, 'c1': INTEGERS + [7]})
+    codec = KeyCodec(('c0', 'c1'), encoded=True)
+    assert codec.frame_keys(data) == [codec.encode(key) for key in zip(TEXTS, INTEGERS + [7])]
+    assert KeyCodec(('c0', 'c1')).frame_keys(data) == list(zip(TEXTS, INTEGERS + [7]))
@@ -0,0 +1,64 @@
+'''
+Tests of the parallel build: the sample sort over processes sorts like NumPy, and build_from_arrays makes the same
+tree as from_sorted, node for node.
+'''
+import numpy as np
+import pytest
+
+import parallel_build
+from b_tree_v0 import BTree, BPlusTree
+from tests.conftest import levels
+
+
+def leaf_chain(tree):
+    node = tree.root
+    while not node.leaf:
+        node = node.child[0]
+    chain = []
+    while node is not None:
+        chain.append(list(node.keys))
+        node = node.next
+    return chain
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+@pytest.mark.parametrize('t', (2, 3, 16))
+@pytest.mark.parametrize('n', (0, 1, 2, 5, 17, 1000, 20000))
+@pytest.mark.parametrize('fill_factor', (1.0, 0.7))
+def test_build_from_arrays_matches_from_sorted(tree_type, t, n, fill_factor):
+    rng = np.random.default_rng(n)
+    keys = np.sort(rng.choice(2 * 10 ** 9, n, replace=False)) - 10 ** 9
+    rows = rng.permutation(n)
+    built = parallel_build.build_from_arrays(tree_type, keys, rows, t, fill_factor)
+    expected = tree_type.from_sorted(list(zip(keys.tolist(), rows.tolist())), t, fill_factor)
+    assert levels(built, storage=True) == levels(expected, storage=True)
+    assert built.typecode == expected.typecode
+    assert built.check() == []
+    if tree_type is BPlusTree:
+        assert leaf_chain(built) == leaf_chain(expected)
+
+
+@pytest.mark.parametrize('workers', (2, 3))
+def test_parallel_sort(monkeypatch, workers):
+    monkeypatch.setattr(parallel_build, 'MIN_PARALLEL_KEYS', 100)
+    rng = np.random.default_rng(workers)
+    keys = rng.integers(-2 ** 62, 2 ** 62, 5000)
+    rows = np.arange(5000)
+    sorted_keys, sorted_rows = parallel_build.parallel_sort(keys, rows, workers)
+    assert np.array_equal(sorted_keys, np.sort(keys))
+    assert np.array_equal(keys[sorted_rows], sorted_keys)
+
+
+def test_build_index_with_workers(monkeypatch):
+    monkeypatch.setattr(parallel_build, 'MIN_PARALLEL_KEYS', 100)
+    keys = np.random.default_rng(5).permutation(3000) * 3
+    rows = np.arange(3000)
+    tree = parallel_build.build_index(keys, rows, 8, BTree, workers=2)
+    expected = BTree.from_sorted(sorted(zip(keys.tolist(), rows.tolist())), 8)
+    assert levels(tree, storage=True) == levels(expected, storage=True)
+
+
+def test_build_index_repeated_key(monkeypatch):
+    monkeypatch.setattr(parallel_build, 'MIN_PARALLEL_KEYS', 100)
+    with pytest.raises(Exception, match="key 1 is repeated"):
+        parallel_build.build_index(np.array([5, 1, 3] * 100 + [1]), np.arange(301), 4, BTree, workers=2)
@@ -0,0 +1,118 @@
+'''
+Tests of the query layer: MiniDatabase.query returns the rows of a pandas filter, whichever index the planner uses.
+'''
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from query import OPERATORS, describe_plan, parse_where
+from tests.conftest import make_database
+
+PREDICATES = [
+    [('grade', '>=', 90)],
+    [('grade', '=', 42.0)],
+    [('grade', '>', 10), ('grade', '<', 20)],
+    [('grade', '>=', 10), ('grade', '<=', 20), ('year', '=', 2003)],
+    [('grade', '!=', 5)],
+    [('year', '=', 2001), ('code', '<', "C00100")],
+    [('year', '>', 2002), ('year', '<=', 2004), ('grade', '<', 50)],
+    [('id', '>=', 100), ('id', '<', 150), ('grade', '>', 60)],
+    [('id', '=', 77)],
+    [('code', '>=', "C00250")],
+    [('grade', '>', 200)],
+]
+
+
+def filtered(db, predicates):
+    # the row numbers pandas keeps for the predicates, in increasing order
+    frame = db.data.to_frame()
+    keep = frame['row_number'] >= 0
+    for column, op, value in predicates:
+        keep &= OPERATORS[op](frame[column], value)
+    return sorted(frame.loc[keep, 'row_number'].tolist())
+
+
+def change(db):
+    # tombstones, and new rows at the end of the posting lists
+    for key in range(0, 300, 3):
+        db.delete(key)
+    for key in range(300, 340):
+        db.insert(key, {'code': f"C{key:05d}", 'year': 2000 + key % 7, 'grade': float(key % 100)})
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+@pytest.mark.parametrize('indexes', ((), ('grade',), ('grade', 'year', 'code')))
+@pytest.mark.parametrize('predicates', PREDICATES)
+def test_query_matches_pandas(tree_type, indexes, predicates):
+    db = make_database(tree_type, 300, grades=True)
+    for column in indexes:
+        db.create_index(column)
+    rows, _ = db.query(predicates)
+    assert sorted(rows['row_number'].tolist()) == filtered(db, predicates)
+    change(db)
+    rows, _ = db.query(predicates)
+    assert sorted(rows['row_number'].tolist()) == filtered(db, predicates)
+
+
+def test_query_of_text_values():
+    db = make_database(rows=300, grades=True)
+    db.create_index('grade')
+    rows, plan = db.query(parse_where("grade >= 90 and year = '2003'"))
+    assert plan.index == 'grade'
+    assert sorted(rows['row_number'].tolist()) == filtered(db, [('grade', '>=', 90.0), ('year', '=', 2003)])
+
+
+def test_plan():
+    db = make_database(rows=300, grades=True)
+    db.create_index('grade')
+    db.create_index('year', name='by_year')
+    # an equality beats a range with two bounds, which beats a range with one bound
+    _, plan = db.query([('grade', '>', 10), ('year', '=', 2001)])
+    assert (plan.index, plan.column, plan.lo, plan.hi, plan.inclusive) == ('by_year', 'year', 2001, 2001, "both")
+    assert describe_plan(plan) == "index by_year, year = 2001"
+    _, plan = db.query([('year', '>', 2001), ('grade', '>=', 10), ('grade', '<', 20)])
+    assert (plan.index, plan.lo, plan.hi, plan.inclusive) == ('grade', 10.0, 20.0, "left")
+    assert describe_plan(plan) == "index grade, grade in [10.0, 20.0)"
+    # the key column wins a tie
+    _, plan = db.query([('grade', '<=', 10), ('id', '>', 5)])
+    assert plan.index == "primary"
+    assert describe_plan(plan) == "primary index, id in (5, inf)"
+    # "!=" reads no index
+    _, plan = db.query([('grade', '!=', 10), ('code', '=', "C00001")])
+    assert plan.index is None
+    assert describe_plan(plan) == "scan of the table"
+    # the tightest bounds are read from the index
+    _, plan = db.query([('grade', '>', 10), ('grade', '>=', 30), ('grade', '<', 80), ('grade', '<=', 80)])
+    assert (plan.lo, plan.hi, plan.inclusive) == (30.0, 80.0, "left")
+
+
+@pytest.mark.parametrize('key, predicates', [
+    (('year', 'code'), [('year', '=', 2002), ('grade', '<', 40)]),
+    (('year', 'code'), [('year', '>', 2001), ('year', '<', 2005), ('code', '>', "C00200")]),
+    ('code', [('code', '<', "C00100"), ('year', '!=', 2003)]),
+])
+@pytest.mark.parametrize('encoded', (False, True))
+def test_query_on_the_key(key, predicates, encoded):
+    # a bound on the first column of a composite key is a prefix of the key
+    db = make_database(rows=300, key=key, encoded=encoded, grades=True)
+    rows, plan = db.query(predicates)
+    assert plan.index == "primary"
+    assert sorted(rows['row_number'].tolist()) == filtered(db, predicates)
+
+
+def test_parse_where():
+    assert parse_where("grade >= 90 AND name = 'A B' and x!=\"y\"") == [
+        ('grade', '>=', '90'), ('name', '=', 'A B'), ('x', '!=', 'y')]
+    assert parse_where("a<=1 and b<2 and c==3") == [('a', '<=', '1'), ('b', '<', '2'), ('c', '==', '3')]
+    with pytest.raises(ValueError):
+        parse_where("grade 90")
+
+
+def test_unknown_column_and_value():
+    db = make_database(rows=10, grades=True)
+    with pytest.raises(KeyError):
+        db.query([('missing', '=', 1)])
+    with pytest.raises(ValueError):
+        db.query([('year', '=', 'x')])
+    with pytest.raises(ValueError):
+        db.query([('year', '~', 1)])
+
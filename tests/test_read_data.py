@@ -0,0 +1,23 @@
+'''
+Tests of reading the data files a chunk at a time.
+'''
+import os
+
+import pandas as pd
+
+from read_data import read_in_chunks
+
+
+def test_read_in_chunks_asks_again(tmp_path, monkeypatch, capsys):
+    empty = os.path.join(tmp_path, 'empty.csv')
+    with open(empty, 'w') as file:
+        file.write("id,name\n")
+    good = os.path.join(tmp_path, 'data.csv')
+    pd.DataFrame({'id': range(25), 'name': [f"n{i}" for i in range(25)]}).to_csv(good, index=False)
+    answers = iter([os.path.join(tmp_path, 'missing.csv'), empty, good])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    chunks = list(read_in_chunks(chunk_size=10))
+    out = capsys.readouterr().out
+    assert "File not found" in out and "no rows" in out
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert pd.concat(chunks)['id'].tolist() == list(range(25))
@@ -0,0 +1,97 @@
+'''
+Tests of the secondary indexes: one posting list of increasing row numbers per value, kept in step with the rows.
+'''
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from read_data import add_row_number
+from row_store import RowStore
+from secondary_index import SecondaryIndex
+
+
+def postings(index):
+    return {key: list(index.get(key)) for key, _ in index.btree.items()}
+
+
+def grouped(data, column):
+    # the row numbers of each value, from pandas
+    frame = data.to_frame().dropna(subset=[column])
+    return {key: sorted(group.tolist()) for key, group in frame.groupby(column)['row_number']}
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+@pytest.mark.parametrize('values', (
+    [random.Random(1).randrange(20) for _ in range(500)],
+    [random.Random(2).choice([0.5, -1.5, 2.0, np.nan]) for _ in range(500)],
+    [random.Random(3).choice(["b", "a", "ab", None]) for _ in range(500)],
+))
+def test_build_matches_groupby(tree_type, values):
+    data = RowStore.from_frame(add_row_number(pd.DataFrame({'value': values})))
+    index = SecondaryIndex.build(data, 'value', 3, tree_type)
+    assert postings(index) == grouped(data, 'value')
+    assert len(index) == sum(len(rows) for rows in grouped(data, 'value').values())
+    assert index.btree.check() == []
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+def test_insert_and_delete(tree_type):
+    rng = random.Random(4)
+    data = RowStore.from_frame(add_row_number(pd.DataFrame({'value': [rng.randrange(10) for _ in range(200)]})))
+    index = SecondaryIndex.build(data, 'value', 2, tree_type)
+    for _ in range(1000):
+        live = np.flatnonzero(data.live[:data.size])
+        if len(live) and rng.random() < 0.5:
+            row_number = int(data.columns['row_number'][rng.choice(live)])
+            index.delete(data.record(row_number)['value'], row_number)
+            data.delete(row_number)
+        else:
+            value = rng.randrange(15)
+            index.insert(value, data.append({'value': value}))
+    assert postings(index) == grouped(data, 'value')
+    assert all(list(rows) == sorted(rows) for rows in index.postings)
+    assert len(index) == len(data)
+    assert index.btree.check() == []
+    # the posting lists of removed values are reused
+    assert len(index.postings) <= 15
+
+
+def test_get_and_range():
+    data = RowStore.from_frame(add_row_number(pd.DataFrame({'value': [3, 1, 2, 3, 1, 5, 3]})))
+    index = SecondaryIndex.build(data, 'value', 2)
+    assert list(index.get(3)) == [0, 3, 6]
+    assert list(index.get(4)) == []
+    assert list(index.range(2, 3)) == [2, 0, 3, 6]
+    assert list(index.range(1, 3, "neither")) == [2]
+    assert list(index.range(lo=3, inclusive="right")) == [5]
+    assert list(index.range()) == [1, 4, 2, 0, 3, 6, 5]
+
+
+def test_missing_values_are_not_indexed():
+    index = SecondaryIndex('value')
+    index.insert(None, 0)
+    index.insert(np.nan, 1)
+    index.insert(pd.NA, 2)
+    index.delete(None, 0)
+    assert len(index) == 0
+    assert list(index.btree.items()) == []
+
+
+def test_coerce():
+    data = RowStore.from_frame(add_row_number(pd.DataFrame({'value': [1, 2, 3]}, dtype=object)))
+    index = SecondaryIndex.build(data, 'value')
+    assert index.coerce("7") == 7
+    assert index.coerce(np.int64(7)) == 7
+    with pytest.raises(ValueError):
+        index.coerce("seven")
+    with pytest.raises(ValueError):
+        index.coerce(1.5)
+
+
+def test_mixed_values_are_refused():
+    data = RowStore.from_frame(add_row_number(pd.DataFrame({'value': [1, "a", 2]})))
+    with pytest.raises(ValueError):
+        SecondaryIndex.build(data, 'value')
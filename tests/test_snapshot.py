@@ -0,0 +1,54 @@
+'''
+Tests of the binary snapshot: a database saved with save_snapshot is loaded back with the same rows and the same tree,
+node for node.
+'''
+import os
+
+import pandas as pd
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from engine import MiniDatabase
+from tests.conftest import levels, make_database
+
+
+def insert(db, row):
+    key = [row[column] for column in db.codec.columns]
+    db.insert(key if db.codec.composite else key[0],
+              {name: value for name, value in row.items() if name not in db.codec.columns})
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+@pytest.mark.parametrize('key, encoded', [('id', False), ('code', False), (('year', 'code'), False), ('id', True)])
+def test_round_trip(tmp_path, tree_type, key, encoded):
+    db = make_database(tree_type, 300, key, 4, encoded, grades=True)
+    # tombstones and new rows must come back as the live rows only
+    for values in db.data.to_frame()[list(db.codec.columns)].head(50).itertuples(index=False):
+        db.delete(list(values) if db.codec.composite else values[0])
+    insert(db, {'id': 9999, 'code': "Z9999", 'year': 2003, 'grade': 1.5})
+    assert len(db.data) == 251
+    db.create_index('grade')
+    path = os.path.join(tmp_path, 'db.snapshot')
+    db.save_snapshot(path)
+
+    loaded = MiniDatabase.load_snapshot(path)
+    assert loaded.tree_type is tree_type
+    assert loaded.user_defined_key == db.user_defined_key
+    assert loaded.codec.encoded == encoded
+    pd.testing.assert_frame_equal(loaded.data.to_frame().reset_index(drop=True),
+                                  db.data.to_frame().reset_index(drop=True), check_dtype=False)
+    assert loaded.btree.check() == []
+    assert levels(loaded.btree) == levels(db.btree)
+    assert set(loaded.indexes) == {'grade'}
+    assert loaded.query([('grade', '=', 1.5)])[0]['code'].tolist() == ["Z9999"]
+    # the loaded database takes changes like a new one
+    insert(loaded, {'id': 10000, 'code': "Z10000", 'year': 2004, 'grade': 2.5})
+    assert loaded.btree.check() == []
+    assert len(loaded.data) == len(db.data) + 1
+
+def test_not_a_snapshot(tmp_path):
+    path = os.path.join(tmp_path, 'other')
+    with open(path, 'wb') as file:
+        file.write(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        MiniDatabase.load_snapshot(path)
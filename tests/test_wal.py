@@ -0,0 +1,121 @@
+'''
+Tests of the write-ahead log: a database that stops without a checkpoint is recovered from its last checkpoint and
+the committed log records.
+'''
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from b_tree_v0 import BTree, BPlusTree
+from engine import MiniDatabase
+import wal
+from tests.conftest import make_database
+from wal import LOG_NAME, WriteAheadLog
+
+
+def crash(db):
+    # the process stops: the open file is dropped without a checkpoint or a commit of the pending records
+    db.log.file.close()
+    db.log = None
+
+
+@pytest.mark.parametrize('tree_type', (BTree, BPlusTree))
+def test_recover_replays_the_log(tmp_path, tree_type):
+    db = make_database(tree_type)
+    db.open_log(str(tmp_path))
+    for key in range(100, 130):
+        db.insert(key, {'name': f"new{key}"})
+    for key in range(0, 40, 2):
+        db.delete(key)
+    expected = db.data.to_frame()
+    crash(db)
+
+    recovered = MiniDatabase.recover(str(tmp_path))
+    assert recovered.btree.check() == []
+    pd.testing.assert_frame_equal(recovered.data.to_frame(), expected)
+    assert [key for key, _ in recovered.btree.items()] == sorted(expected['id'].tolist())
+    assert recovered.search(120)['name'] == "new120"
+    assert recovered.search(2) is None
+    # the log goes on after the replayed records
+    recovered.insert(500, {'name': "after"})
+    crash(recovered)
+    assert MiniDatabase.recover(str(tmp_path)).search(500)['name'] == "after"
+
+
+def test_recover_after_a_checkpoint(tmp_path):
+    db = make_database()
+    db.open_log(str(tmp_path))
+    db.insert(100, {'name': "before"})
+    db.checkpoint()
+    db.insert(101, {'name': "after"})
+    crash(db)
+    recovered = MiniDatabase.recover(str(tmp_path))
+    assert recovered.log.lsn == 2
+    assert recovered.search(100)['name'] == "before"
+    assert recovered.search(101)['name'] == "after"
+
+
+def test_torn_record_is_ignored(tmp_path):
+    db = make_database()
+    db.open_log(str(tmp_path))
+    db.insert(100, {'name': "complete"})
+    crash(db)
+    # a crash in the middle of a write leaves part of a record at the end of the log
+    with open(os.path.join(tmp_path, LOG_NAME), 'ab') as file:
+        file.write(b'\x40\x00\x00\x00garbage')
+    recovered = MiniDatabase.recover(str(tmp_path))
+    assert recovered.search(100)['name'] == "complete"
+    recovered.insert(101, {'name': "next"})
+    crash(recovered)
+    recovered = MiniDatabase.recover(str(tmp_path))
+    assert recovered.search(101)['name'] == "next"
+    assert recovered.btree.check() == []
+
+
+def test_pending_records_are_lost_without_a_commit(tmp_path):
+    db = make_database()
+    db.open_log(str(tmp_path), batch_size=10)
+    db.insert(100, {'name': "pending"})
+    crash(db)
+    assert MiniDatabase.recover(str(tmp_path)).search(100) is None
+
+
+def test_group_commit_batches(tmp_path):
+    log = WriteAheadLog(os.path.join(tmp_path, LOG_NAME), batch_size=4)
+    for key in range(10):
+        log.append('insert', key=key)
+    assert log.commits == 2
+    assert [record['key'] for record in log.records()] == list(range(8))
+    log.close()
+    assert [record['key'] for record in WriteAheadLog(os.path.join(tmp_path, LOG_NAME)).records()] == list(range(10))
+
+
+def test_group_commit_max_delay(tmp_path):
+    log = WriteAheadLog(os.path.join(tmp_path, LOG_NAME), batch_size=100, max_delay=0.05)
+    log.append('insert', key=1)
+    assert list(log.records()) == []
+    deadline = time.monotonic() + 5
+    while log.commits == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [record['key'] for record in log.records()] == [1]
+    log.close()
+
+
+def test_missing_value_is_recovered_as_na(tmp_path):
+    db = make_database()
+    db.open_log(str(tmp_path))
+    db.insert(100, {'name': pd.NA})
+    crash(db)
+    row = MiniDatabase.recover(str(tmp_path)).search(100)
+    assert row['name'] is pd.NA
+
+
+def test_checkpoint_syncs_the_directory(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(wal, '_fsync_directory', synced.append)
+    db = make_database()
+    db.open_log(str(tmp_path))
+    db.checkpoint()
+    assert synced == [str(tmp_path)] * 2
@@ -0,0 +1,211 @@
+'''
+Write-ahead log and checkpoints for the mini database.
+
+Every insert and delete is appended to the log before the table and the index are changed. Records are buffered and
+written with a single fsync per batch (group commit). A record is durable only once its batch is written: with a batch
+size above 1, a crash loses the records still pending, so a batch is also written at most max_delay seconds after its
+first record, even if no other record follows. A checkpoint saves the table and the index in one file
+and then empties the log, so recovery loads the last checkpoint and replays only the records written after it.
+'''
+import json
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+import pandas as pd
+
+# payload length, CRC32 of the payload, log sequence number
+RECORD_HEADER = struct.Struct('<IIQ')
+LOG_NAME = 'wal.log'
+CHECKPOINT_NAME = 'checkpoint.pkl'
+
+
+def _to_json(value):
+    # missing values (pd.NA, pd.NaT) are written as null, NumPy and pandas scalars have item(), anything else is kept
+    # as text
+    if pd.isna(value) is True:
+        return None
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _fsync_directory(directory):
+    # a rename is only durable once the directory that holds it is synced; Windows cannot open a directory
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    '''
+    Class WriteAheadLog
+    This class is an append-only log of insert and delete records.
+    - append: add a record, the batch is committed once batch_size records are pending or max_delay seconds
+      after its first record
+    - commit: write the pending records and fsync the file
+    - records: read back the complete records, a torn record at the end of the file is ignored
+    - reset: empty the log after a checkpoint
+    '''
+    def __init__(self, path, batch_size=1, lsn=0, max_delay=None):
+        '''
+        Parameters:
+        path -- the log file, created if it does not exist
+        batch_size -- the number of records written with one fsync
+        lsn -- the sequence number of the last checkpoint, numbering continues after it
+        max_delay -- the seconds a record can wait for its batch to fill before it is written, None to wait for a
+                     full batch or an explicit commit
+        '''
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        if max_delay is not None and max_delay <= 0:
+            raise ValueError("Maximum delay must be positive")
+        self.path = path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        # the timer of the pending batch commits from its own thread
+        self.lock = threading.Lock()
+        self.timer = None
+        entries, end = self._read()
+        self.lsn = max([lsn] + [entry[0] for entry in entries])
+        self.checkpoint_lsn = lsn
+        self.file = open(path, 'ab')
+        # cut off a torn record left by a crash, so new records follow the last complete one
+        self.file.truncate(end)
+        self.commits = 0
+
+    def append(self, op, **fields):
+        '''
+        Function append
+        This function adds a record to the log. It is durable after the next commit.
+        Parameters:
+        op -- "insert" or "delete"
+        fields -- the content of the record, e.g. key, row_number and values
+        Returns the log sequence number of the record.
+        '''
+        fields['op'] = op
+        payload = json.dumps(fields, default=_to_json).encode('utf-8')
+        with self.lock:
+            self.lsn += 1
+            self.pending.append(RECORD_HEADER.pack(len(payload), zlib.crc32(payload), self.lsn) + payload)
+            if len(self.pending) >= self.batch_size:
+                self._commit()
+            elif self.max_delay is not None and self.timer is None:
+                self.timer = threading.Timer(self.max_delay, self.commit)
+                self.timer.daemon = True
+                self.timer.start()
+            return self.lsn
+
+    def commit(self):
+        '''
+        Function commit
+        This function writes every pending record with one write and one fsync.
+        '''
+        with self.lock:
+            self._commit()
+
+    def _commit(self):
+        # called with the lock held
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        self.file.write(b''.join(self.pending))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending.clear()
+        self.commits += 1
+
+    def _read(self):
+        '''
+        Function _read
+        This function reads the complete records of the log file.
+        Returns a list of (lsn, payload) and the offset after the last complete record.
+        '''
+        if not os.path.exists(self.path):
+            return [], 0
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        entries = []
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, crc, lsn = RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            # a crash during a write leaves a short or corrupted last record
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            entries.append((lsn, payload))
+            offset += RECORD_HEADER.size + length
+        return entries, offset
+
+    def records(self, after=0):
+        '''
+        Function records
+        This function reads the committed records of the log in order.
+        Parameters:
+        after -- only records with a larger log sequence number are returned
+        Returns a generator of record dicts, each with its 'lsn'.
+        '''
+        for lsn, payload in self._read()[0]:
+            if lsn > after:
+                record = json.loads(payload)
+                record['lsn'] = lsn
+                yield record
+
+    def reset(self):
+        '''
+        Function reset
+        This function empties the log once its records are covered by a checkpoint. Sequence numbers keep counting.
+        '''
+        with self.lock:
+            self._commit()
+            self.file.close()
+            self.file = open(self.path, 'wb')
+            os.fsync(self.file.fileno())
+            self.checkpoint_lsn = self.lsn
+
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.file.close()
+
+
+def write_checkpoint(directory, state, lsn):
+    '''
+    Function write_checkpoint
+    This function saves the state of the database atomically: the checkpoint is written to a temporary file,
+    synced and then renamed over the previous one, and the directory is synced so the rename survives a crash
+    before the log is emptied.
+    Parameters:
+    directory -- the directory of the log and the checkpoint
+    state -- a dict with the table and the index to save
+    lsn -- the sequence number of the last log record included in the checkpoint
+    '''
+    path = os.path.join(directory, CHECKPOINT_NAME)
+    with open(path + '.tmp', 'wb') as file:
+        pickle.dump(dict(state, lsn=lsn), file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+    _fsync_directory(directory)
+
+
+def read_checkpoint(directory):
+    '''
+    Function read_checkpoint
+    This function loads the last checkpoint of a directory.
+    Parameters:
+    directory -- the directory of the log and the checkpoint
+    Returns the checkpoint dict, or None if there is no checkpoint.
+    '''
+    path = os.path.join(directory, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return pickle.load(file)